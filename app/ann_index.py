@@ -0,0 +1,304 @@
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+from artifact_store import _load, _save, catalog_fingerprint
+
+# Mode dense + ANN: X_all ternormalisasi diproyeksikan dengan TruncatedSVD ke
+# ruang berdimensi kecil (float32, baris ter-normalisasi L2), lalu diindeks
+# dengan IVF: item dikelompokkan ke n_lists centroid (k-means), query hanya
+# men-score item di n_probe list dengan centroid terdekat.
+ANN_MANIFEST = "ann.json"
+ANN_FORMAT = "mind-cbr-ann"
+ANN_VERSION = 1
+
+
+def _normalize(E):
+    norms = np.linalg.norm(E, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (E / norms).astype(np.float32)
+
+
+def default_n_lists(n_items: int) -> int:
+    return int(np.clip(4 * np.sqrt(max(n_items, 1)), 1, 65536))
+
+
+class DenseANNIndex:
+    """
+    components : (dim x n_terms) float32, proyeksi SVD
+    emb        : (n_items x dim) float32 ter-normalisasi, diurutkan per list
+                 (item satu list bersebelahan di memori)
+    order      : row katalog untuk tiap baris emb
+    offsets    : batas list di emb (n_lists + 1)
+    centroids  : (n_lists x dim) float32 ter-normalisasi
+    """
+
+    def __init__(self, components, emb, order, offsets, centroids, n_probe: int = 8):
+        self.components = components
+        self.emb = emb
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.centroids = centroids
+        self.n_probe = n_probe
+        self.n_items = len(self.order)
+        self._pos = None
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        X_norm,
+        dim: int = 256,
+        n_lists: int = None,
+        n_probe: int = 8,
+        seed: int = 42,
+        svd_sample: int = 200000,
+    ) -> "DenseANNIndex":
+        """Fit TruncatedSVD + k-means (mini-batch) pada X_norm, lalu bangun list IVF."""
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import TruncatedSVD
+
+        X_norm = sparse.csr_matrix(X_norm)
+        n_items = X_norm.shape[0]
+        dim = int(min(dim, X_norm.shape[1] - 1, max(n_items - 1, 1)))
+        rng = np.random.default_rng(seed)
+
+        fit_rows = np.arange(n_items)
+        if n_items > svd_sample:
+            fit_rows = np.sort(rng.choice(n_items, svd_sample, replace=False))
+        svd = TruncatedSVD(n_components=dim, algorithm="randomized", random_state=seed)
+        svd.fit(X_norm[fit_rows])
+        components = np.ascontiguousarray(svd.components_, dtype=np.float32)
+
+        emb = _normalize(X_norm @ components.T)
+
+        n_lists = int(min(n_lists or default_n_lists(n_items), n_items))
+        km = MiniBatchKMeans(
+            n_clusters=n_lists, random_state=seed, batch_size=max(1024, 4 * n_lists), n_init=1
+        )
+        km.fit(emb)
+        centroids = _normalize(km.cluster_centers_)
+        assign = cls._assign(emb, centroids)
+        return cls.from_assignment(components, emb, assign, centroids, n_probe)
+
+    @staticmethod
+    def _assign(emb, centroids, block: int = 65536):
+        out = np.empty(len(emb), dtype=np.int64)
+        for start in range(0, len(emb), block):
+            out[start:start + block] = np.argmax(emb[start:start + block] @ centroids.T, axis=1)
+        return out
+
+    @classmethod
+    def from_assignment(cls, components, emb, assign, centroids, n_probe: int = 8):
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=offsets[1:])
+        return cls(components, np.ascontiguousarray(emb[order]), order, offsets, centroids, n_probe)
+
+    def extend(self, X_new_norm) -> "DenseANNIndex":
+        """
+        Index baru dengan baris tambahan (mis. segment append_news) diproyeksikan
+        ke ruang yang sama dan dimasukkan ke list terdekat; SVD & centroid tetap.
+        """
+        E_new = _normalize(sparse.csr_matrix(X_new_norm) @ self.components.T)
+        emb = np.empty((self.n_items + len(E_new), self.dim), dtype=np.float32)
+        emb[self.order] = self.emb
+        emb[self.n_items:] = E_new
+        assign = np.empty(len(emb), dtype=np.int64)
+        assign[self.order] = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        assign[self.n_items:] = self._assign(E_new, self.centroids)
+        return self.from_assignment(self.components, emb, assign, self.centroids, self.n_probe)
+
+    def project(self, uvec):
+        """Profil user (sparse/dense, ruang TF-IDF) -> vektor dense ter-normalisasi, atau None."""
+        if uvec is None:
+            return None
+        if sparse.issparse(uvec):
+            u = sparse.csr_matrix(uvec)
+            q = self.components[:, u.indices] @ u.data.astype(np.float32)
+        else:
+            q = self.components @ np.asarray(uvec, dtype=np.float32).ravel()
+        qn = np.linalg.norm(q)
+        if qn == 0:
+            return None
+        return q / qn
+
+    def embedding(self, rows):
+        """Embedding untuk row katalog (urutan all2idx)."""
+        if self._pos is None:
+            pos = np.empty(self.n_items, dtype=np.int64)
+            pos[self.order] = np.arange(self.n_items)
+            self._pos = pos
+        return self.emb[self._pos[np.asarray(rows, dtype=np.int64)]]
+
+    def search(self, q, k: int = 10, n_probe: int = None, exclude_rows=None):
+        """
+        Return (rows, scores) top-k (skor = cosine di ruang embedding) dari
+        item di n_probe list terdekat. q: hasil project().
+        """
+        if q is None or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        n_probe = int(min(n_probe or self.n_probe, self.n_lists))
+
+        cs = self.centroids @ q
+        probe = np.argpartition(-cs, n_probe - 1)[:n_probe] if n_probe < self.n_lists else np.arange(self.n_lists)
+        lo, hi = self.offsets[probe], self.offsets[probe + 1]
+        lens = hi - lo
+        total = int(lens.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        starts = np.zeros(len(probe), dtype=np.int64)
+        np.cumsum(lens[:-1], out=starts[1:])
+        pos = np.repeat(lo - starts, lens) + np.arange(total)
+
+        scores = self.emb[pos] @ q
+        rows = self.order[pos]
+        if exclude_rows is not None and len(exclude_rows):
+            scores[np.isin(rows, exclude_rows)] = -np.inf
+
+        k = min(k, total)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((rows[top], -scores[top]))]
+        top = top[np.isfinite(scores[top])]
+        return rows[top], scores[top]
+
+    def save(self, artifact_dir: str, extra: dict = None, all2idx=None):
+        """all2idx: dicatat sebagai catalog_fingerprint, dicek load_ann_index."""
+        files = []
+        _save(artifact_dir, "ann_components.npy", self.components, files)
+        _save(artifact_dir, "ann_emb.npy", self.emb, files)
+        _save(artifact_dir, "ann_order.npy", self.order, files)
+        _save(artifact_dir, "ann_offsets.npy", self.offsets, files)
+        _save(artifact_dir, "ann_centroids.npy", self.centroids, files)
+        manifest = {
+            "format": ANN_FORMAT,
+            "version": ANN_VERSION,
+            "dim": self.dim,
+            "n_items": self.n_items,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "catalog_fingerprint": catalog_fingerprint(all2idx, self.n_items) if all2idx is not None else None,
+            "files": files,
+        }
+        manifest.update(extra or {})
+        tmp = os.path.join(artifact_dir, ANN_MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(artifact_dir, ANN_MANIFEST))
+        return manifest
+
+
+def has_ann_index(artifact_dir: str) -> bool:
+    return os.path.exists(os.path.join(artifact_dir, ANN_MANIFEST))
+
+
+def load_ann_index(artifact_dir: str, X_norm=None, mmap: bool = True, all2idx=None):
+    """
+    Muat DenseANNIndex (array di-mmap), atau None jika belum dibangun.
+    Segment dari append_news sudah dimasukkan ke index (extend_ann_index);
+    jika X_norm tetap punya baris lebih banyak (index lebih lama dari segment),
+    baris sisanya diproyeksikan saat load lewat extend() (salinan di heap,
+    jalankan build_ann_index.py --update agar tersimpan).
+    all2idx: row index harus milik katalog yang sama (catalog_fingerprint
+    n_items row pertama); berbeda -> ValueError.
+    """
+    if not has_ann_index(artifact_dir):
+        return None
+    with open(os.path.join(artifact_dir, ANN_MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ANN_FORMAT:
+        raise ValueError(f"Bukan index {ANN_FORMAT}: {artifact_dir}")
+
+    index = DenseANNIndex(
+        _load(artifact_dir, "ann_components.npy", mmap),
+        _load(artifact_dir, "ann_emb.npy", mmap),
+        _load(artifact_dir, "ann_order.npy", mmap),
+        _load(artifact_dir, "ann_offsets.npy", mmap),
+        _load(artifact_dir, "ann_centroids.npy", mmap),
+        n_probe=manifest.get("n_probe", 8),
+    )
+    expected = manifest.get("catalog_fingerprint")
+    if all2idx is not None and expected is not None:
+        if len(all2idx) < index.n_items or catalog_fingerprint(all2idx, index.n_items) != expected:
+            raise ValueError("Index ANN dibangun untuk katalog (all2idx) yang berbeda; bangun ulang index ANN.")
+    if X_norm is not None:
+        if X_norm.shape[0] < index.n_items:
+            raise ValueError("Index ANN dibangun untuk katalog yang lebih besar; bangun ulang index ANN.")
+        if X_norm.shape[0] > index.n_items:
+            index = index.extend(X_norm[index.n_items:])
+    return index
+
+
+def extend_ann_index(artifact_dir: str, X_norm, all2idx) -> int:
+    """
+    Proyeksikan baris katalog baru (segment) ke index ANN sekali, lalu tulis
+    ulang index (atomic, lihat _save) agar proses yang load cukup mmap.
+    SVD & centroid tetap; field manifest lain (mis. recall) dipertahankan.
+    Return jumlah baris yang ditambahkan (0 jika tidak ada index / baris baru).
+    """
+    if not has_ann_index(artifact_dir):
+        return 0
+    with open(os.path.join(artifact_dir, ANN_MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    index = load_ann_index(artifact_dir, all2idx=all2idx)
+    added = X_norm.shape[0] - index.n_items
+    if added <= 0:
+        return 0
+    keep = {
+        k: v for k, v in manifest.items()
+        if k not in ("format", "version", "dim", "n_items", "n_lists", "n_probe", "catalog_fingerprint", "files")
+    }
+    index.extend(X_norm[index.n_items:]).save(artifact_dir, extra=keep, all2idx=all2idx)
+    return added
+
+
+def recall_at_k(scorer, histories, k: int = 10, n_probe: int = None, weighted: bool = True) -> dict:
+    """
+    Bandingkan top-k ANN dengan top-k exact TF-IDF (CatalogScorer) untuk
+    daftar history. Dilaporkan juga recall dense brute-force (semua item,
+    tanpa IVF) agar kehilangan karena SVD dan karena probing terpisah.
+    """
+    from recommender import build_user_profile
+
+    ann = scorer.ann
+    hit_ann = hit_dense = total = 0
+    scanned = []
+    for hist in histories:
+        uvec = build_user_profile(hist, scorer.X_all, scorer.all2idx, weighted=weighted)
+        q = ann.project(uvec)
+        if q is None:
+            continue
+        exclude = scorer.rows_of(hist)
+        exact, _ = scorer.topn(uvec, k, exclude_rows=exclude, retrieval="exact")
+        approx, _ = ann.search(q, k, n_probe=n_probe, exclude_rows=exclude)
+
+        dense = ann.emb @ q
+        dense[np.isin(ann.order, exclude)] = -np.inf
+        brute = ann.order[np.argpartition(-dense, k - 1)[:k]]
+
+        exact = set(exact.tolist())
+        hit_ann += len(exact & set(approx.tolist()))
+        hit_dense += len(exact & set(brute.tolist()))
+        total += len(exact)
+
+        p = int(min(n_probe or ann.n_probe, ann.n_lists))
+        probe = np.argpartition(-(ann.centroids @ q), p - 1)[:p]
+        scanned.append(int((ann.offsets[probe + 1] - ann.offsets[probe]).sum()))
+
+    return {
+        "users": len(scanned),
+        "k": k,
+        "n_probe": int(n_probe or ann.n_probe),
+        f"recall_at_{k}": hit_ann / total if total else 0.0,
+        f"dense_recall_at_{k}": hit_dense / total if total else 0.0,
+        "scanned_fraction": float(np.mean(scanned) / ann.n_items) if scanned else 0.0,
+    }
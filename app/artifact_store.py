@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+# Format artifacts v2: semua array disimpan sebagai .npy mentah (tanpa pickle)
+# sehingga bisa di-np.load(mmap_mode="r") dan dibagi antar proses lewat page cache.
+# pandas hanya di-import di fungsi yang membuat DataFrame, agar modul index
+# (ann_index, item_neighbors) yang memakai _load/_save tetap ringan.
+FORMAT_NAME = "mind-cbr-artifacts"
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+
+META_COLUMNS = ["category", "subcategory", "title", "abstract", "url"]
+# kolom metadata yang di-decode load_artifacts secara default (abstract/url
+# hanya dibutuhkan saat rebuild/compaction, jadi tidak ikut)
+DEFAULT_META_COLUMNS = ("category", "subcategory", "title")
+
+VECTORIZER_PARAMS = [
+    "lowercase", "strip_accents", "analyzer", "token_pattern", "stop_words",
+    "ngram_range", "max_df", "min_df", "max_features", "binary",
+    "norm", "use_idf", "smooth_idf", "sublinear_tf",
+]
+
+
+class StringColumn:
+    """
+    Kolom string read-only di atas blob UTF-8 + offsets (keduanya .npy).
+    String hanya di-decode saat diakses.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.blob[lo:hi]).decode("utf-8")
+
+    def take(self, rows):
+        return [self[int(i)] for i in rows]
+
+    def to_list(self):
+        raw = bytes(self.blob)
+        offs = self.offsets.tolist()
+        return [raw[offs[i]:offs[i + 1]].decode("utf-8") for i in range(len(offs) - 1)]
+
+
+def is_v2_dir(artifact_dir: str) -> bool:
+    return os.path.exists(os.path.join(artifact_dir, MANIFEST))
+
+
+def read_manifest(artifact_dir: str) -> dict:
+    with open(os.path.join(artifact_dir, MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"Bukan artifacts {FORMAT_NAME}: {artifact_dir}")
+    if manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(
+            f"Versi artifacts {manifest.get('version')} lebih baru dari yang didukung ({FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def _write_manifest(out_dir: str, manifest: dict):
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+
+def _save(artifact_dir: str, name: str, arr, files: list):
+    # Tulis ke file sementara lalu os.replace: proses lain yang masih
+    # mmap file lama tetap aman (inode lama tidak dipotong).
+    path = os.path.join(artifact_dir, name)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(arr), allow_pickle=False)
+    os.replace(path + ".tmp", path)
+    files.append(name)
+
+
+def _load(artifact_dir: str, name: str, mmap: bool = True):
+    return np.load(os.path.join(artifact_dir, name), mmap_mode="r" if mmap else None, allow_pickle=False)
+
+
+def save_string_column(artifact_dir: str, prefix: str, values, files: list):
+    encoded = [("" if v is None else str(v)).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    _save(artifact_dir, f"{prefix}.bytes.npy", blob, files)
+    _save(artifact_dir, f"{prefix}.offsets.npy", offsets, files)
+
+
+def load_string_column(artifact_dir: str, prefix: str, mmap: bool = True) -> StringColumn:
+    return StringColumn(
+        _load(artifact_dir, f"{prefix}.bytes.npy", mmap),
+        _load(artifact_dir, f"{prefix}.offsets.npy", mmap),
+    )
+
+
+def _smallest_index_dtype(maxval: int):
+    return np.int32 if maxval <= np.iinfo(np.int32).max else np.int64
+
+
+def save_matrix(artifact_dir: str, prefix: str, X, files: list):
+    X = sparse.csr_matrix(X)
+    X.sort_indices()
+    idx_dtype = _smallest_index_dtype(max(X.nnz, X.shape[1]))
+    _save(artifact_dir, f"{prefix}_data.npy", X.data, files)
+    _save(artifact_dir, f"{prefix}_indices.npy", X.indices.astype(idx_dtype, copy=False), files)
+    _save(artifact_dir, f"{prefix}_indptr.npy", X.indptr.astype(idx_dtype, copy=False), files)
+
+
+def load_matrix(artifact_dir: str, prefix: str, shape, mmap: bool = True, data_name: str = None):
+    data = _load(artifact_dir, data_name or f"{prefix}_data.npy", mmap)
+    indices = _load(artifact_dir, f"{prefix}_indices.npy", mmap)
+    indptr = _load(artifact_dir, f"{prefix}_indptr.npy", mmap)
+    return sparse.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+def _vectorizer_params(vectorizer) -> dict:
+    params = {}
+    for k in VECTORIZER_PARAMS:
+        v = getattr(vectorizer, k, None)
+        if isinstance(v, (frozenset, set)):
+            v = sorted(v)
+        if isinstance(v, tuple):
+            v = list(v)
+        params[k] = v
+    params["dtype"] = np.dtype(getattr(vectorizer, "dtype", np.float64)).name
+    return params
+
+
+def save_artifacts_v2(artifact_dir: str, vectorizer, news_all, all2idx, X_all, metrics_df=None):
+    """
+    Tulis artifacts format v2 ke artifact_dir.
+    manifest.json ditulis paling akhir, jadi folder setengah jadi
+    tidak akan terbaca sebagai v2.
+    """
+    from recommender import l2_normalize_rows
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    files = []
+
+    X_all = sparse.csr_matrix(X_all)
+    n_items = X_all.shape[0]
+
+    ids = [None] * n_items
+    for nid, i in all2idx.items():
+        ids[i] = nid
+    save_string_column(artifact_dir, "news_id", ids, files)
+
+    meta_cols = [c for c in META_COLUMNS if c in news_all.columns]
+    meta = news_all.drop_duplicates("news_id").set_index("news_id").reindex(ids)
+    for col in meta_cols:
+        save_string_column(artifact_dir, f"meta_{col}", meta[col].fillna("").tolist(), files)
+    if "title" in meta_cols:
+        # index pencarian judul dibangun sekali di sini, bukan tiap start aplikasi
+        from title_search import TitleSearchIndex
+
+        TitleSearchIndex(meta["title"].fillna("").tolist()).save(artifact_dir, files)
+
+    save_matrix(artifact_dir, "X", X_all, files)
+    Xn = l2_normalize_rows(X_all)
+    Xn.sort_indices()
+    _save(artifact_dir, "X_norm_data.npy", Xn.data, files)
+
+    vocab = vectorizer.vocabulary_
+    terms = [None] * len(vocab)
+    for t, j in vocab.items():
+        terms[j] = t
+    save_string_column(artifact_dir, "vocab", terms, files)
+    _save(artifact_dir, "idf.npy", np.asarray(vectorizer.idf_, dtype=np.float64), files)
+
+    if metrics_df is not None:
+        metrics_df.to_csv(os.path.join(artifact_dir, "metrics.csv"), index=False)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "n_items": int(n_items),
+        "n_terms": int(X_all.shape[1]),
+        "nnz": int(X_all.nnz),
+        "meta_columns": meta_cols,
+        "vectorizer": _vectorizer_params(vectorizer),
+        "files": files,
+    }
+    _write_manifest(artifact_dir, manifest)
+    return manifest
+
+
+def save_segment(seg_dir: str, ids, meta_df, X):
+    """
+    Segment katalog tambahan: hanya ID, metadata dan matrix
+    (vocab/idf tetap milik artifacts utama).
+    """
+    from recommender import l2_normalize_rows
+
+    os.makedirs(seg_dir, exist_ok=True)
+    files = []
+    X = sparse.csr_matrix(X)
+
+    save_string_column(seg_dir, "news_id", ids, files)
+    meta_cols = [c for c in META_COLUMNS if c in meta_df.columns]
+    for col in meta_cols:
+        save_string_column(seg_dir, f"meta_{col}", meta_df[col].fillna("").tolist(), files)
+
+    save_matrix(seg_dir, "X", X, files)
+    Xn = l2_normalize_rows(X)
+    Xn.sort_indices()
+    _save(seg_dir, "X_norm_data.npy", Xn.data, files)
+
+    _write_manifest(seg_dir, {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "kind": "segment",
+        "n_items": int(X.shape[0]),
+        "n_terms": int(X.shape[1]),
+        "nnz": int(X.nnz),
+        "meta_columns": meta_cols,
+        "files": files,
+    })
+
+
+def catalog_fingerprint(all2idx, n_items: int = None) -> str:
+    """
+    Hash urutan news_id di all2idx, untuk memastikan artifacts turunan (index
+    ANN, tabel tetangga, behaviors kolumnar) milik katalog yang sama.
+    n_items: hanya n_items row pertama (mis. index yang dibangun sebelum segment baru).
+    """
+    ids = [None] * len(all2idx)
+    for nid, i in all2idx.items():
+        ids[i] = nid
+    h = hashlib.sha1()
+    for nid in ids[:n_items]:
+        h.update(str(nid).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def select_meta_columns(manifest: dict, meta_columns=DEFAULT_META_COLUMNS):
+    """Kolom meta di manifest yang diminta (None = semua)."""
+    stored = manifest.get("meta_columns", [])
+    return list(stored) if meta_columns is None else [c for c in stored if c in meta_columns]
+
+
+def load_segment(seg_dir: str, mmap: bool = True, meta_columns=DEFAULT_META_COLUMNS):
+    """Return (ids, meta_df, X, X_norm) dari satu segment (meta_columns: lihat load_artifacts_v2)."""
+    manifest = read_manifest(seg_dir)
+    shape = (manifest["n_items"], manifest["n_terms"])
+    ids = load_string_column(seg_dir, "news_id", mmap).to_list()
+    cols = {"news_id": ids}
+    for col in select_meta_columns(manifest, meta_columns):
+        cols[col] = load_string_column(seg_dir, f"meta_{col}", mmap).to_list()
+    X = load_matrix(seg_dir, "X", shape, mmap)
+    X_norm = load_matrix(seg_dir, "X", shape, mmap, data_name="X_norm_data.npy")
+    import pandas as pd
+
+    return ids, pd.DataFrame(cols), X, X_norm
+
+
+def load_vectorizer_v2(artifact_dir: str, manifest: dict = None):
+    """Bangun ulang TfidfVectorizer dari vocab + idf (tanpa pickle)."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    manifest = manifest or read_manifest(artifact_dir)
+    params = dict(manifest["vectorizer"])
+    params["dtype"] = np.dtype(params.get("dtype", "float64")).type
+    if params.get("ngram_range") is not None:
+        params["ngram_range"] = tuple(params["ngram_range"])
+    if isinstance(params.get("stop_words"), list):
+        params["stop_words"] = frozenset(params["stop_words"])
+
+    vectorizer = TfidfVectorizer(**params)
+    terms = load_string_column(artifact_dir, "vocab").to_list()
+    vectorizer.vocabulary_ = {t: j for j, t in enumerate(terms)}
+    vectorizer.idf_ = np.array(_load(artifact_dir, "idf.npy"))
+    return vectorizer
+
+
+def load_artifacts_v2(
+    artifact_dir: str, mmap: bool = True, with_vectorizer: bool = True, meta_columns=DEFAULT_META_COLUMNS
+):
+    """
+    Return tuple yang sama dengan load_artifacts:
+      vectorizer, news_all_df, all2idx_dict, X_all_sparse, metrics_df
+    X_all (data/indices/indptr) di-mmap read-only.
+    with_vectorizer=False: vectorizer None (tanpa import sklearn).
+    meta_columns: kolom metadata yang di-decode ke news_all (default tanpa
+    abstract/url); None = semua kolom, () = news_id saja. Kolom lain tetap
+    bisa dibaca lazy lewat load_string_column(artifact_dir, "meta_<kolom>").
+    """
+    import pandas as pd
+
+    manifest = read_manifest(artifact_dir)
+    shape = (manifest["n_items"], manifest["n_terms"])
+
+    ids = load_string_column(artifact_dir, "news_id", mmap).to_list()
+    all2idx = {nid: i for i, nid in enumerate(ids)}
+
+    cols = {"news_id": ids}
+    for col in select_meta_columns(manifest, meta_columns):
+        cols[col] = load_string_column(artifact_dir, f"meta_{col}", mmap).to_list()
+    news_all = pd.DataFrame(cols)
+
+    X_all = load_matrix(artifact_dir, "X", shape, mmap)
+    vectorizer = load_vectorizer_v2(artifact_dir, manifest) if with_vectorizer else None
+
+    metrics_path = os.path.join(artifact_dir, "metrics.csv")
+    metrics = pd.read_csv(metrics_path) if os.path.exists(metrics_path) else pd.DataFrame()
+
+    return vectorizer, news_all, all2idx, X_all, metrics
+
+
+def load_normalized_matrix_v2(artifact_dir: str, mmap: bool = True):
+    """X_all yang sudah dinormalisasi L2 (indices/indptr dibagi dengan X_all)."""
+    manifest = read_manifest(artifact_dir)
+    shape = (manifest["n_items"], manifest["n_terms"])
+    return load_matrix(artifact_dir, "X", shape, mmap, data_name="X_norm_data.npy")
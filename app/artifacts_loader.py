@@ -1,21 +1,44 @@
 import os
 import pickle
+import time
+
+import numpy as np
 import pandas as pd
 from scipy import sparse
 
+from artifact_store import (
+    DEFAULT_META_COLUMNS,
+    MANIFEST,
+    is_v2_dir,
+    read_manifest,
+    load_matrix,
+    load_artifacts_v2,
+    load_normalized_matrix_v2,
+    load_vectorizer_v2,
+    load_string_column,
+)
+from catalog_segments import iter_segments, list_segments, merge_segments, merge_normalized_segments
+from instrumentation import is_enabled, set_gauge, stage
+from news_meta import META_FIELDS, NewsMetaStore
+
+LEGACY_FILES = [
+    "tfidf_vectorizer.pkl",
+    "news_all.pkl",
+    "all2idx.pkl",
+    "X_all_tfidf.npz",
+    "metrics.csv",
+]
+
 
 def resolve_artifact_dir(default_rel: str = "../notebooks/artifacts_classification_v2") -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), default_rel))
 
 
 def assert_artifacts_exist(artifact_dir: str) -> None:
-    required = [
-        "tfidf_vectorizer.pkl",
-        "news_all.pkl",
-        "all2idx.pkl",
-        "X_all_tfidf.npz",
-        "metrics.csv",
-    ]
+    if is_v2_dir(artifact_dir):
+        required = [MANIFEST] + read_manifest(artifact_dir)["files"]
+    else:
+        required = LEGACY_FILES
     missing = [f for f in required if not os.path.exists(os.path.join(artifact_dir, f))]
     if missing:
         raise FileNotFoundError(
@@ -25,15 +48,80 @@ def assert_artifacts_exist(artifact_dir: str) -> None:
         )
 
 
-def load_artifacts(artifact_dir: str):
+def load_artifacts(
+    artifact_dir: str, mmap: bool = True, with_vectorizer: bool = True, meta_columns=DEFAULT_META_COLUMNS
+):
     """
     Return:
       vectorizer, news_all_df, all2idx_dict, X_all_sparse, metrics_df
+
+    Jika folder berisi manifest.json (format v2) maka X_all di-mmap
+    dari file .npy; jika tidak, dibaca dari pickle/npz lama.
+    Segment hasil append_news (jika ada) ikut digabung sebagai satu katalog.
+    Waktu load dan ukuran memori dicatat sebagai gauge instrumentation.
+    with_vectorizer=False: vectorizer None, muat belakangan dengan
+    load_vectorizer (hanya dibutuhkan explainability / transform teks).
+    meta_columns (format v2): kolom metadata di news_all, default tanpa
+    abstract/url; None = semua, () = news_id saja (lihat load_artifacts_v2).
     """
+    t0 = time.perf_counter()
+    with stage("load_base_artifacts"):
+        vectorizer, news_all, all2idx, X_all, metrics = load_base_artifacts(
+            artifact_dir, mmap=mmap, with_vectorizer=with_vectorizer, meta_columns=meta_columns
+        )
+    with stage("merge_segments"):
+        news_all, all2idx, X_all = merge_segments(
+            artifact_dir, news_all, all2idx, X_all, mmap=mmap, meta_columns=meta_columns
+        )
+
+    set_gauge("artifacts_load_seconds", time.perf_counter() - t0)
+    if is_enabled():
+        # deep=True menelusuri setiap string news_all: hanya saat instrumentasi aktif
+        for part, nbytes in artifact_footprint(news_all, X_all).items():
+            set_gauge("artifacts_bytes", nbytes, part=part)
+    set_gauge("catalog_items", X_all.shape[0])
+    set_gauge("catalog_nnz", X_all.nnz)
+    return vectorizer, news_all, all2idx, X_all, metrics
+
+
+def artifact_footprint(news_all, X_all) -> dict:
+    """
+    Perkiraan byte per bagian; array yang di-mmap dihitung terpisah karena
+    berada di page cache (dibagi antar proses), bukan heap proses.
+    news_all dihitung dengan deep=True (termasuk isi string kolom object).
+    """
+    out = {"X_all_heap": 0, "X_all_mmap": 0}
+    for arr in (X_all.data, X_all.indices, X_all.indptr):
+        base = arr
+        while isinstance(base, np.ndarray) and base.base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        key = "X_all_mmap" if isinstance(base, np.memmap) or not isinstance(base, np.ndarray) else "X_all_heap"
+        out[key] += int(arr.nbytes)
+    out["news_all"] = int(news_all.memory_usage(index=True, deep=True).sum())
+    return out
+
+
+def load_vectorizer(artifact_dir: str):
+    """TfidfVectorizer saja (v2: dibangun dari vocab + idf, lama: pickle)."""
+    with stage("load_vectorizer"):
+        if is_v2_dir(artifact_dir):
+            return load_vectorizer_v2(artifact_dir)
+        with open(os.path.join(artifact_dir, "tfidf_vectorizer.pkl"), "rb") as f:
+            return pickle.load(f)
+
+
+def load_base_artifacts(
+    artifact_dir: str, mmap: bool = True, with_vectorizer: bool = True, meta_columns=DEFAULT_META_COLUMNS
+):
+    """Seperti load_artifacts, tanpa segment tambahan (format lama: news_all pickle utuh)."""
     assert_artifacts_exist(artifact_dir)
 
-    with open(os.path.join(artifact_dir, "tfidf_vectorizer.pkl"), "rb") as f:
-        vectorizer = pickle.load(f)
+    if is_v2_dir(artifact_dir):
+        return load_artifacts_v2(
+            artifact_dir, mmap=mmap, with_vectorizer=with_vectorizer, meta_columns=meta_columns
+        )
+
+    vectorizer = load_vectorizer(artifact_dir) if with_vectorizer else None
 
     with open(os.path.join(artifact_dir, "news_all.pkl"), "rb") as f:
         news_all = pickle.load(f)
@@ -49,3 +137,81 @@ def load_artifacts(artifact_dir: str):
             pass
 
     return vectorizer, news_all, all2idx, X_all, metrics
+
+
+def load_metrics(artifact_dir: str):
+    """metrics.csv saja (DataFrame kosong jika tidak ada)."""
+    path = os.path.join(artifact_dir, "metrics.csv")
+    return pd.read_csv(path) if os.path.exists(path) else pd.DataFrame()
+
+
+def load_news_meta(artifact_dir: str, mmap: bool = True) -> NewsMetaStore:
+    """
+    NewsMetaStore katalog (base + segment) tanpa memuat X_all maupun
+    vectorizer, mis. untuk UI yang scoring-nya dilakukan service.
+    Format v2 hanya men-decode kolom news_id + META_FIELDS.
+    """
+    if not is_v2_dir(artifact_dir):
+        # format lama: news_all hanya ada di pickle bersama X_all
+        _, news_all, all2idx, _, _ = load_artifacts(artifact_dir, mmap=mmap, with_vectorizer=False)
+        return NewsMetaStore.from_dataframe(news_all, all2idx)
+
+    with stage("load_news_meta"):
+        meta_cols = read_manifest(artifact_dir).get("meta_columns", [])
+        ids = load_string_column(artifact_dir, "news_id", mmap).to_list()
+        columns = {
+            f: load_string_column(artifact_dir, f"meta_{f}", mmap).to_list() if f in meta_cols else [""] * len(ids)
+            for f in META_FIELDS
+        }
+        for meta, _, _ in iter_segments(artifact_dir, set(ids), mmap=mmap):
+            ids.extend(meta["news_id"])
+            for f in META_FIELDS:
+                columns[f].extend(meta[f].fillna("").astype(str) if f in meta.columns else [""] * len(meta))
+        return NewsMetaStore(ids, columns)
+
+
+def load_normalized_matrix(artifact_dir: str):
+    """
+    X_all ternormalisasi L2 yang sudah tersimpan (format v2, mmap),
+    atau None untuk format lama (scorer akan menghitungnya sendiri).
+    """
+    if not is_v2_dir(artifact_dir):
+        return None
+
+    X_norm = load_normalized_matrix_v2(artifact_dir)
+    if list_segments(artifact_dir):
+        base_ids = load_string_column(artifact_dir, "news_id").to_list()
+        X_norm = merge_normalized_segments(artifact_dir, base_ids, X_norm)
+    return X_norm
+
+
+def load_matrices(artifact_dir: str, mmap: bool = True):
+    """
+    (X_all, X_norm) katalog (base + segment) saja, tanpa metadata, vectorizer
+    maupun metrics, mis. untuk worker evaluasi. X_norm None untuk format lama.
+    """
+    assert_artifacts_exist(artifact_dir)
+    with stage("load_matrices"):
+        if is_v2_dir(artifact_dir):
+            manifest = read_manifest(artifact_dir)
+            shape = (manifest["n_items"], manifest["n_terms"])
+            Xs = [load_matrix(artifact_dir, "X", shape, mmap)]
+            Xns = [load_normalized_matrix_v2(artifact_dir, mmap)]
+        else:
+            Xs, Xns = [sparse.load_npz(os.path.join(artifact_dir, "X_all_tfidf.npz"))], None
+
+        if list_segments(artifact_dir):
+            if is_v2_dir(artifact_dir):
+                base_ids = load_string_column(artifact_dir, "news_id", mmap).to_list()
+            else:
+                with open(os.path.join(artifact_dir, "all2idx.pkl"), "rb") as f:
+                    base_ids = list(pickle.load(f))
+            for _, X, Xn in iter_segments(artifact_dir, set(base_ids), mmap=mmap, meta_columns=()):
+                Xs.append(X)
+                if Xns is not None:
+                    Xns.append(Xn)
+
+        X_all = Xs[0] if len(Xs) == 1 else sparse.vstack(Xs, format="csr")
+        if Xns is None:
+            return X_all, None
+        return X_all, Xns[0] if len(Xns) == 1 else sparse.vstack(Xns, format="csr")
@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from artifact_store import catalog_fingerprint, load_string_column, save_string_column
+from behaviors_store import is_columnar_dir, load_columnar_behaviors
+from evaluation import ids_index, profile_weights
+from mind_io import BEH_COLS, iter_csv_chunks
+
+# Job batch offline: top-N untuk setiap user unik di behaviors log.
+# User di-dedup (history dari baris terakhir user tsb), dibagi menjadi shard
+# berurutan, lalu tiap shard di-score di process pool (worker memuat
+# artifacts sendiri via mmap, dibagi lewat page cache) dengan satu sparse
+# product per blok (CatalogScorer.topn_batch). Output per shard:
+#   shard_00000.npz : user_id (str), news_row (int32, -1 = kosong), score (float32)
+# ditambah news_id.* (kolom string katalog) dan job.json. Shard yang sudah
+# ada dilewati, jadi job yang terputus bisa dilanjutkan.
+JOB_MANIFEST = "job.json"
+JOB_FORMAT = "mind-cbr-batch-recs"
+
+
+def unique_user_histories(beh_path: str, all2idx, chunk_size: int = 50000):
+    """
+    Return (user_ids, hist_offsets, hist_items): satu history per user unik
+    (baris terakhir user di log), urut kemunculan pertama; item = row all2idx,
+    -1 = tidak dikenal. beh_path boleh csv/tsv atau folder behaviors kolumnar.
+    """
+    if is_columnar_dir(beh_path):
+        imps = load_columnar_behaviors(beh_path, all2idx)
+        users, offsets, items = imps.user_ids, imps.hist_offsets, imps.hist_items
+    else:
+        index = ids_index(all2idx)
+        user_parts, hist_parts = [], []
+        for chunk in iter_csv_chunks(beh_path, BEH_COLS, ["user_id", "history"], chunk_size):
+            user_parts.append(chunk["user_id"].to_numpy())
+            hist_parts.extend(chunk["history"].str.split().tolist())
+        users = np.concatenate(user_parts) if user_parts else np.empty(0, dtype=object)
+        offsets = np.zeros(len(hist_parts) + 1, dtype=np.int64)
+        np.cumsum([len(h) for h in hist_parts], out=offsets[1:])
+        flat = [n for h in hist_parts for n in h]
+        items = index.get_indexer(flat) if flat else np.empty(0, dtype=np.int64)
+
+    users = pd.Series(users, dtype=object)
+    codes, uniq = pd.factorize(users)
+    last = np.zeros(len(uniq), dtype=np.int64)
+    last[codes] = np.arange(len(codes))  # assignment berurutan: baris terakhir menang
+    return uniq.to_numpy(dtype=object), *_take_ragged(np.asarray(offsets), np.asarray(items), last)
+
+
+def _take_ragged(offsets, items, rows):
+    lens = np.diff(offsets)[rows]
+    new_off = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lens, out=new_off[1:])
+    idx = np.repeat(offsets[rows] - new_off[:-1], lens) + np.arange(new_off[-1])
+    return new_off, np.asarray(items, dtype=np.int32)[idx]
+
+
+def shard_path(out_dir: str, shard: int) -> str:
+    return os.path.join(out_dir, f"shard_{shard:05d}.npz")
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(artifact_dir, params, scorer=None):
+    if scorer is None:
+        from artifacts_loader import load_artifacts, load_normalized_matrix
+        from recommender import CatalogScorer
+
+        _, _, all2idx, X_all, _ = load_artifacts(artifact_dir, with_vectorizer=False, meta_columns=())
+        scorer = CatalogScorer(X_all, all2idx, X_norm=load_normalized_matrix(artifact_dir))
+    _WORKER_STATE.update(scorer=scorer, **params)
+
+
+def _shard_worker(shard: int, user_ids, offsets, items, out_dir: str):
+    s = _WORKER_STATE
+    scorer = s["scorer"]
+    t0 = time.perf_counter()
+
+    row, cols, w = profile_weights(offsets, items, s["weighted"])
+    W = sparse.csr_matrix((w, (row, cols)), shape=(len(user_ids), scorer.n_items))
+    rows, scores = scorer.topn_batch(W, top_n=s["top_n"], max_block_mb=s["max_block_mb"])
+    empty = ~np.isfinite(scores)
+    rows[empty] = -1
+    scores[empty] = 0.0
+
+    path = shard_path(out_dir, shard)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(
+            f,
+            user_id=np.asarray(user_ids, dtype=str),
+            news_row=rows.astype(np.int32),
+            score=scores.astype(np.float32),
+        )
+    os.replace(path + ".tmp", path)
+    return shard, len(user_ids), time.perf_counter() - t0
+
+
+def _write_manifest(out_dir: str, manifest: dict):
+    tmp = os.path.join(out_dir, JOB_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, JOB_MANIFEST))
+
+
+def run_batch_job(
+    artifact_dir: str,
+    beh_path: str,
+    out_dir: str,
+    top_n: int = 10,
+    weighted: bool = True,
+    shard_size: int = 20000,
+    workers: int = 1,
+    max_block_mb: int = 64,
+    overwrite: bool = False,
+    progress=None,
+) -> dict:
+    """
+    Tulis top-N untuk semua user unik beh_path ke out_dir (lihat header modul).
+    Jika out_dir berisi job dengan parameter sama, shard yang sudah selesai
+    dilewati; parameter berbeda -> ValueError kecuali overwrite=True.
+    progress: callback opsional progress(done_users, total_users, users_per_sec).
+    Return ringkasan job (juga disimpan di job.json).
+    """
+    from artifacts_loader import load_artifacts, load_normalized_matrix
+    from recommender import CatalogScorer
+
+    os.makedirs(out_dir, exist_ok=True)
+    t_start = time.perf_counter()
+    _, _, all2idx, X_all, _ = load_artifacts(artifact_dir, with_vectorizer=False, meta_columns=())
+    user_ids, offsets, items = unique_user_histories(beh_path, all2idx)
+    n_users = len(user_ids)
+    n_shards = -(-n_users // shard_size)
+
+    params = {"top_n": int(top_n), "weighted": bool(weighted), "max_block_mb": int(max_block_mb)}
+    manifest = {
+        "format": JOB_FORMAT,
+        "artifacts": os.path.abspath(artifact_dir),
+        "catalog_fingerprint": catalog_fingerprint(all2idx),
+        "behaviors": os.path.abspath(beh_path),
+        "n_users": n_users,
+        "shard_size": int(shard_size),
+        "n_shards": n_shards,
+        **params,
+    }
+    manifest_path = os.path.join(out_dir, JOB_MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        same = all(previous.get(k) == v for k, v in manifest.items())
+        if not same and not overwrite:
+            raise ValueError(f"{out_dir} berisi job dengan parameter berbeda; pakai overwrite untuk mengulang.")
+        if not same:
+            for name in os.listdir(out_dir):
+                if name.startswith("shard_"):
+                    os.remove(os.path.join(out_dir, name))
+    _write_manifest(out_dir, dict(manifest, status="running"))
+    save_string_column(out_dir, "news_id", ids_index(all2idx), [])
+
+    todo = [s for s in range(n_shards) if not os.path.exists(shard_path(out_dir, s))]
+    skipped_users = n_users - sum(min(shard_size, n_users - s * shard_size) for s in todo)
+
+    def task(s):
+        a, b = s * shard_size, min((s + 1) * shard_size, n_users)
+        h0, h1 = offsets[a], offsets[b]
+        return s, user_ids[a:b], offsets[a:b + 1] - h0, items[h0:h1], out_dir
+
+    t0 = time.perf_counter()
+    done = 0
+
+    def finished(n):
+        nonlocal done
+        done += n
+        if progress is not None:
+            progress(skipped_users + done, n_users, done / max(time.perf_counter() - t0, 1e-9))
+
+    if workers <= 1:
+        scorer = CatalogScorer(X_all, all2idx, X_norm=load_normalized_matrix(artifact_dir))
+        _init_worker(artifact_dir, params, scorer)
+        for s in todo:
+            finished(_shard_worker(*task(s))[1])
+    elif todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(artifact_dir, params)) as ex:
+            for fut in as_completed([ex.submit(_shard_worker, *task(s)) for s in todo]):
+                finished(fut.result()[1])
+
+    seconds = time.perf_counter() - t0
+    summary = dict(
+        manifest,
+        status="done",
+        resumed_users=skipped_users,
+        scored_users=done,
+        seconds=round(seconds, 3),
+        users_per_sec=round(done / seconds, 1) if done else 0.0,
+        total_seconds=round(time.perf_counter() - t_start, 3),
+    )
+    _write_manifest(out_dir, summary)
+    return summary
+
+
+def load_batch_results(out_dir: str):
+    """
+    Gabungkan semua shard: return (user_ids, news_ids, scores) dengan
+    news_ids/scores berukuran (n_users x top_n); slot kosong = "" / 0.
+    """
+    with open(os.path.join(out_dir, JOB_MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    # elemen "" di akhir: news_row -1 (slot kosong) terpetakan ke ""
+    catalog = np.asarray(load_string_column(out_dir, "news_id").to_list() + [""], dtype=object)
+    users, rows, scores = [], [], []
+    for s in range(manifest["n_shards"]):
+        with np.load(shard_path(out_dir, s), allow_pickle=False) as z:
+            users.append(z["user_id"])
+            rows.append(z["news_row"])
+            scores.append(z["score"])
+    if not users:
+        return np.empty(0, dtype=object), np.empty((0, 0), dtype=object), np.empty((0, 0), dtype=np.float32)
+    return np.concatenate(users).astype(object), catalog[np.concatenate(rows)], np.concatenate(scores)
@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import catalog_fingerprint, load_string_column, save_string_column
+from evaluation import Impressions, ids_index, parse_behaviors
+from mind_io import BEH_COLS, iter_csv_chunks
+
+# Format kolumnar behaviors: history & impressions sebagai ragged array
+# (offsets + row all2idx + label), ditulis per chunk sehingga memori tetap datar.
+FORMAT_NAME = "mind-behaviors-columnar"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+TIME_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+
+class NpyStreamWriter:
+    """
+    Tulis array 1-D ke .npy secara bertahap: data di-append ke file mentah,
+    header .npy baru ditulis saat close() ketika panjang akhirnya diketahui.
+    """
+
+    def __init__(self, path: str, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._raw = open(path + ".raw", "wb")
+
+    def append(self, arr):
+        arr = np.ascontiguousarray(arr, dtype=self.dtype)
+        self._raw.write(arr.tobytes())
+        self.length += len(arr)
+
+    def close(self):
+        self._raw.close()
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False,
+                  "shape": (self.length,)}
+        with open(self.path + ".tmp", "wb") as out, open(self.path + ".raw", "rb") as raw:
+            np.lib.format.write_array_header_2_0(out, header)
+            shutil.copyfileobj(raw, out, length=16 * 1024 * 1024)
+        os.replace(self.path + ".tmp", self.path)
+        os.remove(self.path + ".raw")
+
+
+def convert_behaviors_columnar(beh_path: str, out_dir: str, all2idx, chunk_size: int = 100000) -> dict:
+    """
+    Stream behaviors.tsv/csv -> folder kolumnar. Return manifest.
+    news_id yang tidak ada di all2idx disimpan sebagai -1.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    index = ids_index(all2idx)
+
+    specs = {
+        "impression_id": np.int64, "user_code": np.int32, "time": np.int64,
+        "hist_offsets": np.int64, "hist_items": np.int32,
+        "cand_offsets": np.int64, "cand_items": np.int32, "labels": np.int8,
+    }
+    w = {k: NpyStreamWriter(os.path.join(out_dir, f"{k}.npy"), dt) for k, dt in specs.items()}
+    w["hist_offsets"].append([0])
+    w["cand_offsets"].append([0])
+
+    users = {}
+    n_imp = n_hist = n_cand = 0
+    unknown_hist = unknown_cand = 0
+
+    for chunk in iter_csv_chunks(beh_path, BEH_COLS, chunksize=chunk_size):
+        imps = parse_behaviors(chunk, index)
+
+        w["impression_id"].append(pd.to_numeric(chunk["impression_id"], errors="coerce").fillna(-1).to_numpy())
+        codes = pd.Series(chunk["user_id"].to_numpy()).map(lambda u: users.setdefault(u, len(users)))
+        w["user_code"].append(codes.to_numpy())
+        t = pd.to_datetime(chunk["time"], format=TIME_FORMAT, errors="coerce")
+        w["time"].append(np.where(t.isna(), -1, t.to_numpy().astype("datetime64[s]").astype(np.int64)))
+
+        w["hist_offsets"].append(imps.hist_offsets[1:] + n_hist)
+        w["hist_items"].append(imps.hist_items)
+        w["cand_offsets"].append(imps.cand_offsets[1:] + n_cand)
+        w["cand_items"].append(imps.cand_items)
+        w["labels"].append(imps.labels)
+
+        n_imp += len(imps)
+        n_hist += len(imps.hist_items)
+        n_cand += len(imps.cand_items)
+        unknown_hist += int((imps.hist_items < 0).sum())
+        unknown_cand += int((imps.cand_items < 0).sum())
+
+    for writer in w.values():
+        writer.close()
+
+    files = [f"{k}.npy" for k in specs]
+    user_list = [None] * len(users)
+    for u, code in users.items():
+        user_list[code] = u
+    save_string_column(out_dir, "users", user_list, files)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "source": os.path.basename(beh_path),
+        "n_impressions": n_imp,
+        "n_history": n_hist,
+        "n_candidates": n_cand,
+        "n_users": len(users),
+        "unknown_history": unknown_hist,
+        "unknown_candidates": unknown_cand,
+        "n_items": len(all2idx),
+        "catalog_fingerprint": catalog_fingerprint(all2idx),
+        "files": files,
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def is_columnar_dir(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST))
+
+
+def read_columnar_manifest(path: str) -> dict:
+    with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"Bukan behaviors kolumnar: {path}")
+    return manifest
+
+
+def load_columnar_behaviors(path: str, all2idx=None, mmap: bool = True) -> Impressions:
+    """
+    Muat behaviors kolumnar sebagai Impressions (array di-mmap).
+    Jika all2idx diberikan, dicek bahwa katalognya sama dengan saat konversi.
+    """
+    manifest = read_columnar_manifest(path)
+    if all2idx is not None and (
+        manifest["n_items"] != len(all2idx)
+        or manifest["catalog_fingerprint"] != catalog_fingerprint(all2idx)
+    ):
+        raise ValueError(
+            "Behaviors kolumnar dibuat dengan katalog (all2idx) yang berbeda; "
+            "jalankan ulang konversi dengan artifacts saat ini."
+        )
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+
+    users = np.asarray(load_string_column(path, "users", mmap).to_list(), dtype=object)
+    return Impressions(
+        users[np.asarray(load("user_code"))] if len(users) else np.empty(0, dtype=object),
+        load("hist_offsets"),
+        load("hist_items"),
+        load("cand_offsets"),
+        load("cand_items"),
+        load("labels"),
+    )
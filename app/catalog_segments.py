@@ -0,0 +1,187 @@
+import json
+import os
+import pickle
+import shutil
+
+import pandas as pd
+from scipy import sparse
+
+from artifact_store import (
+    DEFAULT_META_COLUMNS,
+    META_COLUMNS,
+    is_v2_dir,
+    load_segment,
+    load_string_column,
+    save_artifacts_v2,
+    save_segment,
+)
+
+# Berita baru ditambahkan sebagai segment (folder format v2 kecil) di
+# <artifact_dir>/segments/, tanpa fit ulang TF-IDF. segments.json mencatat
+# urutannya; compact_segments() menggabungkan semuanya ke artifacts utama.
+SEGMENTS_DIR = "segments"
+SEGMENTS_INDEX = "segments.json"
+
+
+def build_text(title, abstract, use_abstract: bool = True):
+    """Sama dengan build_text di notebook: title (+ abstract), di-strip."""
+    if use_abstract:
+        return [(str(t) + " " + str(a)).strip() for t, a in zip(title, abstract)]
+    return [str(t).strip() for t in title]
+
+
+def list_segments(artifact_dir: str):
+    path = os.path.join(artifact_dir, SEGMENTS_INDEX)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["segments"]
+
+
+def _write_index(artifact_dir: str, segments):
+    path = os.path.join(artifact_dir, SEGMENTS_INDEX)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"segments": segments}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def iter_segments(artifact_dir: str, known_ids, mmap: bool = True, meta_columns=DEFAULT_META_COLUMNS):
+    """
+    Yield (meta_df, X, X_norm) per segment, urut sesuai segments.json.
+    ID yang sudah dikenal (mis. sisa compaction yang terputus) dilewati;
+    known_ids (set) ikut diperbarui.
+    """
+    for name in list_segments(artifact_dir):
+        ids, meta, X, Xn = load_segment(
+            os.path.join(artifact_dir, SEGMENTS_DIR, name), mmap=mmap, meta_columns=meta_columns
+        )
+        keep = [j for j, nid in enumerate(ids) if nid not in known_ids]
+        if len(keep) < len(ids):
+            meta, X, Xn = meta.iloc[keep].reset_index(drop=True), X[keep], Xn[keep]
+        known_ids.update(meta["news_id"])
+        yield meta, X, Xn
+
+
+def catalog_ids(artifact_dir: str):
+    """
+    Semua news_id katalog (base + segment) dengan urutan row yang sama seperti
+    merge_segments, tanpa memuat matrix maupun metadata.
+    """
+    if is_v2_dir(artifact_dir):
+        ids = load_string_column(artifact_dir, "news_id").to_list()
+    else:
+        with open(os.path.join(artifact_dir, "all2idx.pkl"), "rb") as f:
+            ids = list(pickle.load(f))
+    for name in list_segments(artifact_dir):
+        ids.extend(load_string_column(os.path.join(artifact_dir, SEGMENTS_DIR, name), "news_id").to_list())
+    return list(dict.fromkeys(ids))
+
+
+def merge_segments(
+    artifact_dir: str, news_all, all2idx, X_all, mmap: bool = True, meta_columns=DEFAULT_META_COLUMNS
+):
+    """
+    Gabungkan base + semua segment menjadi satu katalog.
+    Return (news_all, all2idx, X_all).
+    """
+    if not list_segments(artifact_dir):
+        return news_all, all2idx, X_all
+
+    all2idx = dict(all2idx)
+    metas, Xs = [news_all], [X_all]
+    for meta, X, _ in iter_segments(artifact_dir, set(all2idx), mmap=mmap, meta_columns=meta_columns):
+        for nid in meta["news_id"]:
+            all2idx[nid] = len(all2idx)
+        metas.append(meta)
+        Xs.append(X)
+
+    news_all = pd.concat(metas, ignore_index=True)
+    return news_all, all2idx, sparse.vstack(Xs, format="csr")
+
+
+def merge_normalized_segments(artifact_dir: str, base_ids, X_norm, mmap: bool = True):
+    """Versi merge_segments untuk X_all ternormalisasi."""
+    if not list_segments(artifact_dir):
+        return X_norm
+    parts = [X_norm] + [Xn for _, _, Xn in iter_segments(artifact_dir, set(base_ids), mmap=mmap, meta_columns=())]
+    return sparse.vstack(parts, format="csr")
+
+
+def append_news(artifact_dir: str, news_df, use_abstract: bool = True) -> dict:
+    """
+    Transform hanya berita baru dengan vectorizer yang sudah ada,
+    lalu tulis sebagai segment baru. Biaya sebanding dengan jumlah berita baru.
+    Jika ada tabel tetangga (item_knn) / index ANN, tetangga dan embedding
+    berita baru dihitung di sini sekali dan disimpan, bukan di setiap proses
+    saat load.
+    """
+    from artifacts_loader import load_vectorizer
+
+    known = set(catalog_ids(artifact_dir))
+    news_df = news_df.drop_duplicates("news_id")
+    news_df = news_df[~news_df["news_id"].isin(known)].reset_index(drop=True)
+    if news_df.empty:
+        return {"segment": None, "added": 0}
+
+    X_new = load_vectorizer(artifact_dir).transform(
+        build_text(news_df["title"], news_df.get("abstract", [""] * len(news_df)), use_abstract)
+    )
+
+    segments = list_segments(artifact_dir)
+    name = f"seg_{len(segments) + 1:06d}"
+    while os.path.exists(os.path.join(artifact_dir, SEGMENTS_DIR, name)):
+        name += "_"
+    cols = ["news_id"] + [c for c in META_COLUMNS if c in news_df.columns]
+    save_segment(os.path.join(artifact_dir, SEGMENTS_DIR, name), news_df["news_id"].tolist(), news_df[cols], X_new)
+    _write_index(artifact_dir, segments + [name])
+    out = {"segment": name, "added": len(news_df)}
+
+    from ann_index import extend_ann_index, has_ann_index
+    from item_neighbors import extend_item_neighbors, has_item_neighbors
+
+    if has_item_neighbors(artifact_dir) or has_ann_index(artifact_dir):
+        from artifacts_loader import load_artifacts, load_normalized_matrix
+        from recommender import l2_normalize_rows
+
+        X_norm = load_normalized_matrix(artifact_dir)
+        if X_norm is None:
+            X_norm = l2_normalize_rows(load_artifacts(artifact_dir, with_vectorizer=False, meta_columns=())[3])
+        all2idx = {nid: i for i, nid in enumerate(catalog_ids(artifact_dir))}
+        out["neighbors_added"] = extend_item_neighbors(artifact_dir, X_norm, all2idx)
+        out["ann_added"] = extend_ann_index(artifact_dir, X_norm, all2idx)
+    return out
+
+
+def compact_segments(artifact_dir: str) -> dict:
+    """
+    Tulis ulang artifacts utama (format yang sudah ada: lama dan/atau v2)
+    berisi base + semua segment, lalu hapus segment. news_all.pkl lama
+    dipertahankan apa adanya (semua kolom/baris aslinya); hanya baris
+    berita dari segment yang ditambahkan.
+    """
+    from artifacts_loader import LEGACY_FILES, load_artifacts
+
+    segments = list_segments(artifact_dir)
+    if not segments:
+        return {"merged_segments": 0}
+
+    vectorizer, news_all, all2idx, X_all, metrics = load_artifacts(artifact_dir, mmap=False, meta_columns=None)
+
+    has_legacy = all(os.path.exists(os.path.join(artifact_dir, f)) for f in LEGACY_FILES)
+    if is_v2_dir(artifact_dir):
+        save_artifacts_v2(artifact_dir, vectorizer, news_all, all2idx, X_all, metrics)
+    if has_legacy:
+        with open(os.path.join(artifact_dir, "news_all.pkl"), "rb") as f:
+            legacy = pickle.load(f)
+        added = news_all[~news_all["news_id"].isin(set(legacy["news_id"]))]
+        legacy = pd.concat([legacy, added], ignore_index=True)
+        with open(os.path.join(artifact_dir, "news_all.pkl"), "wb") as f:
+            pickle.dump(legacy, f)
+        with open(os.path.join(artifact_dir, "all2idx.pkl"), "wb") as f:
+            pickle.dump(all2idx, f)
+        sparse.save_npz(os.path.join(artifact_dir, "X_all_tfidf.npz"), X_all)
+
+    os.remove(os.path.join(artifact_dir, SEGMENTS_INDEX))
+    shutil.rmtree(os.path.join(artifact_dir, SEGMENTS_DIR), ignore_errors=True)
+    return {"merged_segments": len(segments), "n_items": X_all.shape[0]}
@@ -0,0 +1,150 @@
+import numpy as np
+from scipy import sparse
+
+PRECISION_MODES = ("float64", "float32", "int8")
+
+
+def smallest_index_dtype(n_cols: int):
+    """dtype index kolom terkecil yang muat (uint16 untuk vocab <= 65536)."""
+    if n_cols <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.int32 if n_cols <= np.iinfo(np.int32).max else np.int64
+
+
+class CompactMatrix:
+    """
+    Salinan X_all ternormalisasi dengan presisi lebih kecil untuk scoring:
+      float32 : data float32
+      int8    : data uint8 (bobot TF-IDF selalu >= 0) + skala per baris,
+                bobot asli ~= data * row_scale[row]
+    Index kolom memakai dtype terkecil yang muat.
+    """
+
+    def __init__(self, data, indices, indptr, shape, mode: str, row_scale=None):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = tuple(shape)
+        self.mode = mode
+        self.row_scale = row_scale
+
+    @classmethod
+    def from_csr(cls, X_norm, mode: str = "float32") -> "CompactMatrix":
+        if mode not in ("float32", "int8"):
+            raise ValueError(f"mode tidak dikenal: {mode} (pilihan: float32, int8)")
+
+        X = sparse.csr_matrix(X_norm)
+        X.sort_indices()
+        indices = X.indices.astype(smallest_index_dtype(X.shape[1]))
+        indptr = X.indptr.astype(np.int32 if X.nnz <= np.iinfo(np.int32).max else np.int64)
+
+        if mode == "float32":
+            return cls(X.data.astype(np.float32), indices, indptr, X.shape, mode)
+
+        lens = np.diff(X.indptr)
+        row_max = np.zeros(X.shape[0], dtype=np.float64)
+        nonempty = lens > 0
+        row_max[nonempty] = np.maximum.reduceat(X.data, X.indptr[:-1][nonempty])
+        row_scale = (row_max / 255.0).astype(np.float32)
+        safe = np.where(row_scale > 0, row_scale, 1.0).astype(np.float64)
+        q = np.rint(X.data / np.repeat(safe, lens))
+        data = np.clip(q, 0, 255).astype(np.uint8)
+        return cls(data, indices, indptr, X.shape, mode, row_scale)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        extra = self.row_scale.nbytes if self.row_scale is not None else 0
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes + extra
+
+    # batas nnz per potongan baris di matvec: temporary per query ~CHUNK_NNZ
+    # float32, bukan sebesar nnz seluruh katalog
+    CHUNK_NNZ = 1 << 18
+
+    def _chunks(self):
+        """Batas potongan baris [r0, r1) dengan nnz <= CHUNK_NNZ (kecuali satu baris panjang)."""
+        chunks = getattr(self, "_chunk_bounds", None)
+        if chunks is None:
+            cuts = np.searchsorted(self.indptr, np.arange(self.CHUNK_NNZ, self.nnz, self.CHUNK_NNZ), side="right") - 1
+            chunks = np.unique(np.concatenate([[0], cuts, [self.shape[0]]])).astype(np.int64)
+            self._chunk_bounds = chunks
+        return chunks
+
+    def matvec(self, q):
+        """Skor semua baris terhadap vektor dense q (1-D)."""
+        q = np.asarray(q, dtype=np.float32).ravel()
+        if self.mode == "float32" and self.indices.dtype == np.int32:
+            X = sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape, copy=False)
+            return X @ q
+
+        scores = np.zeros(self.shape[0], dtype=np.float64)
+        bounds = self._chunks()
+        for r0, r1 in zip(bounds[:-1], bounds[1:]):
+            lo, hi = int(self.indptr[r0]), int(self.indptr[r1])
+            if lo == hi:
+                continue
+            prod = self.data[lo:hi] * q[self.indices[lo:hi]]
+            starts = self.indptr[r0:r1] - lo
+            nonempty = np.flatnonzero(np.diff(self.indptr[r0:r1 + 1]))
+            # reduceat per baris non-kosong: segmen berakhir di awal baris non-kosong berikutnya
+            scores[r0 + nonempty] = np.add.reduceat(prod, starts[nonempty], dtype=np.float64)
+        if self.row_scale is not None:
+            scores *= self.row_scale
+        return scores
+
+    def score_profiles(self, UT):
+        """
+        Skor banyak profil sekaligus: (X @ UT).T dense (n_profiles x n_rows),
+        UT sparse (n_cols x n_profiles). Di-dequantize per potongan baris
+        (lihat _chunks), jadi CSR float32 sementara hanya sebesar satu potongan.
+        """
+        out = np.zeros((UT.shape[1], self.shape[0]), dtype=np.float64)
+        bounds = self._chunks()
+        for r0, r1 in zip(bounds[:-1], bounds[1:]):
+            if self.indptr[r1] > self.indptr[r0]:
+                out[:, r0:r1] = (self.row_block(r0, r1).to_csr() @ UT).T.toarray()
+        return out
+
+    def to_csc(self):
+        """
+        Matrix sebagai CSC float32 (di-dequantize), mis. postings InvertedIndex.
+        CSR perantara hanya sementara (tidak disimpan).
+        """
+        return self.to_csr().tocsc()
+
+    def to_csr(self):
+        """Seluruh matrix sebagai CSR float32 (sudah di-dequantize)."""
+        data = self.data.astype(np.float32)
+        if self.row_scale is not None:
+            data *= np.repeat(self.row_scale, np.diff(self.indptr))
+        return sparse.csr_matrix(
+            (data, self.indices.astype(np.int32), self.indptr.astype(np.int32, copy=False)), shape=self.shape
+        )
+
+    def row_block(self, start: int, stop: int) -> "CompactMatrix":
+        """Baris [start, stop) sebagai view (tanpa salin data), mis. untuk shard scoring."""
+        lo, hi = int(self.indptr[start]), int(self.indptr[stop])
+        return CompactMatrix(
+            self.data[lo:hi], self.indices[lo:hi], self.indptr[start:stop + 1] - lo,
+            (stop - start, self.shape[1]), self.mode,
+            None if self.row_scale is None else self.row_scale[start:stop],
+        )
+
+    def __getitem__(self, rows):
+        """Baris terpilih sebagai CSR float32 (sudah di-dequantize)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows].astype(np.int64)
+        lens = (self.indptr[rows + 1] - self.indptr[rows]).astype(np.int64)
+        new_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lens, out=new_ptr[1:])
+        idx = np.repeat(starts - new_ptr[:-1], lens) + np.arange(new_ptr[-1])
+
+        data = self.data[idx].astype(np.float32)
+        if self.row_scale is not None:
+            data *= np.repeat(self.row_scale[rows], lens)
+        return sparse.csr_matrix(
+            (data, self.indices[idx].astype(np.int32), new_ptr), shape=(len(rows), self.shape[1])
+        )
@@ -0,0 +1,61 @@
+import numpy as np
+from scipy import sparse
+
+
+def mmr_rerank(
+    X_rows,
+    relevance,
+    top_n: int = 10,
+    lambda_: float = 0.7,
+    categories=None,
+    max_per_category: int = None,
+):
+    """
+    Maximal Marginal Relevance atas shortlist.
+    X_rows    : baris TF-IDF ternormalisasi L2 untuk shortlist (sparse/dense)
+    relevance : skor relevansi shortlist (cosine ke profil)
+    Tiap langkah memilih argmax(lambda * rel - (1 - lambda) * max_sim), dengan
+    max_sim = similarity maksimum ke item yang sudah terpilih; max_sim di-update
+    secara vektor dari satu baris matrix Gram shortlist.
+    categories + max_per_category: batas jumlah item per kategori; jika semua
+    kategori di shortlist sudah penuh, sisa slot diisi tanpa batas.
+    Return posisi (indeks ke shortlist) sesuai urutan terpilih. Deterministik:
+    seri dipecah oleh posisi shortlist (yang lebih relevan lebih dulu).
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    n = len(relevance)
+    if n == 0 or top_n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    G = X_rows @ X_rows.T
+    G = G.toarray() if sparse.issparse(G) else np.asarray(G)
+
+    if categories is not None and max_per_category:
+        _, cat_code = np.unique(np.asarray(categories, dtype=object).astype(str), return_inverse=True)
+        cat_left = np.full(cat_code.max() + 1, int(max_per_category))
+    else:
+        cat_code = None
+
+    max_sim = np.zeros(n, dtype=np.float64)
+    valid = np.isfinite(relevance)
+    available = valid.copy()
+    picked = []
+    while len(picked) < top_n:
+        gain = np.where(available, lambda_ * relevance - (1.0 - lambda_) * max_sim, -np.inf)
+        j = int(np.argmax(gain))
+        if not np.isfinite(gain[j]):
+            if cat_code is None:
+                break
+            cat_code = None
+            available = valid.copy()
+            available[picked] = False
+            continue
+        picked.append(j)
+        available[j] = False
+        np.maximum(max_sim, G[j], out=max_sim)
+        if cat_code is not None:
+            cat_left[cat_code[j]] -= 1
+            if cat_left[cat_code[j]] == 0:
+                available &= cat_code != cat_code[j]
+
+    return np.asarray(picked, dtype=np.int64)
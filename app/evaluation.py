@@ -0,0 +1,443 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from mind_io import BEH_COLS, iter_csv_chunks
+
+# Evaluasi offline (klasifikasi relevan / tidak relevan) dari behaviors MIND:
+# parsing impressions secara bulk, scoring per chunk dengan operasi sparse
+# batch (bisa dibagi ke process pool), dan sweep threshold dalam satu pass.
+
+
+class Impressions:
+    """
+    Sekumpulan impression dalam bentuk ragged array:
+      hist_offsets/hist_items   : history per impression (row all2idx, -1 = tidak dikenal)
+      cand_offsets/cand_items   : kandidat per impression (row all2idx, -1 = tidak dikenal)
+      labels                    : label klik per kandidat (0/1)
+    """
+
+    def __init__(self, user_ids, hist_offsets, hist_items, cand_offsets, cand_items, labels):
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.hist_offsets = np.asarray(hist_offsets, dtype=np.int64)
+        self.hist_items = np.asarray(hist_items, dtype=np.int32)
+        self.cand_offsets = np.asarray(cand_offsets, dtype=np.int64)
+        self.cand_items = np.asarray(cand_items, dtype=np.int32)
+        self.labels = np.asarray(labels, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.hist_offsets) - 1
+
+    def slice(self, start: int, stop: int) -> "Impressions":
+        h0, h1 = self.hist_offsets[start], self.hist_offsets[stop]
+        c0, c1 = self.cand_offsets[start], self.cand_offsets[stop]
+        return Impressions(
+            self.user_ids[start:stop],
+            self.hist_offsets[start:stop + 1] - h0,
+            self.hist_items[h0:h1],
+            self.cand_offsets[start:stop + 1] - c0,
+            self.cand_items[c0:c1],
+            self.labels[c0:c1],
+        )
+
+    def n_candidates(self):
+        return np.diff(self.cand_offsets)
+
+
+def _ragged(lists):
+    lens = np.fromiter((len(x) for x in lists), dtype=np.int64, count=len(lists))
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(lens, out=offsets[1:])
+    return offsets, list(chain.from_iterable(lists))
+
+
+def parse_behaviors(beh_df, id_index: pd.Index) -> Impressions:
+    """
+    Parse kolom history/impressions secara bulk.
+    id_index: pd.Index news_id sesuai urutan row all2idx (lihat ids_index).
+    Token impression tanpa '-' atau dengan label tidak valid dibuang,
+    sama seperti parse_impressions di notebook.
+    """
+    hist_offsets, hist_flat = _ragged(beh_df["history"].str.split().tolist())
+    hist_items = id_index.get_indexer(hist_flat) if hist_flat else np.empty(0, dtype=np.int64)
+
+    imp_offsets, toks = _ragged(beh_df["impressions"].str.split().tolist())
+    toks = pd.Series(toks, dtype=object)
+    parts = toks.str.rsplit("-", n=1, expand=True) if len(toks) else pd.DataFrame(columns=[0, 1])
+    if parts.shape[1] < 2:
+        parts[1] = None
+    labels = pd.to_numeric(parts[1], errors="coerce")
+    valid = labels.notna().to_numpy()
+
+    row_of_tok = np.repeat(np.arange(len(beh_df)), np.diff(imp_offsets))
+    cand_offsets = np.zeros(len(beh_df) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_of_tok[valid], minlength=len(beh_df)), out=cand_offsets[1:])
+
+    cand_ids = parts[0].to_numpy()[valid]
+    cand_items = id_index.get_indexer(cand_ids) if len(cand_ids) else np.empty(0, dtype=np.int64)
+
+    return Impressions(
+        beh_df["user_id"].to_numpy(),
+        hist_offsets,
+        hist_items,
+        cand_offsets,
+        cand_items,
+        labels.to_numpy()[valid].astype(np.int8),
+    )
+
+
+def ids_index(all2idx) -> pd.Index:
+    ids = np.empty(len(all2idx), dtype=object)
+    for nid, i in all2idx.items():
+        ids[i] = nid
+    return pd.Index(ids)
+
+
+def profile_weights(offsets, items, weighted: bool = True):
+    """
+    Bobot history per item (hanya item dikenal), sama dengan build_user_profile:
+    linspace(1, 2, n) untuk mode weighted, lalu dibagi jumlah bobot.
+    Return (row, item, weight) untuk membentuk matrix W.
+    """
+    row = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    known = items >= 0
+    row, items = row[known], items[known]
+
+    n = np.bincount(row, minlength=len(offsets) - 1)
+    start = np.concatenate([[0], np.cumsum(n)[:-1]])
+    if weighted:
+        rank = np.arange(len(row)) - start[row]
+        denom = np.maximum(n[row] - 1, 1)
+        w = (1.0 + rank / denom).astype(np.float32).astype(np.float64)
+    else:
+        w = np.ones(len(row), dtype=np.float64)
+
+    wsum = np.bincount(row, weights=w, minlength=len(offsets) - 1)
+    return row, items, w / wsum[row]
+
+
+def score_impressions(imps: Impressions, X_all, X_norm, weighted: bool = True, block_size: int = 256):
+    """
+    Cosine similarity tiap kandidat terhadap profil user impression-nya.
+    Profil semua impression = W @ X_all (satu sparse product); per blok impression
+    skor dihitung hanya dari nnz baris kandidat: tiap (impression, term) kandidat
+    dicari di nnz profil blok (key row * n_terms + term, searchsorted), tanpa
+    densify profil (blok x n_terms). Kandidat tidak dikenal / user tanpa history
+    dikenal -> 0.
+    """
+    from scipy import sparse
+    from recommender import l2_normalize_rows
+
+    n_imp = len(imps)
+    scores = np.zeros(len(imps.cand_items), dtype=np.float64)
+    if n_imp == 0 or len(scores) == 0:
+        return scores
+
+    row, items, w = profile_weights(imps.hist_offsets, imps.hist_items, weighted)
+    W = sparse.csr_matrix((w, (row, items)), shape=(n_imp, X_all.shape[0]))
+    Un = l2_normalize_rows(W @ X_all)
+
+    n_terms = Un.shape[1]
+    cand_imp = np.repeat(np.arange(n_imp), imps.n_candidates())
+    for start in range(0, n_imp, block_size):
+        stop = min(start + block_size, n_imp)
+        c0, c1 = imps.cand_offsets[start], imps.cand_offsets[stop]
+        items_b = imps.cand_items[c0:c1]
+        known = np.flatnonzero(items_b >= 0)
+        if len(known) == 0:
+            continue
+
+        Ub = Un[start:stop]
+        Ub.sort_indices()
+        if Ub.nnz == 0:
+            continue
+        u_keys = np.repeat(np.arange(stop - start, dtype=np.int64), np.diff(Ub.indptr)) * n_terms + Ub.indices
+        Xc = X_norm[items_b[known]]
+        local = np.repeat(cand_imp[c0:c1][known] - start, np.diff(Xc.indptr))
+        keys = local.astype(np.int64) * n_terms + Xc.indices
+        pos = np.minimum(np.searchsorted(u_keys, keys), len(u_keys) - 1)
+        vals = np.where(u_keys[pos] == keys, Xc.data * Ub.data[pos], 0.0)
+        pair = np.repeat(np.arange(len(known)), np.diff(Xc.indptr))
+        scores[c0 + known] = np.bincount(pair, weights=vals, minlength=len(known))
+
+    return scores
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(artifact_dir, X_all, X_norm, weighted):
+    if artifact_dir is not None:
+        from artifacts_loader import load_matrices
+
+        X_all, X_norm = load_matrices(artifact_dir)
+    if X_norm is None:
+        from recommender import l2_normalize_rows
+
+        X_norm = l2_normalize_rows(X_all)
+    _WORKER_STATE.update(X_all=X_all, X_norm=X_norm, weighted=weighted)
+
+
+def _score_worker(imps):
+    s = _WORKER_STATE
+    return score_impressions(imps, s["X_all"], s["X_norm"], s["weighted"])
+
+
+def iter_impression_chunks(beh_path: str, all2idx, chunk_size: int = 20000, max_impressions: int = None):
+    """
+    Stream behaviors per chunk dan parse menjadi Impressions.
+    beh_path boleh berupa file csv/tsv atau folder behaviors kolumnar
+    (lihat behaviors_store); yang terakhir tidak perlu parsing ulang.
+    Hanya impression yang punya kandidat yang dihitung (seperti notebook).
+    """
+    from behaviors_store import is_columnar_dir, load_columnar_behaviors
+
+    if is_columnar_dir(beh_path):
+        everything = load_columnar_behaviors(beh_path, all2idx)
+        source = (everything.slice(i, min(i + chunk_size, len(everything)))
+                  for i in range(0, len(everything), chunk_size))
+    else:
+        index = ids_index(all2idx)
+        source = (parse_behaviors(chunk, index) for chunk in
+                  iter_csv_chunks(beh_path, BEH_COLS, ["user_id", "history", "impressions"], chunk_size))
+
+    used = 0
+    for imps in source:
+        keep = np.flatnonzero(imps.n_candidates() > 0)
+        if max_impressions is not None:
+            keep = keep[: max_impressions - used]
+        if len(keep) < len(imps):
+            imps = _take(imps, keep)
+        used += len(imps)
+        yield imps
+        if max_impressions is not None and used >= max_impressions:
+            return
+
+
+def _take(imps: Impressions, rows) -> Impressions:
+    def gather(offsets, values):
+        lens = np.diff(offsets)[rows]
+        new_off = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lens, out=new_off[1:])
+        idx = np.repeat(offsets[rows] - new_off[:-1], lens) + np.arange(new_off[-1])
+        return new_off, idx
+
+    h_off, h_idx = gather(imps.hist_offsets, imps.hist_items)
+    c_off, c_idx = gather(imps.cand_offsets, imps.cand_items)
+    return Impressions(
+        imps.user_ids[rows], h_off, imps.hist_items[h_idx],
+        c_off, imps.cand_items[c_idx], imps.labels[c_idx],
+    )
+
+
+def score_behaviors(
+    beh_path: str,
+    X_all,
+    all2idx,
+    X_norm=None,
+    weighted: bool = True,
+    max_impressions: int = None,
+    workers: int = 1,
+    chunk_size: int = 20000,
+    artifact_dir: str = None,
+):
+    """
+    Return (y_true, y_score, impressions_used) untuk seluruh (atau max_impressions)
+    impression di file behaviors. Dengan workers > 1, chunk di-score di process pool;
+    jika artifact_dir diberikan, worker memuat artifacts sendiri (mmap v2 dibagi
+    lewat page cache) alih-alih menerima salinan matrix.
+    """
+    chunks = iter_impression_chunks(beh_path, all2idx, chunk_size, max_impressions)
+    y_true, y_score = [], []
+    used = 0
+
+    if workers <= 1:
+        _init_worker(None, X_all, X_norm, weighted)
+        for imps in chunks:
+            y_true.append(imps.labels)
+            y_score.append(_score_worker(imps))
+            used += len(imps)
+    else:
+        init_args = (artifact_dir, None, None, weighted) if artifact_dir else (None, X_all, X_norm, weighted)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as ex:
+            pending = deque()
+            for imps in chunks:
+                pending.append((imps.labels, ex.submit(_score_worker, imps)))
+                used += len(imps)
+                while len(pending) > 2 * workers:
+                    labels, fut = pending.popleft()
+                    y_true.append(labels)
+                    y_score.append(fut.result())
+            for labels, fut in pending:
+                y_true.append(labels)
+                y_score.append(fut.result())
+
+    if not y_true:
+        return np.empty(0, dtype=int), np.empty(0, dtype=float), 0
+    return np.concatenate(y_true).astype(int), np.concatenate(y_score), used
+
+
+def threshold_sweep(y_true, y_score, thresholds=None) -> pd.DataFrame:
+    """
+    Precision/recall/F1/accuracy untuk semua threshold (prediksi = skor >= thr)
+    dari satu kali sort + cumulative sum, tanpa memanggil sklearn per threshold.
+    """
+    if thresholds is None:
+        thresholds = np.linspace(0, 1, 201)
+    thresholds = np.asarray(thresholds, dtype=float)
+
+    y_true = np.asarray(y_true).astype(int)
+    y_score = np.asarray(y_score, dtype=float)
+    order = np.argsort(y_score, kind="stable")
+    s_sorted = y_score[order]
+    pos_suffix = np.concatenate([np.cumsum(y_true[order][::-1])[::-1], [0]])
+
+    n = len(y_true)
+    n_pos = int(y_true.sum())
+    first = np.searchsorted(s_sorted, thresholds, side="left")
+    pred_pos = n - first
+    tp = pos_suffix[first]
+    fp = pred_pos - tp
+    fn = n_pos - tp
+    tn = n - tp - fp - fn
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(pred_pos > 0, tp / np.maximum(pred_pos, 1), 0.0)
+        recall = np.where(n_pos > 0, tp / max(n_pos, 1), 0.0)
+        denom = 2 * tp + fp + fn
+        f1 = np.where(denom > 0, 2 * tp / np.maximum(denom, 1), 0.0)
+    acc = (tp + tn) / max(n, 1)
+
+    return pd.DataFrame({
+        "threshold": thresholds,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "accuracy": acc,
+    })
+
+
+def find_best_threshold(y_true, y_score, thresholds=None):
+    """Sama seperti notebook (threshold pertama dengan F1 maksimum), satu pass."""
+    sweep = threshold_sweep(y_true, y_score, thresholds)
+    b = sweep.iloc[int(np.argmax(sweep["f1"].to_numpy()))]
+    return {
+        "thr": float(b["threshold"]),
+        "f1": float(b["f1"]),
+        "precision": float(b["precision"]),
+        "recall": float(b["recall"]),
+        "acc": float(b["accuracy"]),
+    }
+
+
+def compute_metrics(y_true, y_score, impressions_used: int) -> pd.DataFrame:
+    """Baris metrics.csv (format sama dengan notebook)."""
+    from sklearn.metrics import average_precision_score, roc_auc_score
+
+    best = find_best_threshold(y_true, y_score)
+    auc = roc_auc_score(y_true, y_score) if len(np.unique(y_true)) > 1 else 0.5
+    return pd.DataFrame([{
+        "threshold": best["thr"],
+        "accuracy": best["acc"],
+        "precision": best["precision"],
+        "recall": best["recall"],
+        "f1_score": best["f1"],
+        "auc": auc,
+        "pr_auc": average_precision_score(y_true, y_score),
+        "rows": len(y_true),
+        "impressions_used": impressions_used,
+    }])
+
+
+def _ranks_within(cand_offsets, scores):
+    """Peringkat (0 = skor tertinggi) tiap kandidat di dalam impression-nya."""
+    group = np.repeat(np.arange(len(cand_offsets) - 1), np.diff(cand_offsets))
+    order = np.lexsort((np.arange(len(scores)), -scores, group))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(len(scores)) - cand_offsets[group[order]]
+    return ranks
+
+
+def ranking_agreement(cand_offsets, base_scores, other_scores, k: int = 5) -> dict:
+    """
+    Seberapa sama urutan kandidat per impression antara dua skor:
+      top1_agreement : kandidat teratas sama
+      overlap_at_k   : rata-rata |topk_base ∩ topk_other| / min(k, n)
+      identical      : seluruh urutan sama persis
+      max_abs_diff   : selisih skor terbesar
+    """
+    cand_offsets = np.asarray(cand_offsets, dtype=np.int64)
+    n_imp = len(cand_offsets) - 1
+    if n_imp == 0:
+        return {"impressions": 0, "top1_agreement": 1.0, f"overlap_at_{k}": 1.0,
+                "identical": 1.0, "max_abs_diff": 0.0}
+
+    rb = _ranks_within(cand_offsets, base_scores)
+    ro = _ranks_within(cand_offsets, other_scores)
+    group = np.repeat(np.arange(n_imp), np.diff(cand_offsets))
+    sizes = np.diff(cand_offsets)
+    nonempty = sizes > 0
+
+    top1 = np.bincount(group, weights=((rb == 0) & (ro == 0)), minlength=n_imp)
+    both = np.bincount(group, weights=((rb < k) & (ro < k)), minlength=n_imp)
+    differ = np.bincount(group, weights=(rb != ro), minlength=n_imp)
+    overlap = both[nonempty] / np.minimum(k, sizes[nonempty])
+
+    return {
+        "impressions": int(nonempty.sum()),
+        "top1_agreement": float(top1[nonempty].mean()),
+        f"overlap_at_{k}": float(overlap.mean()),
+        "identical": float((differ[nonempty] == 0).mean()),
+        "max_abs_diff": float(np.max(np.abs(np.asarray(base_scores) - np.asarray(other_scores)), initial=0.0)),
+    }
+
+
+def compare_precision(
+    beh_path: str,
+    X_all,
+    all2idx,
+    X_norm,
+    compact,
+    weighted: bool = True,
+    max_impressions: int = None,
+    k: int = 5,
+    chunk_size: int = 20000,
+) -> dict:
+    """
+    Bandingkan ranking kandidat dev impressions antara X_norm float64 dan
+    CompactMatrix (float32 / int8). Return ranking_agreement + AUC keduanya.
+    """
+    from sklearn.metrics import roc_auc_score
+
+    offsets, y_true, base, other = [np.zeros(1, dtype=np.int64)], [], [], []
+    n_cand = 0
+    for imps in iter_impression_chunks(beh_path, all2idx, chunk_size, max_impressions):
+        offsets.append(imps.cand_offsets[1:] + n_cand)
+        n_cand += len(imps.cand_items)
+        y_true.append(imps.labels)
+        base.append(score_impressions(imps, X_all, X_norm, weighted))
+        other.append(score_impressions(imps, X_all, compact, weighted))
+
+    if not y_true:
+        return ranking_agreement(np.zeros(1, dtype=np.int64), np.empty(0), np.empty(0), k)
+
+    y_true = np.concatenate(y_true).astype(int)
+    base, other = np.concatenate(base), np.concatenate(other)
+    report = ranking_agreement(np.concatenate(offsets), base, other, k)
+    if len(np.unique(y_true)) > 1:
+        report["auc_float64"] = float(roc_auc_score(y_true, base))
+        report[f"auc_{compact.mode}"] = float(roc_auc_score(y_true, other))
+    return report
+
+
+def evaluate_behaviors(beh_path: str, X_all, all2idx, **kwargs) -> pd.DataFrame:
+    y_true, y_score, used = score_behaviors(beh_path, X_all, all2idx, **kwargs)
+    return compute_metrics(y_true, y_score, used)
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
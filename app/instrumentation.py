@@ -0,0 +1,271 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+# Instrumentasi latensi per tahap (profile, slice, cosine, topk, meta, ...).
+# Default nonaktif: stage() mengembalikan objek no-op bersama sehingga biaya
+# per panggilan hanya satu cek boolean. Aktifkan dengan enable() atau
+# RECOMMENDER_METRICS=1; RECOMMENDER_METRICS_LOG=1 juga menulis log JSON
+# per request ke logger "recommender.metrics".
+
+logger = logging.getLogger("recommender.metrics")
+
+# Batas bucket histogram (detik), log-spaced 50us .. ~13s
+BUCKETS = tuple(float(f"{b:.6g}") for b in 5e-5 * 2.0 ** np.arange(19))
+
+_enabled = os.environ.get("RECOMMENDER_METRICS", "0") == "1"
+_log_requests = os.environ.get("RECOMMENDER_METRICS_LOG", "0") == "1"
+_lock = threading.Lock()
+_local = threading.local()
+_stages = {}
+_gauges = {}
+_last_request = None
+
+
+def enable(log_requests: bool = None):
+    global _enabled, _log_requests
+    _enabled = True
+    if log_requests is not None:
+        _log_requests = log_requests
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    global _last_request
+    with _lock:
+        _stages.clear()
+        _gauges.clear()
+        _last_request = None
+
+
+class _StageStats:
+    __slots__ = ("counts", "total", "n", "rows", "nnz")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.rows = 0
+        self.nnz = 0
+
+    def add(self, seconds, rows, nnz):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.n += 1
+        self.rows += rows
+        self.nnz += nnz
+
+    def quantile(self, q: float) -> float:
+        """Perkiraan kuantil (detik) dari bucket, interpolasi linear dalam bucket."""
+        if self.n == 0:
+            return 0.0
+        target = q * self.n
+        cum = np.cumsum(self.counts)
+        b = int(np.searchsorted(cum, target))
+        lo = BUCKETS[b - 1] if b > 0 else 0.0
+        hi = BUCKETS[b] if b < len(BUCKETS) else BUCKETS[-1] * 2
+        below = cum[b - 1] if b > 0 else 0
+        frac = (target - below) / max(self.counts[b], 1)
+        return float(lo + (hi - lo) * frac)
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows: int = 0, nnz: int = 0):
+        pass
+
+
+_NOOP = _Noop()
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "nnz", "t0")
+
+    def __init__(self, name, rows, nnz):
+        self.name = name
+        self.rows = rows
+        self.nnz = nnz
+
+    def add(self, rows: int = 0, nnz: int = 0):
+        """Tambah jumlah baris / nnz yang disentuh (boleh dipanggil di dalam blok)."""
+        self.rows += int(rows)
+        self.nnz += int(nnz)
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.t0, self.rows, self.nnz)
+        return False
+
+
+def stage(name: str, rows: int = 0, nnz: int = 0):
+    """
+    Context manager pengukur satu tahap:
+        with stage("cosine", rows=len(cols)) as s:
+            ...
+            s.add(nnz=M.nnz)
+    """
+    if not _enabled:
+        return _NOOP
+    return _Stage(name, int(rows), int(nnz))
+
+
+def record(name: str, seconds: float, rows: int = 0, nnz: int = 0):
+    with _lock:
+        st = _stages.get(name)
+        if st is None:
+            st = _stages[name] = _StageStats()
+        st.add(seconds, rows, nnz)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append({"stage": name, "ms": round(seconds * 1000, 4), "rows": rows, "nnz": nnz})
+
+
+class _Request:
+    __slots__ = ("name", "t0", "outer")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.outer = getattr(_local, "trace", None)
+        if self.outer is None:
+            _local.trace = []
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _last_request
+        dt = time.perf_counter() - self.t0
+        if self.outer is not None:
+            record(self.name, dt)
+            return False
+
+        trace, _local.trace = _local.trace, None
+        record(self.name, dt)
+        req = {"request": self.name, "total_ms": round(dt * 1000, 4), "stages": trace}
+        with _lock:
+            _last_request = req
+        if _log_requests:
+            logger.info(json.dumps(req))
+        return False
+
+
+def request(name: str):
+    """
+    Kelompokkan stage di thread ini sebagai satu request (untuk breakdown
+    last_request()). Request bersarang dicatat sebagai stage biasa.
+    """
+    if not _enabled:
+        return _NOOP
+    return _Request(name)
+
+
+def traced(name: str):
+    """Decorator: setiap panggilan fungsi menjadi satu request (lihat request())."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Request(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def last_request():
+    """Breakdown request terakhir yang selesai: {request, total_ms, stages: [...]}, atau None."""
+    return _last_request
+
+
+def set_gauge(name: str, value: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = float(value)
+
+
+def snapshot() -> dict:
+    """Ringkasan per stage: count, total/mean/p50/p90/p99 (ms), rows & nnz total."""
+    out = {}
+    with _lock:
+        for name, st in sorted(_stages.items()):
+            out[name] = {
+                "count": st.n,
+                "total_ms": round(st.total * 1000, 3),
+                "mean_ms": round(st.total * 1000 / max(st.n, 1), 4),
+                "p50_ms": round(st.quantile(0.50) * 1000, 4),
+                "p90_ms": round(st.quantile(0.90) * 1000, 4),
+                "p99_ms": round(st.quantile(0.99) * 1000, 4),
+                "rows": st.rows,
+                "nnz": st.nnz,
+            }
+    return out
+
+
+def log_snapshot(level: int = logging.INFO):
+    logger.log(level, json.dumps({"stages": snapshot(), "gauges": _gauge_items()}))
+
+
+def _gauge_items():
+    with _lock:
+        return [{"name": n, "labels": dict(lbl), "value": v} for (n, lbl), v in sorted(_gauges.items())]
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def prometheus_text(prefix: str = "recommender") -> str:
+    """Dump format teks Prometheus (histogram per stage + counter rows/nnz + gauge)."""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Wall time per tahap rekomendasi.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    with _lock:
+        stages = sorted(_stages.items())
+        gauges = sorted(_gauges.items())
+    for name, st in stages:
+        cum = np.cumsum(st.counts)
+        for b, c in zip(BUCKETS, cum[:-1]):
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{b}"}} {int(c)}')
+        lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {st.n}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {st.total:.9f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {st.n}')
+    for metric in ("rows", "nnz"):
+        lines.append(f"# TYPE {prefix}_stage_{metric}_total counter")
+        for name, st in stages:
+            lines.append(f'{prefix}_stage_{metric}_total{{stage="{name}"}} {getattr(st, metric)}')
+
+    seen = set()
+    for (name, lbl), value in gauges:
+        if name not in seen:
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            seen.add(name)
+        lines.append(f"{prefix}_{name}{_labels(lbl)} {value:g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,174 @@
+import numpy as np
+from scipy import sparse
+
+
+class InvertedIndex:
+    """
+    Index term -> postings (row berita, bobot) dari X_all yang sudah
+    dinormalisasi L2, diambil langsung dari layout CSC.
+
+    Query top-k memakai MaxScore: upper bound term = bobot query x bobot
+    maksimum term. Skor ke-k awal (theta) diambil dari rescoring exact
+    kandidat postings term ber-bound terbesar; term dengan jumlah bound
+    (dari yang terkecil) < theta tidak esensial, karena dokumen yang hanya
+    muncul di postings term tersebut tidak mungkin masuk top-k. Hanya
+    postings term esensial yang diakumulasi, lalu kandidat di-rescore exact
+    berurutan dari bound terbesar sampai bound berikutnya < skor ke-k.
+    X_norm boleh berupa CompactMatrix (CatalogScorer precision float32/int8):
+    postings diambil langsung darinya (float32) dan rescoring memakai
+    baris/matvec CompactMatrix, tanpa salinan CSR float utuh.
+    Paling menguntungkan untuk profil dengan sedikit term (history pendek,
+    query teks); profil panjang lebih cepat dengan scoring exact.
+    """
+
+    # jumlah postings term teratas yang dipakai untuk menaksir theta awal
+    SEED_POSTINGS = 4096
+    # perkiraan biaya gather satu posting relatif terhadap satu nnz mat-vec exact
+    GATHER_COST = 8
+    # porsi theta yang boleh "dipakai" bound term tidak esensial
+    NE_FRACTION = 0.5
+    # perkiraan biaya rescore satu kandidat (slice baris) relatif terhadap satu baris mat-vec
+    RESCORE_COST = 8
+
+    def __init__(self, X_norm):
+        from compact_matrix import CompactMatrix
+
+        if isinstance(X_norm, CompactMatrix):
+            self.X_norm = X_norm
+            Xc = X_norm.to_csc()
+        else:
+            self.X_norm = sparse.csr_matrix(X_norm)
+            Xc = sparse.csc_matrix(X_norm)
+            Xc.sort_indices()
+
+        self.indptr = Xc.indptr
+        self.docs = Xc.indices
+        self.weights = Xc.data
+        self.n_docs, self.n_terms = Xc.shape
+
+        self.max_weight = np.zeros(self.n_terms, dtype=np.float64)
+        nonempty = np.flatnonzero(np.diff(self.indptr))
+        if len(nonempty):
+            self.max_weight[nonempty] = np.maximum.reduceat(self.weights, self.indptr[nonempty])
+
+    def _gather(self, terms, q):
+        """Gabungkan postings beberapa term: (doc rows, bobot x q[term])."""
+        if len(terms) == 0:
+            return np.empty(0, dtype=self.docs.dtype), np.empty(0, dtype=np.float64)
+        ptr = self.indptr
+        docs = np.concatenate([self.docs[ptr[t]:ptr[t + 1]] for t in terms])
+        w = np.concatenate([self.weights[ptr[t]:ptr[t + 1]] * q[t] for t in terms])
+        return docs, w
+
+    def _exact(self, rows, q):
+        return np.asarray(self.X_norm[rows] @ q, dtype=np.float64)
+
+    def _rescore(self, cand, partial, ne_bound, theta, q, k):
+        """
+        Skor exact kandidat yang bound-nya (partial + ne_bound) >= skor ke-k,
+        per putaran dari bound terbesar; sisanya dibuang tanpa di-score.
+        """
+        # toleransi kecil: partial dijumlah per term, urutan penjumlahan beda dengan exact
+        ne_bound += 1e-9
+        keep = partial + ne_bound >= theta
+        cand, partial = cand[keep], partial[keep]
+        if len(cand) * self.RESCORE_COST > self.n_docs:
+            return None  # terlalu banyak kandidat lolos bound: mat-vec exact lebih murah
+        step = max(4 * k, 256)
+        rows, scores = [], []
+        best = np.empty(0)
+        while len(cand):
+            if len(cand) > step:
+                top = np.argpartition(-partial, step - 1)[:step]
+            else:
+                top = np.arange(len(cand))
+            rows.append(cand[top])
+            scores.append(self._exact(cand[top], q))
+            best = np.sort(np.concatenate([best, scores[-1]]))[-k:]
+            rest = np.ones(len(cand), dtype=bool)
+            rest[top] = False
+            cand, partial = cand[rest], partial[rest]
+            if len(best) >= k:
+                keep = partial + ne_bound >= best[0]
+                cand, partial = cand[keep], partial[keep]
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def _exact_topk(self, q, k, excluded):
+        if sparse.issparse(self.X_norm):
+            scores = self.X_norm @ q
+        else:
+            scores = self.X_norm.matvec(q)
+        scores[excluded] = -np.inf
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.n_docs else np.arange(self.n_docs)
+        top = top[np.lexsort((top, -scores[top]))]
+        top = top[np.isfinite(scores[top])]
+        return top.astype(np.int64), scores[top]
+
+    def topk(self, q, k: int = 10, exclude_rows=None):
+        """
+        q: profil dense 1-D yang sudah dinormalisasi L2.
+        Return (rows, scores) top-k exact (sama dengan full scoring),
+        urut menurun, tanpa baris di exclude_rows.
+        """
+        q = np.asarray(q, dtype=np.float64).ravel()
+        k = min(int(k), self.n_docs)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        excluded = np.zeros(self.n_docs, dtype=bool)
+        if exclude_rows is not None and len(exclude_rows):
+            excluded[np.asarray(exclude_rows, dtype=np.int64)] = True
+
+        terms = np.flatnonzero(q)
+        ub = q[terms] * self.max_weight[terms]
+        order = np.argsort(-ub, kind="stable")
+        terms, ub = terms[order], ub[order]
+
+        lens = np.diff(self.indptr)[terms]
+        if lens.sum() * self.GATHER_COST > self.X_norm.nnz:
+            # profil panjang: pruning tidak mungkin lebih murah dari scoring exact
+            return self._exact_topk(q, k, excluded)
+
+        # theta awal: skor exact kandidat terbaik dari postings term teratas
+        n_seed = int(np.searchsorted(np.cumsum(lens), self.SEED_POSTINGS)) + 1
+        d, w = self._gather(terms[:n_seed], q)
+        seed = np.unique(d[~excluded[d]])
+        theta = 0.0
+        if len(seed) >= k:
+            part = np.bincount(d, weights=w, minlength=self.n_docs)[seed]
+            seed = seed[np.argpartition(-part, k - 1)[:k]] if len(seed) > k else seed
+            theta = float(self._exact(seed, q).min())
+
+        # term tidak esensial: prefix (dari bound terkecil) dengan jumlah bound < theta
+        # (dibatasi NE_FRACTION x theta agar bound kandidat punya margin untuk pruning)
+        n_ne = int(np.searchsorted(np.cumsum(ub[::-1]), theta * self.NE_FRACTION, side="left")) if theta > 0 else 0
+        ne_bound = float(ub[len(ub) - n_ne:].sum()) if n_ne else 0.0
+        essential = terms[:len(terms) - n_ne]
+        if np.diff(self.indptr)[essential].sum() * self.GATHER_COST > self.X_norm.nnz:
+            return self._exact_topk(q, k, excluded)  # postings esensial terlalu banyak
+
+        d, w = self._gather(essential, q)
+        acc = np.bincount(d, weights=w, minlength=self.n_docs)
+        cand = np.flatnonzero(acc)
+        cand = cand[~excluded[cand]]
+        res = self._rescore(cand, acc[cand], ne_bound, theta, q, k)
+        if res is None:
+            return self._exact_topk(q, k, excluded)
+        cand, scores = res
+
+        if len(cand) < k:
+            free = ~excluded
+            free[cand] = False
+            pad = np.flatnonzero(free)[: k - len(cand)]
+            cand = np.concatenate([cand, pad])
+            scores = np.concatenate([scores, np.zeros(len(pad))])
+
+        k = min(k, len(cand))
+        if k < len(cand):
+            part = np.argpartition(-scores, k - 1)[:k]
+        else:
+            part = np.arange(len(cand))
+        part = part[np.lexsort((cand[part], -scores[part]))]
+        return cand[part].astype(np.int64), scores[part]
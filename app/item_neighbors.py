@@ -0,0 +1,243 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from artifact_store import _load, _save, catalog_fingerprint
+from recommender import topk_indices, topk_rows
+
+# Tabel tetangga item-ke-item (offline): untuk setiap baris X_all disimpan K
+# item paling mirip (cosine TF-IDF) sebagai dua array lebar tetap
+# nbr_idx (int32, -1 = kosong) dan nbr_score (float32). Dihitung per blok
+# baris dengan sparse x sparse^T, blok dibagi ke process pool; memori per
+# blok dibatasi max_block_mb. Saat serve, "more like this" = satu lookup dan
+# retrieval="item_knn" = gabungan tetangga item history (tanpa scoring katalog).
+NBR_MANIFEST = "neighbors.json"
+NBR_FORMAT = "mind-cbr-neighbors"
+NBR_VERSION = 1
+
+_WORKER_STATE = {}
+
+
+def _init_worker(artifact_dir, X_norm):
+    if artifact_dir is not None:
+        from artifacts_loader import load_normalized_matrix
+
+        X_norm = load_normalized_matrix(artifact_dir)
+    _WORKER_STATE.update(X_norm=X_norm, XT=X_norm.T.tocsr())
+
+
+def _block_worker(start: int, stop: int, k: int):
+    return block_neighbors(_WORKER_STATE["X_norm"], _WORKER_STATE["XT"], start, stop, k)
+
+
+def block_neighbors(X_norm, XT, start: int, stop: int, k: int):
+    """Top-k tetangga untuk baris [start, stop) terhadap seluruh katalog (tanpa diri sendiri)."""
+    S = (X_norm[start:stop] @ XT).toarray()
+    S[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+    idx, sc = topk_rows(S, k)
+    empty = ~(sc > 0)
+    idx = idx.astype(np.int32)
+    idx[empty] = -1
+    sc = np.where(empty, 0.0, sc).astype(np.float32)
+    if idx.shape[1] < k:
+        pad = k - idx.shape[1]
+        idx = np.pad(idx, ((0, 0), (0, pad)), constant_values=-1)
+        sc = np.pad(sc, ((0, 0), (0, pad)))
+    return start, idx, sc
+
+
+def block_rows(n_items: int, max_block_mb: int = 256) -> int:
+    # hasil product sparse + salinan dense float64 per blok
+    return max(1, int(max_block_mb * 1024 * 1024) // (n_items * 16))
+
+
+class ItemNeighbors:
+    """
+    idx   : (n_items x K) int32, row tetangga urut menurun, -1 = kosong
+    score : (n_items x K) float32, cosine ke tetangga (0 untuk slot kosong)
+    """
+
+    def __init__(self, idx, score):
+        self.idx = idx
+        self.score = score
+
+    @property
+    def n_items(self):
+        return self.idx.shape[0]
+
+    @property
+    def k(self):
+        return self.idx.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        X_norm,
+        k: int = 50,
+        workers: int = 1,
+        max_block_mb: int = 256,
+        artifact_dir: str = None,
+        progress=None,
+    ):
+        """
+        X_norm: CSR ternormalisasi L2. Dengan workers > 1, blok dihitung di
+        process pool; jika artifact_dir diberikan (format v2), worker memuat
+        X_norm sendiri via mmap alih-alih menerima salinan.
+        progress: callback opsional progress(rows_selesai, n_items).
+        """
+        n = X_norm.shape[0]
+        idx = np.full((n, k), -1, dtype=np.int32)
+        score = np.zeros((n, k), dtype=np.float32)
+        step = block_rows(n, max_block_mb)
+        blocks = [(s, min(s + step, n)) for s in range(0, n, step)]
+
+        def put(res):
+            s, bi, bs = res
+            idx[s:s + len(bi)] = bi
+            score[s:s + len(bs)] = bs
+            if progress is not None:
+                progress(s + len(bi), n)
+
+        if workers <= 1:
+            XT = X_norm.T.tocsr()
+            for s, e in blocks:
+                put(block_neighbors(X_norm, XT, s, e, k))
+        else:
+            init_args = (artifact_dir, None) if artifact_dir else (None, X_norm)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as ex:
+                for res in ex.map(_block_worker, *zip(*blocks), [k] * len(blocks)):
+                    put(res)
+        return cls(idx, score)
+
+    def extend(self, X_norm, max_block_mb: int = 256):
+        """
+        Tambah tetangga untuk baris baru X_norm[n_items:] (segment baru).
+        Tetangga item lama tidak di-update; bangun ulang untuk memasukkan
+        item baru ke daftar mereka.
+        """
+        n_old, n = self.n_items, X_norm.shape[0]
+        XT = X_norm.T.tocsr()
+        step = block_rows(n, max_block_mb)
+        parts = [block_neighbors(X_norm, XT, s, min(s + step, n), self.k) for s in range(n_old, n, step)]
+        idx = np.concatenate([np.asarray(self.idx)] + [p[1] for p in parts])
+        score = np.concatenate([np.asarray(self.score)] + [p[2] for p in parts])
+        return ItemNeighbors(idx, score)
+
+    def neighbors(self, row: int, k: int = None):
+        """Return (rows, scores) tetangga satu item, urut menurun."""
+        k = self.k if k is None else min(int(k), self.k)
+        rows = np.asarray(self.idx[row, :k], dtype=np.int64)
+        keep = rows >= 0
+        return rows[keep], np.asarray(self.score[row, :k], dtype=np.float64)[keep]
+
+    def recommend(self, seed_rows, top_n: int = 10, weights=None, exclude_rows=None, rows=None):
+        """
+        Gabungkan daftar tetangga seed_rows (mis. history): skor kandidat =
+        jumlah bobot_seed * sim(seed, kandidat), bobot dinormalisasi (default
+        sama rata), sehingga skor = rata-rata similarity ke history.
+        rows: subset row terurut yang boleh direkomendasikan (filter).
+        Return (rows, scores).
+        """
+        seed_rows = np.asarray(seed_rows, dtype=np.int64)
+        w = np.ones(len(seed_rows)) if weights is None else np.asarray(weights, dtype=np.float64)
+        known = seed_rows < self.n_items
+        seed_rows, w = seed_rows[known], w[known]
+        if len(seed_rows) == 0 or (rows is not None and len(rows) == 0):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        w = w / w.sum()
+        cand = np.asarray(self.idx[seed_rows], dtype=np.int64).ravel()
+        vals = (np.asarray(self.score[seed_rows], dtype=np.float64) * w[:, None]).ravel()
+
+        keep = cand >= 0
+        if exclude_rows is not None and len(exclude_rows):
+            keep &= ~np.isin(cand, exclude_rows)
+        if rows is not None:
+            pos = np.minimum(np.searchsorted(rows, cand), len(rows) - 1)
+            keep &= rows[pos] == cand
+        cand, vals = cand[keep], vals[keep]
+
+        uniq, inv = np.unique(cand, return_inverse=True)
+        acc = np.bincount(inv, weights=vals, minlength=len(uniq))
+        top = topk_indices(acc, top_n)
+        return uniq[top], acc[top]
+
+    def save(self, artifact_dir: str, extra: dict = None, all2idx=None):
+        """all2idx: dicatat sebagai catalog_fingerprint, dicek load_item_neighbors."""
+        files = []
+        _save(artifact_dir, "nbr_idx.npy", self.idx, files)
+        _save(artifact_dir, "nbr_score.npy", self.score, files)
+        manifest = {
+            "format": NBR_FORMAT,
+            "version": NBR_VERSION,
+            "n_items": self.n_items,
+            "k": self.k,
+            "catalog_fingerprint": catalog_fingerprint(all2idx, self.n_items) if all2idx is not None else None,
+            "files": files,
+        }
+        manifest.update(extra or {})
+        tmp = os.path.join(artifact_dir, NBR_MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(artifact_dir, NBR_MANIFEST))
+        return manifest
+
+
+def has_item_neighbors(artifact_dir: str) -> bool:
+    return os.path.exists(os.path.join(artifact_dir, NBR_MANIFEST))
+
+
+def _read_manifest(artifact_dir: str) -> dict:
+    with open(os.path.join(artifact_dir, NBR_MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != NBR_FORMAT:
+        raise ValueError(f"Bukan tabel {NBR_FORMAT}: {artifact_dir}")
+    return manifest
+
+
+def load_item_neighbors(artifact_dir: str, X_norm=None, mmap: bool = True, all2idx=None):
+    """
+    Muat ItemNeighbors (array di-mmap), atau None jika belum dibangun.
+    all2idx: row tabel harus milik katalog yang sama (catalog_fingerprint
+    n_items row pertama); berbeda -> ValueError.
+    Segment dari append_news sudah ditambahkan ke tabel (extend_item_neighbors);
+    jika X_norm tetap punya baris lebih banyak (tabel lebih lama dari segment),
+    tetangga baris sisanya dihitung saat load lewat extend().
+    """
+    if not has_item_neighbors(artifact_dir):
+        return None
+    manifest = _read_manifest(artifact_dir)
+
+    table = ItemNeighbors(_load(artifact_dir, "nbr_idx.npy", mmap), _load(artifact_dir, "nbr_score.npy", mmap))
+    expected = manifest.get("catalog_fingerprint")
+    if all2idx is not None and expected is not None:
+        if len(all2idx) < table.n_items or catalog_fingerprint(all2idx, table.n_items) != expected:
+            raise ValueError("Tabel tetangga dibangun untuk katalog (all2idx) yang berbeda; bangun ulang.")
+    if X_norm is not None:
+        if X_norm.shape[0] < table.n_items:
+            raise ValueError("Tabel tetangga dibangun untuk katalog yang lebih besar; bangun ulang.")
+        if X_norm.shape[0] > table.n_items:
+            table = table.extend(X_norm)
+    return table
+
+
+def extend_item_neighbors(artifact_dir: str, X_norm, all2idx) -> int:
+    """
+    Hitung tetangga baris katalog baru (segment) sekali, lalu tulis ulang
+    tabel (atomic, lihat _save) agar proses yang load cukup mmap.
+    Field manifest lain (mis. recall_check) dipertahankan.
+    Return jumlah baris yang ditambahkan (0 jika tidak ada tabel / baris baru).
+    """
+    if not has_item_neighbors(artifact_dir):
+        return 0
+    manifest = _read_manifest(artifact_dir)
+    table = load_item_neighbors(artifact_dir, all2idx=all2idx)
+    added = X_norm.shape[0] - table.n_items
+    if added <= 0:
+        return 0
+    keep = {k: v for k, v in manifest.items() if k not in ("format", "version", "n_items", "k", "files")}
+    keep.pop("catalog_fingerprint", None)
+    table.extend(X_norm).save(artifact_dir, extra=keep, all2idx=all2idx)
+    return added
@@ -0,0 +1,34 @@
+import os
+
+import pandas as pd
+
+NEWS_COLS = [
+    "news_id", "category", "subcategory", "title",
+    "abstract", "url", "title_entities", "abstract_entities"
+]
+BEH_COLS = ["impression_id", "user_id", "time", "history", "impressions"]
+
+
+def find_split_file(split_dir: str, stem: str) -> str:
+    """news/behaviors: pakai .csv hasil konversi jika ada, jika tidak .tsv asli."""
+    for ext in (".csv", ".tsv"):
+        path = os.path.join(split_dir, stem + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"{stem}.csv/.tsv tidak ditemukan di {split_dir}")
+
+
+def iter_csv_chunks(path: str, cols, usecols=None, chunksize: int = 50000):
+    """Baca news/behaviors (csv hasil konversi atau tsv asli) per chunk."""
+    if path.endswith(".tsv"):
+        kw = dict(sep="\t", header=None, names=cols)
+    else:
+        kw = dict(header=0)
+    return pd.read_csv(
+        path, usecols=usecols, dtype=str, na_filter=False,
+        encoding="utf-8", chunksize=chunksize, **kw
+    )
+
+
+def read_news_file(path: str) -> pd.DataFrame:
+    return pd.concat(iter_csv_chunks(path, NEWS_COLS), ignore_index=True)
@@ -0,0 +1,146 @@
+import numpy as np
+
+from instrumentation import stage
+
+META_FIELDS = ("title", "category", "subcategory")
+FACET_FIELDS = ("category", "subcategory")
+
+
+class FacetIndex:
+    """
+    Row all2idx per nilai category/subcategory, dihitung sekali saat load:
+    rows diurutkan per nilai (satu argsort) + offsets, sehingga himpunan row
+    satu nilai = satu slice. Hasil filter (include/exclude) di-cache per key.
+    """
+
+    def __init__(self, columns: dict, n_items: int, cache_size: int = 32):
+        self.n_items = n_items
+        self.values = {}
+        self._rows = {}
+        self._offsets = {}
+        self._code = {}
+        for field, col in columns.items():
+            values, codes = np.unique(np.asarray(col, dtype=object).astype(str), return_inverse=True)
+            order = np.argsort(codes, kind="stable")
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(codes, minlength=len(values)), out=offsets[1:])
+            self.values[field] = values.tolist()
+            self._code[field] = {v: i for i, v in enumerate(self.values[field])}
+            self._rows[field] = order.astype(np.int64)
+            self._offsets[field] = offsets
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def counts(self, field: str) -> dict:
+        return dict(zip(self.values[field], np.diff(self._offsets[field]).tolist()))
+
+    def rows_for(self, field: str, values):
+        """Row (terurut) yang nilai `field`-nya ada di values."""
+        code = self._code[field]
+        parts = []
+        for v in values:
+            c = code.get(str(v))
+            if c is not None:
+                lo, hi = self._offsets[field][c], self._offsets[field][c + 1]
+                parts.append(self._rows[field][lo:hi])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else np.sort(parts[0])
+
+    @staticmethod
+    def key(include=None, exclude=None):
+        def norm(d):
+            return tuple(sorted((f, tuple(sorted(map(str, v)))) for f, v in (d or {}).items() if v))
+        return norm(include), norm(exclude)
+
+    def filter_rows(self, include: dict = None, exclude: dict = None):
+        """
+        include/exclude: {field: [nilai, ...]}. Field berbeda di include
+        digabung AND, nilai dalam satu field OR. Return array row terurut,
+        atau None jika tidak ada filter (= seluruh katalog).
+        """
+        key = self.key(include, exclude)
+        if key == ((), ()):
+            return None
+        rows = self._cache.get(key)
+        if rows is not None:
+            return rows
+
+        with stage("facet_filter"):
+            rows = None
+            for field, values in key[0]:
+                sel = self.rows_for(field, values)
+                rows = sel if rows is None else np.intersect1d(rows, sel, assume_unique=True)
+            if key[1]:
+                drop = np.concatenate([self.rows_for(f, v) for f, v in key[1]])
+                if rows is None:
+                    keep = np.ones(self.n_items, dtype=bool)
+                    keep[drop] = False
+                    rows = np.flatnonzero(keep)
+                else:
+                    rows = rows[~np.isin(rows, drop)]
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = rows
+        return rows
+
+
+class NewsMetaStore:
+    """
+    Metadata berita per kolom (array biasa) yang urutannya sama dengan row all2idx.
+    Lookup batch cukup fancy-index array, tanpa scan DataFrame per item.
+    """
+
+    def __init__(self, ids, columns: dict, all2idx=None):
+        self.ids = np.asarray(ids, dtype=object)
+        self.columns = {k: np.asarray(v, dtype=object) for k, v in columns.items()}
+        self.all2idx = all2idx if all2idx is not None else {nid: i for i, nid in enumerate(self.ids)}
+        self.facets = FacetIndex(
+            {f: self.columns[f] for f in FACET_FIELDS if f in self.columns}, len(self.ids)
+        )
+
+    @classmethod
+    def from_dataframe(cls, news_all, all2idx, fields=META_FIELDS):
+        ids = np.empty(len(all2idx), dtype=object)
+        for nid, i in all2idx.items():
+            ids[i] = nid
+
+        columns = {}
+        if "news_id" in news_all.columns:
+            df = news_all.drop_duplicates("news_id").set_index("news_id").reindex(ids)
+            for f in fields:
+                if f in df.columns:
+                    columns[f] = df[f].fillna("").astype(str).to_numpy(dtype=object)
+        for f in fields:
+            columns.setdefault(f, np.full(len(ids), "", dtype=object))
+        return cls(ids, columns, all2idx)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_of(self, news_ids):
+        """Row all2idx per news_id; -1 jika tidak dikenal."""
+        return np.fromiter((self.all2idx.get(n, -1) for n in news_ids), dtype=np.int64, count=len(news_ids))
+
+    def column(self, name: str, rows):
+        return self.columns[name][np.asarray(rows, dtype=np.int64)]
+
+    def lookup(self, rows):
+        """list of dict {news_id, title, category, subcategory} untuk vektor row."""
+        rows = np.asarray(rows, dtype=np.int64)
+        with stage("meta", rows=len(rows)):
+            cols = {"news_id": self.ids[rows]}
+            cols.update({k: v[rows] for k, v in self.columns.items()})
+            keys = list(cols)
+            return [dict(zip(keys, vals)) for vals in zip(*(cols[k] for k in keys))]
+
+    def lookup_ids(self, news_ids):
+        """Seperti lookup, per news_id; id tidak dikenal -> dict kosong (seperti safe_news_meta)."""
+        rows = self.rows_of(news_ids)
+        known = rows >= 0
+        found = iter(self.lookup(rows[known]))
+        return [next(found) if k else {} for k in known]
+
+    def get(self, news_id) -> dict:
+        return self.lookup_ids([news_id])[0]
@@ -0,0 +1,222 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+from instrumentation import stage
+
+
+class ProfileState:
+    """
+    Profil user dalam bentuk sparse yang bisa di-update per klik.
+
+    Untuk history valid x_0..x_{n-1} disimpan:
+      A = sum x_k        B = sum k * x_k
+    Profil mean     = A / n
+    Profil weighted = (A + B / (n-1)) / (1.5 n)   (bobot linspace(1, 2, n)),
+                      atau A jika n == 1
+    sehingga menambah satu item hanya menyentuh nnz item tersebut.
+    """
+
+    def __init__(self, n_terms: int):
+        self.n_terms = n_terms
+        self.n = 0
+        self.slot = {}
+        self.terms = np.empty(16, dtype=np.int64)
+        self.a = np.zeros(16, dtype=np.float64)
+        self.b = np.zeros(16, dtype=np.float64)
+        self._profile = {}
+
+    def copy(self) -> "ProfileState":
+        st = ProfileState(self.n_terms)
+        st.n = self.n
+        st.slot = dict(self.slot)
+        st.terms, st.a, st.b = self.terms.copy(), self.a.copy(), self.b.copy()
+        return st
+
+    def _grow(self, need: int):
+        cap = len(self.terms)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name in ("terms", "a", "b"):
+            old = getattr(self, name)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add_item(self, indices, values):
+        """Tambah satu item (nnz indices/values) sebagai item terbaru."""
+        k = self.n
+        self._grow(len(self.slot) + len(indices))
+        for t, v in zip(indices.tolist(), values.tolist()):
+            j = self.slot.get(t)
+            if j is None:
+                j = len(self.slot)
+                self.slot[t] = j
+                self.terms[j] = t
+            self.a[j] += v
+            self.b[j] += k * v
+        self.n += 1
+        self._profile = {}
+
+    def profile(self, weighted: bool = True):
+        """Profil sebagai sparse row (1 x n_terms), atau None jika history kosong."""
+        if self.n == 0:
+            return None
+        if weighted in self._profile:
+            return self._profile[weighted]
+
+        m = len(self.slot)
+        if not weighted:
+            vals = self.a[:m] / self.n
+        elif self.n == 1:
+            vals = self.a[:m].copy()
+        else:
+            vals = (self.a[:m] + self.b[:m] / (self.n - 1)) / (1.5 * self.n)
+
+        order = np.argsort(self.terms[:m])
+        u = sparse.csr_matrix(
+            (vals[order], self.terms[:m][order], np.array([0, m])), shape=(1, self.n_terms)
+        )
+        self._profile[weighted] = u
+        return u
+
+    def nbytes(self) -> int:
+        # array + perkiraan overhead dict slot + profil yang di-memo
+        memo = sum(u.data.nbytes + u.indices.nbytes for u in self._profile.values())
+        return self.terms.nbytes + self.a.nbytes + self.b.nbytes + 100 * len(self.slot) + memo
+
+
+class ProfileCache:
+    """
+    Cache profil user (sparse) dengan key history; satu entry melayani kedua
+    mode (weighted / mean), profil per mode di-memo. Eviction LRU dengan batas
+    jumlah entry serta memori; ukuran entry termasuk profil yang di-memo
+    (dihitung ulang setelah profile() dipanggil). append() maupun get() untuk
+    history = history ter-cache + satu klik menambah klik ke profil yang sudah
+    ada dalam O(nnz item) tanpa membangun ulang dari X_all: entry lama dipindah
+    ke key baru (tanpa copy).
+    Thread-safe (satu lock), karena dibagi antar sesi Streamlit.
+    """
+
+    def __init__(self, X_all, all2idx, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.X_all = sparse.csr_matrix(X_all)
+        self.all2idx = all2idx
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.incremental = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(history_ids):
+        return tuple(history_ids)
+
+    def _item(self, news_id):
+        i = self.all2idx.get(news_id)
+        if i is None:
+            return None
+        lo, hi = self.X_all.indptr[i], self.X_all.indptr[i + 1]
+        return self.X_all.indices[lo:hi], self.X_all.data[lo:hi]
+
+    def _build(self, history_ids) -> ProfileState:
+        st = ProfileState(self.X_all.shape[1])
+        for nid in history_ids:
+            item = self._item(nid)
+            if item is not None:
+                st.add_item(*item)
+        return st
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _put(self, key, st: ProfileState):
+        self._drop(key)
+        self._entries[key] = st
+        self._sizes[key] = 0
+        self._resize(key, st)
+
+    def _resize(self, key, st: ProfileState):
+        """Catat ulang ukuran entry (mis. setelah profil di-memo) lalu evict."""
+        if key not in self._entries:
+            return
+        size = st.nbytes()
+        self._bytes += size - self._sizes[key]
+        self._sizes[key] = size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+
+    def _state(self, history_ids) -> ProfileState:
+        key = self.key(history_ids)
+        st = self._entries.get(key)
+        if st is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return st
+
+        self.misses += 1
+        prev = self._entries.get(key[:-1]) if key else None
+        if prev is not None:
+            # history = history sebelumnya + satu klik: entry lama dipindah
+            # (tanpa copy, seperti append), update incremental O(nnz item)
+            self._drop(key[:-1])
+            st = prev
+            item = self._item(key[-1])
+            if item is not None:
+                st.add_item(*item)
+            self.incremental += 1
+        else:
+            st = self._build(history_ids)
+        self._put(key, st)
+        return st
+
+    def get(self, history_ids, weighted: bool = True):
+        """Profil sparse (1 x n_terms) untuk history, atau None jika tidak ada item dikenal."""
+        with stage("profile_cache", rows=len(history_ids)), self._lock:
+            st = self._state(history_ids)
+            u = st.profile(weighted)
+            self._resize(self.key(history_ids), st)
+            return u
+
+    def append(self, history_ids, news_id, weighted: bool = True, keep_previous: bool = False):
+        """
+        Profil untuk history + [news_id]. Tanpa keep_previous, entry history lama
+        dipindah ke key baru (tanpa copy), sehingga biayanya O(nnz item).
+        """
+        with self._lock:
+            key = self.key(history_ids)
+            st = self._entries.get(key)
+            if st is None:
+                st = self._build(history_ids)
+                self.misses += 1
+            else:
+                self.hits += 1
+                if keep_previous:
+                    st = st.copy()
+                else:
+                    self._drop(key)
+            item = self._item(news_id)
+            if item is not None:
+                st.add_item(*item)
+            self.incremental += 1
+            self._put(key + (news_id,), st)
+            u = st.profile(weighted)
+            self._resize(key + (news_id,), st)
+            return u
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "incremental": self.incremental,
+        }
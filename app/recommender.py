@@ -1,11 +1,29 @@
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+from scipy.sparse.linalg import norm as sparse_norm
+
+from compact_matrix import PRECISION_MODES, CompactMatrix
+from diversity import mmr_rerank
+from instrumentation import set_gauge, stage, traced
+from inverted_index import InvertedIndex
+
+RETRIEVAL_MODES = ("exact", "maxscore", "ann", "item_knn")
 
 
 def safe_news_meta(news_df, news_id: str) -> dict:
+    """
+    Lookup satu berita dengan scan DataFrame. Untuk banyak item gunakan
+    NewsMetaStore.lookup_ids (O(1) per item).
+    """
+    if hasattr(news_df, "lookup_ids"):
+        return news_df.get(news_id)
     if "news_id" not in news_df.columns:
         return {}
-    row = news_df.loc[news_df["news_id"] == news_id]
+    with stage("meta", rows=len(news_df)):
+        row = news_df.loc[news_df["news_id"] == news_id]
     if row.empty:
         return {}
     r = row.iloc[0].to_dict()
@@ -24,17 +42,57 @@ def build_user_profile(
     if not idxs:
         return None
 
-    if not weighted:
-        u = X_all[idxs].sum(axis=0) / len(idxs)
+    with stage("profile", rows=len(idxs)) as st:
+        M = X_all[idxs]
+        st.add(nnz=M.nnz)
+        if not weighted:
+            u = M.sum(axis=0) / len(idxs)
+            return np.asarray(u)
+
+        w = np.linspace(1.0, 2.0, num=len(idxs)).astype(np.float32)
+        u = (M.multiply(w[:, None])).sum(axis=0) / w.sum()
         return np.asarray(u)
 
-    w = np.linspace(1.0, 2.0, num=len(idxs)).astype(np.float32)
-    M = X_all[idxs]
-    u = (M.multiply(w[:, None])).sum(axis=0) / w.sum()
-    return np.asarray(u)
+
+def history_weight_matrix(histories, all2idx, n_items: int, weighted: bool = True):
+    """
+    Matrix bobot W (n_users x n_items) dari banyak history sekaligus.
+    Baris ke-u memakai bobot yang sama dengan build_user_profile,
+    sehingga W @ X_all = profil semua user.
+    """
+    rows, cols, vals = [], [], []
+    for u, history_ids in enumerate(histories):
+        idxs = [all2idx.get(n) for n in history_ids if n in all2idx]
+        idxs = [i for i in idxs if i is not None]
+        if not idxs:
+            continue
+
+        if weighted:
+            w = np.linspace(1.0, 2.0, num=len(idxs)).astype(np.float32).astype(np.float64)
+        else:
+            w = np.ones(len(idxs), dtype=np.float64)
+
+        rows.extend([u] * len(idxs))
+        cols.extend(idxs)
+        vals.append(w / w.sum())
+
+    vals = np.concatenate(vals) if vals else np.empty(0, dtype=np.float64)
+    return sparse.csr_matrix((vals, (rows, cols)), shape=(len(histories), n_items))
+
+
+def build_user_profiles(histories, X_all, all2idx, weighted: bool = True):
+    """
+    Versi batch build_user_profile: return sparse matrix (n_users x n_terms).
+    User tanpa history yang dikenal menjadi baris nol.
+    """
+    W = history_weight_matrix(histories, all2idx, X_all.shape[0], weighted=weighted)
+    return (W @ X_all).tocsr()
 
 
 def score_candidates_batch(uvec, cand_ids, X_all, all2idx):
+    # import lokal: sklearn (~1 detik) tidak perlu dimuat saat startup
+    from sklearn.metrics.pairwise import cosine_similarity
+
     scores = np.zeros(len(cand_ids), dtype=np.float32)
     if uvec is None or len(cand_ids) == 0:
         return scores
@@ -45,8 +103,11 @@ def score_candidates_batch(uvec, cand_ids, X_all, all2idx):
         return scores
 
     cols = [idxs[j] for j in valid_pos]
-    M = X_all[cols]
-    sim = cosine_similarity(uvec, M)[0]
+    with stage("slice", rows=len(cols)) as st:
+        M = X_all[cols]
+        st.add(nnz=M.nnz)
+    with stage("cosine", rows=len(cols), nnz=M.nnz):
+        sim = cosine_similarity(uvec, M)[0]
 
     for j, s in zip(valid_pos, sim):
         scores[j] = float(s)
@@ -54,6 +115,538 @@ def score_candidates_batch(uvec, cand_ids, X_all, all2idx):
     return scores
 
 
+def l2_normalize_rows(X_all):
+    """
+    Salinan X_all (CSR) dengan setiap baris dinormalisasi L2.
+    Baris nol tetap nol (sama seperti cosine_similarity).
+    """
+    Xn = sparse.csr_matrix(X_all, dtype=np.float64, copy=True)
+    norms = sparse_norm(Xn, axis=1)
+    norms[norms == 0] = 1.0
+    Xn.data /= np.repeat(norms, np.diff(Xn.indptr))
+    return Xn
+
+
+def csr_row_block(X, start: int, stop: int):
+    """Baris [start, stop) CSR sebagai view data/indices (tanpa salin, aman untuk mmap)."""
+    lo, hi = int(X.indptr[start]), int(X.indptr[stop])
+    return sparse.csr_matrix(
+        (X.data[lo:hi], X.indices[lo:hi], X.indptr[start:stop + 1] - lo),
+        shape=(stop - start, X.shape[1]), copy=False,
+    )
+
+
+def topk_rows(S, k: int):
+    """
+    Versi per-baris dari topk_indices untuk matrix skor dense (n_users x n_items).
+    Return (idx, scores), keduanya (n_users x k), urut menurun.
+    """
+    k = min(int(k), S.shape[1])
+    if k <= 0:
+        return np.empty((S.shape[0], 0), dtype=np.int64), np.empty((S.shape[0], 0))
+
+    if k < S.shape[1]:
+        part = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(S.shape[1]), (S.shape[0], 1))
+
+    part.sort(axis=1)
+    ps = np.take_along_axis(S, part, axis=1)
+    order = np.argsort(-ps, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(ps, order, axis=1)
+
+
+def topk_indices(scores, k: int):
+    """
+    Index k skor tertinggi (urut menurun) dengan partial selection,
+    tanpa full argsort. Skor -inf dianggap sudah dibuang.
+    """
+    scores = np.asarray(scores)
+    k = min(int(k), len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+
+    part = part[np.lexsort((part, -scores[part]))]
+    return part[np.isfinite(scores[part])]
+
+
+class CatalogScorer:
+    """
+    Scorer exact untuk seluruh katalog.
+    Dibangun sekali saat load: X_all yang sudah dinormalisasi L2 dan
+    array news_id per baris, sehingga satu request = satu sparse mat-vec
+    + partial top-k (tanpa candidate pool).
+
+    retrieval="maxscore" memakai InvertedIndex (dibangun saat pertama dipakai)
+    dan hanya men-score berita yang berbagi term berbobot tinggi dengan profil.
+
+    precision="float32" / "int8" men-score retrieval exact dari CompactMatrix
+    (data float32 atau uint8 + skala per baris, index kolom uint16) alih-alih
+    X_norm float64 (yang tidak disimpan; lihat property X_norm); cek kesamaan
+    ranking dengan evaluation.compare_precision.
+
+    retrieval="ann" memakai DenseANNIndex (embedding SVD + IVF, lihat ann_index);
+    skor yang dikembalikan adalah cosine di ruang embedding.
+
+    retrieval="item_knn" memakai tabel tetangga offline (ItemNeighbors, lihat
+    item_neighbors): gabungan tetangga item history, tanpa profil maupun scoring
+    katalog; skor = rata-rata (berbobot) cosine ke item history.
+
+    shards > 1: matrix scoring exact dibagi menjadi blok baris berurutan saat
+    load (view, tanpa salin); satu request men-score semua blok paralel di
+    thread pool (sparse mat-vec scipy/numpy melepas GIL), tiap blok top-k
+    lokal, lalu digabung. Blok minimal min_shard_rows baris.
+    """
+
+    def __init__(
+        self,
+        X_all,
+        all2idx,
+        X_norm=None,
+        meta=None,
+        precision: str = "float64",
+        ann=None,
+        neighbors=None,
+        shards: int = 1,
+        min_shard_rows: int = 20000,
+    ):
+        if precision not in PRECISION_MODES:
+            raise ValueError(f"precision tidak dikenal: {precision} (pilihan: {PRECISION_MODES})")
+        self.X_all = X_all
+        self.all2idx = all2idx
+        self.meta = meta
+        self.precision = precision
+        if X_norm is None:
+            X_norm = l2_normalize_rows(X_all)
+        self.n_items, self.n_terms = X_norm.shape
+        self.nnz = X_norm.nnz
+        # mode compact: X_norm float64 tidak disimpan (hanya CompactMatrix),
+        # semua jalur scoring memakai CompactMatrix (lihat property X_norm)
+        self.compact = None if precision == "float64" else CompactMatrix.from_csr(X_norm, precision)
+        self._X_norm = X_norm if self.compact is None else None
+        self.ann = ann
+        self.neighbors = neighbors
+
+        self.ids = np.empty(self.n_items, dtype=object)
+        for nid, i in all2idx.items():
+            self.ids[i] = nid
+
+        self._inverted_index = None
+        self._subsets = {}
+
+        self.shards = max(1, min(int(shards), self.n_items // max(int(min_shard_rows), 1)))
+        self._blocks = []
+        self._pool = None
+        if self.shards > 1:
+            bounds = np.linspace(0, self.n_items, self.shards + 1).astype(np.int64)
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                if self.compact is not None:
+                    M = self.compact.row_block(start, stop)
+                else:
+                    M = csr_row_block(self._X_norm, start, stop)
+                self._blocks.append((int(start), int(stop), M))
+            self._pool = ThreadPoolExecutor(max_workers=self.shards, thread_name_prefix="shard")
+        set_gauge("scorer_shards", self.shards)
+
+    @property
+    def X_norm(self):
+        """
+        X_all ternormalisasi sebagai CSR scipy. Mode float64: matrix asli.
+        Mode compact: salinan baru dari CompactMatrix (float32, di-dequantize)
+        setiap kali diminta dan tidak disimpan; hanya untuk pemanggil di luar
+        scorer (mis. build index). Semua jalur scorer (exact, batch, sharded,
+        maxscore, filter, MMR) bekerja langsung dari CompactMatrix.
+        """
+        if self._X_norm is None:
+            return self.compact.to_csr()
+        return self._X_norm
+
+    @property
+    def inverted_index(self):
+        if self._inverted_index is None:
+            self._inverted_index = InvertedIndex(self.compact if self.compact is not None else self._X_norm)
+        return self._inverted_index
+
+    def rows_of(self, news_ids):
+        rows = [self.all2idx.get(n) for n in news_ids]
+        return np.asarray([i for i in rows if i is not None], dtype=np.int64)
+
+    def seen_mask(self, history_ids):
+        mask = np.zeros(self.n_items, dtype=bool)
+        mask[self.rows_of(history_ids)] = True
+        return mask
+
+    @staticmethod
+    def normalize_profile(uvec):
+        """Profil dense 1-D ter-normalisasi L2, atau None jika kosong."""
+        if uvec is None:
+            return None
+        if sparse.issparse(uvec):
+            uvec = uvec.toarray()
+        u = np.asarray(uvec, dtype=np.float64).ravel()
+        unorm = np.linalg.norm(u)
+        if unorm == 0:
+            return None
+        return u / unorm
+
+    def _score_block(self, M, q):
+        if self.compact is not None:
+            return np.asarray(M.matvec(q), dtype=np.float64)
+        return M @ q
+
+    def _score_profiles(self, M, UT):
+        """Skor dense (n_profiles x baris M) untuk profil UT (n_terms x n_profiles)."""
+        if self.compact is not None:
+            return M.score_profiles(UT)
+        return (M @ UT).T.toarray()
+
+    def score(self, uvec):
+        """Cosine similarity uvec terhadap seluruh baris katalog."""
+        q = self.normalize_profile(uvec)
+        if q is None:
+            return np.zeros(self.n_items, dtype=np.float64)
+        if self._pool is not None:
+            out = np.empty(self.n_items, dtype=np.float64)
+
+            def run(block):
+                start, stop, M = block
+                out[start:stop] = self._score_block(M, q)
+
+            list(self._pool.map(run, self._blocks))
+            return out
+        return self._score_block(self.compact if self.compact is not None else self._X_norm, q)
+
+    def _topn_sharded(self, uvec, top_n, exclude_rows):
+        q = self.normalize_profile(uvec)
+        if q is None:
+            q = np.zeros(self.n_terms)
+        exclude_rows = np.asarray([] if exclude_rows is None else exclude_rows, dtype=np.int64)
+
+        def run(block):
+            start, stop, M = block
+            scores = self._score_block(M, q)
+            local = exclude_rows[(exclude_rows >= start) & (exclude_rows < stop)] - start
+            scores[local] = -np.inf
+            top = topk_indices(scores, top_n)
+            return top + start, scores[top]
+
+        with stage("score", rows=self.n_items, nnz=self.nnz):
+            parts = list(self._pool.map(run, self._blocks))
+        with stage("topk", rows=len(parts) * top_n):
+            rows = np.concatenate([r for r, _ in parts])
+            scores = np.concatenate([v for _, v in parts])
+            # urutan sama dengan topk_indices global: skor menurun, lalu row menaik
+            order = np.lexsort((rows, -scores))[:top_n]
+        return rows[order], scores[order]
+
+    def filter_rows(self, include: dict = None, exclude: dict = None):
+        """Row katalog yang lolos filter category/subcategory (butuh `meta`), atau None."""
+        if not include and not exclude:
+            return None
+        if self.meta is None:
+            raise ValueError("filter category/subcategory butuh CatalogScorer(meta=NewsMetaStore)")
+        return self.meta.facets.filter_rows(include, exclude)
+
+    def _subset_matrix(self, rows):
+        # FacetIndex mengembalikan objek array yang sama untuk filter yang sama,
+        # jadi slice X_norm[rows] cukup dibuat sekali per filter.
+        hit = self._subsets.get(id(rows))
+        if hit is not None and hit[0] is rows:
+            return hit[1]
+        sub = (self.compact if self.compact is not None else self._X_norm)[rows]
+        if len(self._subsets) >= 8:
+            self._subsets.pop(next(iter(self._subsets)))
+        self._subsets[id(rows)] = (rows, sub)
+        return sub
+
+    def _topn_subset(self, uvec, top_n, exclude_rows, rows):
+        q = self.normalize_profile(uvec)
+        Xs = self._subset_matrix(rows)
+        with stage("score", rows=len(rows), nnz=Xs.nnz):
+            scores = np.zeros(len(rows)) if q is None else np.asarray(Xs @ q, dtype=np.float64)
+        with stage("topk", rows=len(rows)):
+            if exclude_rows is not None and len(exclude_rows) and len(rows):
+                pos = np.minimum(np.searchsorted(rows, exclude_rows), len(rows) - 1)
+                hit = rows[pos] == exclude_rows
+                scores[pos[hit]] = -np.inf
+            top = topk_indices(scores, top_n)
+        return rows[top], scores[top]
+
+    def similar_items(self, news_id: str, top_n: int = 10):
+        """"More like this": list (news_id, score) dari tabel tetangga (butuh `neighbors`)."""
+        if self.neighbors is None:
+            raise ValueError("similar_items butuh tabel tetangga (scripts/build_item_neighbors.py)")
+        row = self.all2idx.get(news_id)
+        if row is None:
+            return []
+        rows, scores = self.neighbors.neighbors(row, top_n)
+        return [(self.ids[r], float(s)) for r, s in zip(rows, scores)]
+
+    def topn(
+        self, uvec, top_n: int = 10, exclude_rows=None, retrieval: str = "exact", rows=None, weighted: bool = True
+    ):
+        """
+        Return (rows, scores) top-N dari seluruh katalog,
+        baris di exclude_rows (mis. history) tidak ikut.
+        rows: subset row terurut (hasil filter_rows); hanya baris ini yang
+        di-score (selalu exact, karena subset sudah lebih kecil dari katalog).
+        retrieval="item_knn": exclude_rows (urut history) dipakai sebagai seed,
+        uvec diabaikan; weighted = bobot recency seperti build_user_profile.
+        """
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"retrieval tidak dikenal: {retrieval} (pilihan: {RETRIEVAL_MODES})")
+
+        if retrieval == "item_knn":
+            if self.neighbors is None:
+                raise ValueError("retrieval='item_knn' butuh tabel tetangga (scripts/build_item_neighbors.py)")
+            seeds = np.asarray([] if exclude_rows is None else exclude_rows, dtype=np.int64)
+            w = np.linspace(1.0, 2.0, num=len(seeds)) if weighted else None
+            with stage("item_knn", rows=len(seeds) * self.neighbors.k):
+                return self.neighbors.recommend(seeds, top_n, weights=w, exclude_rows=seeds, rows=rows)
+
+        if rows is not None:
+            return self._topn_subset(uvec, top_n, exclude_rows, rows)
+
+        if retrieval == "maxscore":
+            q = self.normalize_profile(uvec)
+            if q is None:
+                q = np.zeros(self.n_terms)
+            with stage("maxscore"):
+                return self.inverted_index.topk(q, top_n, exclude_rows=exclude_rows)
+
+        if retrieval == "ann":
+            if self.ann is None:
+                raise ValueError("retrieval='ann' butuh index ANN (scripts/build_ann_index.py)")
+            with stage("ann"):
+                return self.ann.search(self.ann.project(uvec), top_n, exclude_rows=exclude_rows)
+
+        if self._pool is not None:
+            return self._topn_sharded(uvec, top_n, exclude_rows)
+
+        with stage("score", rows=self.n_items, nnz=self.nnz):
+            scores = self.score(uvec)
+        with stage("topk", rows=self.n_items):
+            if exclude_rows is not None and len(exclude_rows):
+                scores[exclude_rows] = -np.inf
+            rows = topk_indices(scores, top_n)
+        return rows, scores[rows]
+
+    def recommend(
+        self,
+        history_ids,
+        top_n: int = 10,
+        weighted: bool = True,
+        retrieval: str = "exact",
+        uvec=None,
+        include: dict = None,
+        exclude: dict = None
+    ):
+        """
+        uvec: profil yang sudah dihitung (mis. dari ProfileCache), opsional.
+        include/exclude: filter {"category": [...], "subcategory": [...]}.
+        """
+        if uvec is None and retrieval != "item_knn":
+            uvec = build_user_profile(history_ids, self.X_all, self.all2idx, weighted=weighted)
+        rows, scores = self.topn(
+            uvec, top_n, exclude_rows=self.rows_of(history_ids), retrieval=retrieval,
+            rows=self.filter_rows(include, exclude), weighted=weighted,
+        )
+        return [(self.ids[r], float(s)) for r, s in zip(rows, scores)]
+
+    def recommend_rows(
+        self,
+        history_ids,
+        top_n: int = 10,
+        weighted: bool = True,
+        retrieval: str = "exact",
+        uvec=None,
+        include: dict = None,
+        exclude: dict = None
+    ):
+        """
+        Seperti recommend, tetapi return list of dict {news_id, score, title,
+        category, subcategory} langsung dari NewsMetaStore (butuh `meta`).
+        """
+        if uvec is None and retrieval != "item_knn":
+            uvec = build_user_profile(history_ids, self.X_all, self.all2idx, weighted=weighted)
+        rows, scores = self.topn(
+            uvec, top_n, exclude_rows=self.rows_of(history_ids), retrieval=retrieval,
+            rows=self.filter_rows(include, exclude), weighted=weighted,
+        )
+        out = self.meta.lookup(rows)
+        for r, s in zip(out, scores):
+            r["score"] = float(s)
+        return out
+
+    def recommend_diverse(
+        self,
+        history_ids,
+        top_n: int = 10,
+        weighted: bool = True,
+        retrieval: str = "exact",
+        uvec=None,
+        mmr_lambda: float = 0.7,
+        shortlist_size: int = 100,
+        max_per_category: int = None,
+        include: dict = None,
+        exclude: dict = None
+    ):
+        """
+        Rekomendasi bervariasi: shortlist top-`shortlist_size` dari seluruh
+        katalog (atau subset filter), lalu di-rerank dengan MMR (lihat
+        diversity.mmr_rerank); opsional batas item per kategori (butuh `meta`).
+        """
+        if uvec is None and retrieval != "item_knn":
+            uvec = build_user_profile(history_ids, self.X_all, self.all2idx, weighted=weighted)
+        rows, scores = self.topn(
+            uvec, max(shortlist_size, top_n), exclude_rows=self.rows_of(history_ids), retrieval=retrieval,
+            rows=self.filter_rows(include, exclude), weighted=weighted,
+        )
+        cats = None
+        if max_per_category and self.meta is not None:
+            cats = self.meta.column("category", rows)
+        with stage("mmr", rows=len(rows)):
+            X_rows = self.compact[rows] if self.compact is not None else self._X_norm[rows]
+            pick = mmr_rerank(X_rows, scores, top_n, mmr_lambda, cats, max_per_category)
+        return [(self.ids[rows[p]], float(scores[p])) for p in pick]
+
+    def topn_batch(self, W, top_n: int = 10, max_block_mb: int = 64):
+        """
+        Top-N untuk banyak user dari matrix bobot history W (n_users x n_items,
+        lihat history_weight_matrix / evaluation.profile_weights); item dengan
+        bobot > 0 dianggap sudah dibaca.
+        Semua profil = satu sparse product W @ X_all, lalu di-score per blok
+        (lihat topn_profiles).
+        Return (rows, scores), keduanya (n_users x k), slot kosong bernilai -inf.
+        """
+        with stage("batch_profiles", rows=W.shape[0]) as st:
+            U = W @ self.X_all
+            st.add(nnz=U.nnz)
+        return self.topn_profiles(U, top_n=top_n, max_block_mb=max_block_mb, seen=W)
+
+    def topn_profiles(self, U, top_n: int = 10, max_block_mb: int = 64, seen=None):
+        """
+        Top-N untuk banyak profil sparse sekaligus (n_profiles x n_terms, mis.
+        profil user atau query teks). Ukuran blok dibatasi agar matrix skor
+        dense per blok tidak melebihi max_block_mb.
+        seen: matrix (n_profiles x n_items) opsional, nonzero = tidak direkomendasikan.
+        """
+        Un = l2_normalize_rows(U)
+        k = min(int(top_n), self.n_items)
+        block = max(1, int(max_block_mb * 1024 * 1024) // (self.n_items * 8))
+        rows_out = np.empty((Un.shape[0], k), dtype=np.int64)
+        scores_out = np.empty((Un.shape[0], k), dtype=np.float64)
+        for start in range(0, Un.shape[0], block):
+            stop = min(start + block, Un.shape[0])
+            seen_u = seen_i = None
+            if seen is not None:
+                seen_u, seen_i = seen[start:stop].nonzero()
+            if self._pool is not None:
+                rows_out[start:stop], scores_out[start:stop] = self._topk_profiles_sharded(
+                    Un[start:stop].T.tocsr(), k, seen_u, seen_i
+                )
+                continue
+
+            with stage("batch_score", rows=stop - start, nnz=self.nnz):
+                S = self._score_profiles(
+                    self.compact if self.compact is not None else self._X_norm, Un[start:stop].T.tocsr()
+                )
+
+            with stage("batch_topk", rows=stop - start):
+                if seen_u is not None:
+                    S[seen_u, seen_i] = -np.inf
+                rows_out[start:stop], scores_out[start:stop] = topk_rows(S, k)
+
+        return rows_out, scores_out
+
+    def _topk_profiles_sharded(self, UT, k, seen_u=None, seen_i=None):
+        def run(block):
+            start, stop, M = block
+            S = self._score_profiles(M, UT)
+            if seen_u is not None:
+                hit = (seen_i >= start) & (seen_i < stop)
+                S[seen_u[hit], seen_i[hit] - start] = -np.inf
+            r, v = topk_rows(S, k)
+            return r + start, v
+
+        with stage("batch_score", rows=UT.shape[1], nnz=self.nnz):
+            parts = list(self._pool.map(run, self._blocks))
+        with stage("batch_topk", rows=UT.shape[1]):
+            R = np.hstack([r for r, _ in parts])
+            V = np.hstack([v for _, v in parts])
+            order = np.lexsort((R, -V), axis=1)[:, :k]
+        return np.take_along_axis(R, order, axis=1), np.take_along_axis(V, order, axis=1)
+
+    def recommend_query(
+        self,
+        query_vec,
+        top_n: int = 10,
+        retrieval: str = "exact",
+        include: dict = None,
+        exclude: dict = None
+    ):
+        """
+        Rekomendasi dari vektor TF-IDF query teks bebas (QueryVectorizer.transform_one
+        atau vectorizer.transform); scorer top-k sama dengan profil user.
+        """
+        if retrieval == "item_knn":
+            raise ValueError("retrieval='item_knn' butuh history, bukan query teks")
+        if query_vec is None or sparse.csr_matrix(query_vec).nnz == 0:
+            return []  # tidak ada term query yang dikenal vocabulary
+        rows, scores = self.topn(
+            query_vec, top_n, retrieval=retrieval, rows=self.filter_rows(include, exclude)
+        )
+        return [(self.ids[r], float(s)) for r, s in zip(rows, scores) if s > 0]
+
+    def recommend_queries(self, query_mat, top_n: int = 10, max_block_mb: int = 64):
+        """Versi batch recommend_query (exact): satu sparse product per blok query."""
+        rows, scores = self.topn_profiles(sparse.csr_matrix(query_mat), top_n=top_n, max_block_mb=max_block_mb)
+        out = []
+        for r, sc in zip(rows, scores):
+            keep = np.isfinite(sc) & (sc > 0)
+            out.append([(self.ids[i], float(v)) for i, v in zip(r[keep], sc[keep])])
+        return out
+
+    def recommend_batch(
+        self,
+        histories,
+        top_n: int = 10,
+        weighted: bool = True,
+        max_block_mb: int = 64
+    ):
+        """
+        Rekomendasi untuk banyak user sekaligus (lihat topn_batch).
+        Return list of [(news_id, score), ...] dengan urutan sama seperti input.
+        """
+        histories = list(histories)
+        W = history_weight_matrix(histories, self.all2idx, self.n_items, weighted=weighted)
+        rows, scores = self.topn_batch(W, top_n=top_n, max_block_mb=max_block_mb)
+
+        out = []
+        for r, sc in zip(rows, scores):
+            keep = np.isfinite(sc)
+            out.append([(self.ids[i], float(v)) for i, v in zip(r[keep], sc[keep])])
+        return out
+
+
+def facet_mask(news_df, include: dict = None, exclude: dict = None):
+    """Mask baris DataFrame untuk filter include/exclude (jalur tanpa scorer)."""
+    mask = np.ones(len(news_df), dtype=bool)
+    for field, values in (include or {}).items():
+        if values:
+            mask &= news_df[field].astype(str).isin([str(v) for v in values]).to_numpy()
+    for field, values in (exclude or {}).items():
+        if values:
+            mask &= ~news_df[field].astype(str).isin([str(v) for v in values]).to_numpy()
+    return mask
+
+
+@traced("recommend_topn")
 def recommend_topn(
     history_ids,
     news_all_df,
@@ -63,71 +656,220 @@ def recommend_topn(
     candidate_pool_size: int = 20000,
     weighted_profile: bool = True,
     random_pool: bool = False,
-    seed: int = 42
+    seed: int = 42,
+    scorer: CatalogScorer = None,
+    retrieval: str = "exact",
+    uvec=None,
+    diversity: bool = False,
+    mmr_lambda: float = 0.7,
+    shortlist_size: int = 100,
+    max_per_category: int = None,
+    include: dict = None,
+    exclude: dict = None
 ):
+    """
+    Jika `scorer` diberikan (dan bukan random_pool), seluruh katalog di-score
+    dengan mode `retrieval` ("exact", "maxscore" via inverted index,
+    "ann" via index embedding dense, atau "item_knn" via tabel tetangga item);
+    candidate_pool_size hanya dipakai oleh mode lama.
+    uvec: profil yang sudah dihitung (dense atau sparse), agar tidak dibangun ulang.
+    diversity: rerank MMR atas shortlist top-`shortlist_size` (mmr_lambda = bobot
+    relevansi vs keragaman, max_per_category = batas item per kategori);
+    pengganti random_pool yang deterministik.
+    include/exclude: filter {"category": [...], "subcategory": [...]}; dengan
+    scorer hanya row yang lolos filter yang di-score (FacetIndex), tanpa
+    scorer pool kandidat difilter lebih dulu.
+    """
+    if scorer is not None and not random_pool:
+        if diversity:
+            return scorer.recommend_diverse(
+                history_ids, top_n=top_n, weighted=weighted_profile, retrieval=retrieval, uvec=uvec,
+                mmr_lambda=mmr_lambda, shortlist_size=shortlist_size, max_per_category=max_per_category,
+                include=include, exclude=exclude,
+            )
+        return scorer.recommend(
+            history_ids, top_n=top_n, weighted=weighted_profile, retrieval=retrieval, uvec=uvec,
+            include=include, exclude=exclude,
+        )
 
-    seen = set(history_ids)
+    with stage("candidates") as st:
+        seen = set(history_ids)
 
-    all_ids = news_all_df["news_id"].tolist() if "news_id" in news_all_df.columns else list(all2idx.keys())
+        all_ids = news_all_df["news_id"].tolist() if "news_id" in news_all_df.columns else list(all2idx.keys())
+        if include or exclude:
+            all_ids = news_all_df["news_id"][facet_mask(news_all_df, include, exclude)].tolist()
 
-    if random_pool:
-        rng = np.random.default_rng(seed)
-        candidates = [nid for nid in all_ids if nid not in seen]
-        if len(candidates) > candidate_pool_size:
-            pool = rng.choice(candidates, size=candidate_pool_size, replace=False).tolist()
+        if random_pool:
+            rng = np.random.default_rng(seed)
+            candidates = [nid for nid in all_ids if nid not in seen]
+            if len(candidates) > candidate_pool_size:
+                pool = rng.choice(candidates, size=candidate_pool_size, replace=False).tolist()
+            else:
+                pool = candidates
         else:
-            pool = candidates
-    else:
-        pool = []
-        for nid in all_ids:
-            if nid in seen:
-                continue
-            pool.append(nid)
-            if len(pool) >= candidate_pool_size:
-                break
+            pool = []
+            for nid in all_ids:
+                if nid in seen:
+                    continue
+                pool.append(nid)
+                if len(pool) >= candidate_pool_size:
+                    break
+        st.add(rows=len(pool))
 
-    uvec = build_user_profile(history_ids, X_all, all2idx, weighted=weighted_profile)
+    if uvec is None:
+        uvec = build_user_profile(history_ids, X_all, all2idx, weighted=weighted_profile)
     scores = score_candidates_batch(uvec, pool, X_all, all2idx)
 
-    order = np.argsort(-scores)
+    with stage("argsort", rows=len(pool)):
+        order = np.argsort(-scores)
+
+    if diversity:
+        short = [i for i in order[:max(shortlist_size, top_n)] if pool[i] in all2idx]
+        ids = [pool[i] for i in short]
+        cats = None
+        if max_per_category and "category" in news_all_df.columns:
+            cat_of = dict(zip(news_all_df["news_id"], news_all_df["category"]))
+            cats = [cat_of.get(n, "") for n in ids]
+        with stage("mmr", rows=len(short)):
+            Xs = l2_normalize_rows(X_all[[all2idx[n] for n in ids]])
+            pick = mmr_rerank(Xs, scores[short], top_n, mmr_lambda, cats, max_per_category)
+        return [(ids[p], float(scores[short[p]])) for p in pick]
+
     top = [(pool[i], float(scores[i])) for i in order[:top_n]]
     return top
 
 
-def explain_top_terms(vectorizer, uvec, item_vec, top_k=10):
+def recommend_topn_batch(
+    histories,
+    X_all,
+    all2idx,
+    top_n: int = 10,
+    weighted_profile: bool = True,
+    max_block_mb: int = 64,
+    scorer: CatalogScorer = None
+):
     """
-    Explainability sederhana:
-      - top terms di user profile dan item (berdasarkan TF-IDF tertinggi)
+    Batch entry point: list of history -> list of [(news_id, score), ...]
+    dengan urutan sama seperti input.
     """
-    if uvec is None:
-        return {"user_terms": [], "item_terms": []}
+    if scorer is None:
+        scorer = CatalogScorer(X_all, all2idx)
+    return scorer.recommend_batch(
+        histories, top_n=top_n, weighted=weighted_profile, max_block_mb=max_block_mb
+    )
 
+
+_FEATURE_NAMES = weakref.WeakKeyDictionary()
+
+
+def feature_names(vectorizer):
+    """
+    Array nama fitur vectorizer, dihitung sekali per objek vectorizer
+    (get_feature_names_out membangun array 80k elemen setiap dipanggil).
+    """
     try:
-        feats = vectorizer.get_feature_names_out()
-    except Exception:
+        feats = _FEATURE_NAMES.get(vectorizer)
+    except TypeError:
         feats = None
+    if feats is None:
+        try:
+            feats = np.asarray(vectorizer.get_feature_names_out(), dtype=object)
+        except Exception:
+            return None
+        try:
+            _FEATURE_NAMES[vectorizer] = feats
+        except TypeError:
+            pass
+    return feats
 
-    u = np.asarray(uvec).ravel()
-    i = item_vec.toarray().ravel()
 
-    def top_terms(vec):
-        if feats is None:
-            return []
-        idx = np.argsort(-vec)[:top_k]
-        out = []
-        for j in idx:
-            if vec[j] <= 0:
-                break
-            out.append((str(feats[j]), float(vec[j])))
-        return out
+def _sparse_parts(vec):
+    """(indices, values) nonzero dari vektor dense / sparse 1 baris."""
+    if sparse.issparse(vec):
+        vec = sparse.csr_matrix(vec)
+        return vec.indices, vec.data
+    v = np.asarray(vec).ravel()
+    idx = np.flatnonzero(v)
+    return idx, v[idx]
+
+
+def _top_terms(indices, values, feats, top_k: int):
+    """Top-k term dari nonzero saja (partial selection), hanya bobot > 0."""
+    if feats is None or len(values) == 0:
+        return []
+    keep = values > 0
+    indices, values = indices[keep], values[keep]
+    order = topk_indices(values, top_k)
+    return [(str(feats[indices[j]]), float(values[j])) for j in order]
+
+
+def explain_top_terms(vectorizer, uvec, item_vec, top_k=10, feats=None):
+    """
+    Explainability sederhana:
+      - top terms di user profile dan item (berdasarkan TF-IDF tertinggi)
+    Hanya entri nonzero yang diproses; nama fitur di-cache per vectorizer.
+    """
+    if uvec is None:
+        return {"user_terms": [], "item_terms": []}
+
+    if feats is None:
+        feats = feature_names(vectorizer)
 
     return {
-        "user_terms": top_terms(u),
-        "item_terms": top_terms(i),
+        "user_terms": _top_terms(*_sparse_parts(uvec), feats, top_k),
+        "item_terms": _top_terms(*_sparse_parts(item_vec), feats, top_k),
     }
 
 
+def explain_batch(vectorizer, uvec, news_ids, X_all, all2idx, top_k=10, feats=None):
+    """
+    Explainability untuk seluruh list rekomendasi dalam satu panggilan.
+    Return dict news_id -> {
+        "user_terms": top term profil (sama untuk semua item),
+        "item_terms": top term item,
+        "shared_terms": [(term, kontribusi, bobot_user, bobot_item)]
+    } dengan kontribusi = bobot user x bobot item, diurutkan menurun.
+    """
+    if feats is None:
+        feats = feature_names(vectorizer)
+
+    rows = [all2idx.get(n) for n in news_ids]
+    known = [(n, r) for n, r in zip(news_ids, rows) if r is not None]
+    if uvec is None or not known:
+        return {n: {"user_terms": [], "item_terms": [], "shared_terms": []} for n in news_ids}
+
+    with stage("explain", rows=len(known)):
+        return _explain_known(uvec, news_ids, known, X_all, top_k, feats)
+
+
+def _explain_known(uvec, news_ids, known, X_all, top_k, feats):
+    u_idx, u_val = _sparse_parts(uvec)
+    user_terms = _top_terms(u_idx, u_val, feats, top_k)
+    u = np.zeros(X_all.shape[1], dtype=np.float64)
+    u[u_idx] = u_val
+
+    M = sparse.csr_matrix(X_all[[r for _, r in known]])
+    contrib = M.data * u[M.indices]
+
+    out = {n: {"user_terms": user_terms, "item_terms": [], "shared_terms": []} for n in news_ids}
+    for k, (nid, _) in enumerate(known):
+        lo, hi = M.indptr[k], M.indptr[k + 1]
+        idx, val, con = M.indices[lo:hi], M.data[lo:hi], contrib[lo:hi]
+        shared = []
+        if feats is not None:
+            for j in topk_indices(np.where(con > 0, con, -np.inf), top_k):
+                shared.append((str(feats[idx[j]]), float(con[j]), float(u[idx[j]]), float(val[j])))
+        out[nid] = {
+            "user_terms": user_terms,
+            "item_terms": _top_terms(idx, val, feats, top_k),
+            "shared_terms": shared,
+        }
+    return out
+
+
 def most_similar_history_items(uvec, history_ids, X_all, all2idx, top_k=3):
+    from sklearn.metrics.pairwise import cosine_similarity
+
     idxs = [all2idx.get(n) for n in history_ids if n in all2idx]
     idxs = [i for i in idxs if i is not None]
     if not idxs or uvec is None:
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from instrumentation import set_gauge, stage
+
+# Cache hasil rekomendasi yang dibagi lintas sesi & proses: satu file SQLite
+# (mode WAL, aman dipakai beberapa proses Streamlit/worker sekaligus).
+#   key     = sha1 JSON kanonik (history + parameter rekomendasi + versi artifacts)
+#   version = artifact_version(): hash nama/ukuran/mtime file artifacts, jadi
+#             rebuild, append_news (segments.json) atau index baru otomatis
+#             membuat entry lama tidak terpakai (dihapus saat open/prune).
+# Eviction LRU berdasarkan last_access dengan batas max_entries, plus TTL.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access);
+"""
+
+
+def artifact_version(artifact_dir: str) -> str:
+    """Hash (nama, ukuran, mtime) semua file di folder artifacts, termasuk segments.json."""
+    h = hashlib.sha1()
+    for entry in sorted(os.scandir(artifact_dir), key=lambda e: e.name):
+        if entry.is_file() and not entry.name.endswith(".tmp"):
+            st = entry.stat()
+            h.update(f"{entry.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items() if v is not None and v != [] and v != {}}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(v) for v in value)
+    if hasattr(value, "item"):  # skalar numpy
+        return value.item()
+    return value
+
+
+def request_key(history_ids, version: str, **params) -> str:
+    """
+    Key kanonik satu request: urutan history dipertahankan (bobot recency
+    bergantung urutan), parameter None/kosong dihilangkan, dan nilai filter
+    include/exclude diurutkan.
+    """
+    for name in ("include", "exclude"):
+        if params.get(name):
+            params[name] = {k: sorted(str(x) for x in v) for k, v in params[name].items() if v}
+    payload = {"history": [str(h) for h in history_ids], "params": _canonical(params), "version": version}
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache list (news_id, score) per request di SQLite.
+    max_entries: batas jumlah entry (LRU); ttl_seconds: umur maksimum entry
+    (None = tanpa batas). last_access hanya diperbarui jika lebih lama dari
+    touch_seconds, sehingga cache hit umumnya cukup satu SELECT.
+    hits / misses dihitung per proses (lihat stats()).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        version: str,
+        max_entries: int = 10000,
+        ttl_seconds: float = 24 * 3600,
+        touch_seconds: float = 60.0,
+    ):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.touch = touch_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as db:
+            db.executescript(SCHEMA)
+            # invalidasi: entry dari versi artifacts lain tidak akan pernah hit
+            db.execute("DELETE FROM results WHERE version != ?", (version,))
+
+    def _conn(self):
+        # satu koneksi per thread (sqlite3 tidak boleh dibagi antar thread)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def key(self, history_ids, **params) -> str:
+        return request_key(history_ids, self.version, **params)
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str):
+        """List (news_id, score) untuk key, atau None (miss / kedaluwarsa)."""
+        with stage("result_cache_get"):
+            now = time.time()
+            db = self._conn()
+            row = db.execute(
+                "SELECT value, created, last_access FROM results WHERE key = ? AND version = ?",
+                (key, self.version),
+            ).fetchone()
+            if row is None:
+                self._count(False)
+                return None
+            value, created, last_access = row
+            if self.ttl is not None and now - created > self.ttl:
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+                with self._lock:
+                    self.expired += 1
+                self._count(False)
+                return None
+            if now - last_access > self.touch:
+                db.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self._count(True)
+            return [(nid, score) for nid, score in json.loads(value)]
+
+    def put(self, key: str, recs):
+        with stage("result_cache_put", rows=len(recs)):
+            now = time.time()
+            value = json.dumps([[str(nid), float(score)] for nid, score in recs])
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, version, value, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, self.version, value, now, now),
+            )
+            self._evict(db)
+
+    def _evict(self, db):
+        n = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if n > self.max_entries:
+            db.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY last_access ASC LIMIT ?)",
+                (n - self.max_entries,),
+            )
+
+    def get_or_compute(self, history_ids, compute, **params):
+        """
+        Return (recs, hit). compute() dipanggil saat miss dan hasilnya disimpan;
+        params = argumen yang menentukan hasil (top_n, weighted_profile, seed, ...).
+        """
+        key = self.key(history_ids, **params)
+        recs = self.get(key)
+        if recs is not None:
+            return recs, True
+        recs = compute()
+        self.put(key, recs)
+        return recs, False
+
+    def prune(self) -> int:
+        """Hapus entry kedaluwarsa / versi lain; return jumlah yang dihapus."""
+        db = self._conn()
+        cur = db.execute(
+            "DELETE FROM results WHERE version != ? OR created < ?",
+            (self.version, time.time() - self.ttl if self.ttl is not None else float("-inf")),
+        )
+        return cur.rowcount
+
+    def clear(self):
+        self._conn().execute("DELETE FROM results")
+
+    def stats(self) -> dict:
+        entries = self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        with self._lock:
+            total = self.hits + self.misses
+            out = {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+        set_gauge("result_cache_entries", entries)
+        set_gauge("result_cache_hit_rate", out["hit_rate"])
+        return out
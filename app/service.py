@@ -0,0 +1,455 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import instrumentation
+from recommender import build_user_profile, explain_batch, feature_names, recommend_topn
+from startup import Prewarm
+from text_query import QueryVectorizer
+
+# Service rekomendasi lokal (stdlib saja): front end HTTP asyncio, request
+# /recommend yang datang bersamaan dikumpulkan menjadi micro-batch dalam
+# jendela waktu kecil lalu di-score dengan satu sparse product
+# (CatalogScorer.recommend_batch) di thread pool. Artifacts dimuat sekali.
+
+MAX_BODY = 1024 * 1024
+
+
+class ServiceBusy(Exception):
+    """Antrean micro-batch penuh; dijawab HTTP 503 agar client mundur/coba lagi."""
+
+
+class _Pending:
+    __slots__ = ("history", "top_n", "future", "t0")
+
+    def __init__(self, history, top_n, future):
+        self.history = history
+        self.top_n = top_n
+        self.future = future
+        self.t0 = time.perf_counter()
+
+
+class LatencyStats:
+    """Ring buffer latensi (detik) untuk p50/p95/p99 di /health."""
+
+    def __init__(self, size: int = 4096):
+        self.buf = np.zeros(size, dtype=np.float64)
+        self.n = 0
+
+    def add(self, seconds: float):
+        self.buf[self.n % len(self.buf)] = seconds
+        self.n += 1
+
+    def summary(self) -> dict:
+        vals = self.buf[:min(self.n, len(self.buf))]
+        if len(vals) == 0:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(vals, [50, 95, 99]) * 1000
+        return {"count": self.n, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3)}
+
+
+class RecommenderService:
+    """
+    Inti service (tanpa HTTP). Request exact tanpa random pool masuk antrean
+    micro-batch per mode profil (weighted / mean); request lain (maxscore,
+    ann, diversity, filter kategori, random pool) dijalankan satu per satu di pool yang sama.
+    max_batch / max_wait_ms membatasi ukuran batch dan tambahan latensi,
+    workers membatasi batch yang diproses bersamaan (backpressure), max_queue
+    membatasi request yang menunggu per antrean (lebih dari itu: ServiceBusy / 503).
+    vectorizer boleh berupa callable tanpa argumen (loader): dimuat di
+    background setelah start() sehingga service langsung melayani /recommend.
+    """
+
+    def __init__(
+        self,
+        scorer,
+        vectorizer=None,
+        news_all=None,
+        profile_cache=None,
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        workers: int = 2,
+        max_queue: int = 1024,
+    ):
+        self.scorer = scorer
+        self._lazy = Prewarm({
+            "vectorizer": vectorizer if callable(vectorizer) else (lambda: vectorizer),
+            "feature_names": lambda: feature_names(self.vectorizer) if self.vectorizer is not None else None,
+            "query_vectorizer": lambda: QueryVectorizer(self.vectorizer) if self.vectorizer is not None else None,
+        })
+        self.news_all = news_all
+        self.profile_cache = profile_cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rejected = 0
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommend")
+        self._queues = {}
+        self._tasks = []
+        self._slots = None
+        self.batches = 0
+        self.batched_requests = 0
+        self.latency = {"recommend": LatencyStats(), "explain": LatencyStats(), "recommend_text": LatencyStats()}
+
+    async def start(self):
+        self._lazy.start(["feature_names", "query_vectorizer"])
+        self._slots = asyncio.Semaphore(self.workers)
+        for weighted in (True, False):
+            self._queues[weighted] = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks.append(asyncio.ensure_future(self._batch_loop(weighted)))
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        self.pool.shutdown(wait=False)
+
+    @property
+    def vectorizer(self):
+        return self._lazy.get("vectorizer")
+
+    @property
+    def feats(self):
+        return self._lazy.get("feature_names")
+
+    @property
+    def query_vectorizer(self):
+        return self._lazy.get("query_vectorizer")
+
+    def _profile(self, history, weighted):
+        if self.profile_cache is not None:
+            return self.profile_cache.get(history, weighted=weighted)
+        return None
+
+    async def _batch_loop(self, weighted: bool):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[weighted]
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            fut = loop.run_in_executor(self.pool, self._score_batch, batch, weighted)
+            fut.add_done_callback(lambda f, b=batch: self._finish(f, b))
+
+    def _score_batch(self, batch, weighted):
+        top_n = max(p.top_n for p in batch)
+        return self.scorer.recommend_batch([p.history for p in batch], top_n=top_n, weighted=weighted)
+
+    def _finish(self, fut, batch):
+        self._slots.release()
+        self.batches += 1
+        self.batched_requests += len(batch)
+        exc = fut.exception()
+        for i, p in enumerate(batch):
+            if p.future.done():
+                continue
+            if exc is not None:
+                p.future.set_exception(exc)
+            else:
+                p.future.set_result(fut.result()[i][:p.top_n])
+                self.latency["recommend"].add(time.perf_counter() - p.t0)
+
+    async def recommend(
+        self,
+        history,
+        top_n: int = 10,
+        weighted: bool = True,
+        retrieval: str = "exact",
+        random_pool: bool = False,
+        candidate_pool_size: int = 20000,
+        seed: int = 42,
+        diversity: bool = False,
+        mmr_lambda: float = 0.7,
+        max_per_category: int = None,
+        include: dict = None,
+        exclude: dict = None,
+    ):
+        """
+        List (news_id, score) seperti recommend_topn; history kosong atau tanpa
+        satu pun news_id yang dikenal katalog -> [] (tidak ada profil).
+        """
+        history = [str(h) for h in history]
+        if not any(h in self.scorer.all2idx for h in history):
+            return []
+        loop = asyncio.get_running_loop()
+        if retrieval == "exact" and not random_pool and not diversity and not include and not exclude:
+            fut = loop.create_future()
+            try:
+                self._queues[bool(weighted)].put_nowait(_Pending(history, int(top_n), fut))
+            except asyncio.QueueFull:
+                self.rejected += 1
+                raise ServiceBusy("antrean rekomendasi penuh") from None
+            return await fut
+
+        t0 = time.perf_counter()
+
+        def run():
+            return recommend_topn(
+                history, self.news_all, self.scorer.X_all, self.scorer.all2idx,
+                top_n=top_n, candidate_pool_size=candidate_pool_size,
+                weighted_profile=weighted, random_pool=random_pool, seed=seed,
+                scorer=self.scorer, retrieval=retrieval, uvec=self._profile(history, weighted),
+                diversity=diversity, mmr_lambda=mmr_lambda, max_per_category=max_per_category,
+                include=include, exclude=exclude,
+            )
+
+        async with self._slots:
+            out = await loop.run_in_executor(self.pool, run)
+        self.latency["recommend"].add(time.perf_counter() - t0)
+        return out
+
+    async def similar(self, news_id: str, top_n: int = 10):
+        """Lookup tabel tetangga di pool (tidak memblokir event loop)."""
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool, self.scorer.similar_items, str(news_id), int(top_n)
+            )
+
+    async def explain(self, history, news_ids, weighted: bool = True, top_k: int = 10):
+        """
+        Explanation per news_id. Vectorizer dibaca di pool, bukan di event loop:
+        selama masih dimuat di background, Prewarm.get menunggu tanpa
+        memblokir koneksi lain.
+        """
+        t0 = time.perf_counter()
+
+        def run():
+            if self.vectorizer is None:
+                raise ValueError("explain butuh vectorizer")
+            uvec = self._profile(history, weighted)
+            if uvec is None and self.profile_cache is None:
+                uvec = build_user_profile(history, self.scorer.X_all, self.scorer.all2idx, weighted=weighted)
+            return explain_batch(
+                self.vectorizer, uvec, list(news_ids), self.scorer.X_all, self.scorer.all2idx,
+                top_k=top_k, feats=self.feats,
+            )
+
+        async with self._slots:
+            out = await asyncio.get_running_loop().run_in_executor(self.pool, run)
+        self.latency["explain"].add(time.perf_counter() - t0)
+        return out
+
+    async def recommend_text(
+        self,
+        queries,
+        top_n: int = 10,
+        retrieval: str = "exact",
+        include: dict = None,
+        exclude: dict = None,
+    ):
+        """
+        Rekomendasi dari teks bebas: list query -> list of [(news_id, score), ...].
+        Beberapa query exact tanpa filter di-score sekaligus (recommend_queries).
+        QueryVectorizer (dimuat di background) dibaca di pool seperti explain.
+        """
+        queries = [str(q) for q in queries]
+        t0 = time.perf_counter()
+
+        def run():
+            if self.query_vectorizer is None:
+                raise ValueError("recommend_text butuh vectorizer")
+            Q = self.query_vectorizer.transform(queries)
+            if retrieval == "exact" and not include and not exclude and len(queries) > 1:
+                return self.scorer.recommend_queries(Q, top_n=top_n)
+            return [
+                self.scorer.recommend_query(Q[i], top_n=top_n, retrieval=retrieval, include=include, exclude=exclude)
+                for i in range(len(queries))
+            ]
+
+        async with self._slots:
+            out = await asyncio.get_running_loop().run_in_executor(self.pool, run)
+        self.latency["recommend_text"].add(time.perf_counter() - t0)
+        return out
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "n_items": int(self.scorer.n_items),
+            "shards": int(self.scorer.shards),
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+            "queued": {("weighted" if k else "mean"): q.qsize() for k, q in self._queues.items()},
+            "rejected": self.rejected,
+            "latency": {k: v.summary() for k, v in self.latency.items()},
+            "startup": self._lazy.breakdown(),
+            "query_cache": self.query_vectorizer.stats() if self._lazy.ready("query_vectorizer") and self.query_vectorizer else None,
+        }
+
+    # ---------------- HTTP ----------------
+
+    def _rows(self, recs):
+        meta = self.scorer.meta
+        metas = meta.lookup_ids([n for n, _ in recs]) if meta is not None else [{} for _ in recs]
+        out = []
+        for (nid, score), m in zip(recs, metas):
+            row = {"news_id": nid, "score": float(score)}
+            row.update({k: m.get(k, "") for k in ("category", "subcategory", "title")})
+            out.append(row)
+        return out
+
+    async def handle(self, method: str, path: str, body: dict):
+        """Return (status, payload)."""
+        if method == "GET" and path == "/health":
+            return 200, self.health()
+        if method == "GET" and path == "/metrics":
+            return 200, instrumentation.prometheus_text()
+        if method != "POST":
+            return 405, {"error": "method not allowed"}
+
+        if path == "/recommend":
+            recs = await self.recommend(
+                body.get("history", []),
+                top_n=int(body.get("top_n", 10)),
+                weighted=bool(body.get("weighted", True)),
+                retrieval=body.get("retrieval", "exact"),
+                random_pool=bool(body.get("random_pool", False)),
+                candidate_pool_size=int(body.get("candidate_pool_size", 20000)),
+                seed=int(body.get("seed", 42)),
+                diversity=bool(body.get("diversity", False)),
+                mmr_lambda=float(body.get("mmr_lambda", 0.7)),
+                max_per_category=int(body.get("max_per_category") or 0) or None,
+                include=body.get("include") or None,
+                exclude=body.get("exclude") or None,
+            )
+            return 200, {"items": self._rows(recs)}
+
+        if path == "/similar":
+            recs = await self.similar(body.get("news_id", ""), top_n=int(body.get("top_n", 10)))
+            return 200, {"items": self._rows(recs)}
+
+        if path == "/recommend_text":
+            single = "queries" not in body
+            queries = [body.get("query", "")] if single else list(body.get("queries") or [])
+            out = await self.recommend_text(
+                queries,
+                top_n=int(body.get("top_n", 10)),
+                retrieval=body.get("retrieval", "exact"),
+                include=body.get("include") or None,
+                exclude=body.get("exclude") or None,
+            )
+            if single:
+                return 200, {"items": self._rows(out[0])}
+            return 200, {"results": [self._rows(recs) for recs in out]}
+
+        if path == "/explain":
+            out = await self.explain(
+                body.get("history", []), body.get("news_ids", []),
+                weighted=bool(body.get("weighted", True)), top_k=int(body.get("top_k", 10)),
+            )
+            return 200, {"explanations": out}
+
+        return 404, {"error": f"unknown path {path}"}
+
+    async def _serve_conn(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+
+                # body yang tidak valid / terlalu besar tidak dibaca sama sekali:
+                # jawab lalu tutup koneksi (sisa body tidak bisa di-skip aman)
+                length = headers.get("content-length", "0")
+                length = int(length) if length.isdigit() else -1
+                close = length < 0 or length > MAX_BODY
+                if length < 0:
+                    status, payload = 400, {"error": "invalid Content-Length"}
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "body too large"}
+                else:
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw) if raw else {}
+                        status, payload = await self.handle(method, urlsplit(target).path, body)
+                    except ServiceBusy as e:
+                        status, payload = 503, {"error": str(e)}
+                    except (ValueError, KeyError, TypeError) as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:  # noqa: BLE001
+                        status, payload = 500, {"error": repr(e)}
+
+                if isinstance(payload, str):
+                    data, ctype = payload.encode("utf-8"), "text/plain; version=0.0.4"
+                else:
+                    data, ctype = json.dumps(payload).encode("utf-8"), "application/json"
+                keep_alive = (
+                    not close and headers.get("connection", "").lower() != "close" and version.startswith("HTTP/1.1")
+                )
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'ERROR'}\r\n"
+                    f"Content-Type: {ctype}\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765):
+        await self.start()
+        server = await asyncio.start_server(self._serve_conn, host, port)
+        print(f"[+] Serving on http://{host}:{port} (max_batch={self.max_batch}, "
+              f"window={self.max_wait * 1000:.1f}ms, workers={self.workers}, max_queue={self.max_queue}, "
+              f"shards={self.scorer.shards})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def build_service(artifact_dir: str, shards: int = 1, **kwargs) -> RecommenderService:
+    """Muat artifacts sekali lalu bangun RecommenderService (shards: lihat CatalogScorer)."""
+    from artifacts_loader import load_artifacts, load_normalized_matrix, load_vectorizer
+    from news_meta import NewsMetaStore
+    from profile_cache import ProfileCache
+    from recommender import CatalogScorer
+
+    _, news_all, all2idx, X_all, _ = load_artifacts(artifact_dir, with_vectorizer=False)
+    X_norm = load_normalized_matrix(artifact_dir)
+    scorer = CatalogScorer(
+        X_all, all2idx,
+        X_norm=X_norm,
+        meta=NewsMetaStore.from_dataframe(news_all, all2idx),
+        shards=shards,
+    )
+    try:
+        from ann_index import load_ann_index
+
+        scorer.ann = load_ann_index(artifact_dir, X_norm, all2idx=all2idx)
+    except ValueError:
+        scorer.ann = None
+    try:
+        from item_neighbors import load_item_neighbors
+
+        scorer.neighbors = load_item_neighbors(artifact_dir, X_norm, all2idx=all2idx)
+    except ValueError:
+        scorer.neighbors = None
+    return RecommenderService(
+        scorer, vectorizer=lambda: load_vectorizer(artifact_dir), news_all=news_all,
+        profile_cache=ProfileCache(X_all, all2idx), **kwargs
+    )
@@ -0,0 +1,54 @@
+import json
+import urllib.request
+
+
+class ServiceClient:
+    """
+    Client tipis untuk service.py (urllib, tanpa dependency tambahan).
+    recommend() mengembalikan list (news_id, score) seperti recommend_topn.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path: str, payload: dict = None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(
+            self.base_url + path, data=data,
+            headers={"Content-Type": "application/json"},
+            method="GET" if payload is None else "POST",
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def recommend_rows(self, history_ids, top_n: int = 10, weighted: bool = True, **kwargs):
+        """List of dict {news_id, score, category, subcategory, title}."""
+        payload = {"history": list(history_ids), "top_n": top_n, "weighted": weighted}
+        payload.update(kwargs)
+        return self._call("/recommend", payload)["items"]
+
+    def recommend(self, history_ids, top_n: int = 10, weighted: bool = True, **kwargs):
+        return [(r["news_id"], r["score"]) for r in self.recommend_rows(history_ids, top_n, weighted, **kwargs)]
+
+    def similar(self, news_id: str, top_n: int = 10):
+        """Berita termirip dengan news_id (tabel tetangga), list of dict seperti recommend_rows."""
+        return self._call("/similar", {"news_id": news_id, "top_n": top_n})["items"]
+
+    def recommend_text(self, query, top_n: int = 10, **kwargs):
+        """Rekomendasi dari teks bebas; query boleh str atau list of str (hasil per query)."""
+        if isinstance(query, str):
+            return self._call("/recommend_text", dict(kwargs, query=query, top_n=top_n))["items"]
+        return self._call("/recommend_text", dict(kwargs, queries=list(query), top_n=top_n))["results"]
+
+    def explain(self, history_ids, news_ids, weighted: bool = True, top_k: int = 10):
+        out = self._call("/explain", {
+            "history": list(history_ids), "news_ids": list(news_ids),
+            "weighted": weighted, "top_k": top_k,
+        })["explanations"]
+        for ex in out.values():
+            ex["shared_terms"] = [tuple(t) for t in ex["shared_terms"]]
+        return out
+
+    def health(self):
+        return self._call("/health")
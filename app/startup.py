@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from instrumentation import set_gauge
+
+# Cold start bertahap: artifacts inti (katalog mmap, metadata, scorer) dimuat
+# di thread background selagi UI dirender, artifacts non-kritis (vectorizer
+# untuk explainability) baru dimuat saat pertama dipakai. Waktu tiap bagian
+# dicatat untuk breakdown startup (juga sebagai gauge startup_seconds).
+
+PROCESS_T0 = time.perf_counter()
+
+
+class Prewarm:
+    """
+    Loader bernama yang masing-masing dijalankan sekali per proses.
+    start(names) menjalankan loader berurutan di satu thread background;
+    get(name) menunggu hasil thread tersebut, atau menjalankan loader di
+    thread pemanggil jika belum dimulai. Exception loader diteruskan ke get().
+    Loader boleh memanggil get() untuk loader lain (dependensi).
+    """
+
+    def __init__(self, loaders: dict = None):
+        self._loaders = dict(loaders or {})
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.timings = {}
+
+    def register(self, name: str, fn):
+        self._loaders[name] = fn
+
+    def start(self, names):
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:  # noqa: BLE001 - diteruskan lewat future ke get()
+                    pass
+
+        self._thread = threading.Thread(target=run, name="prewarm", daemon=True)
+        self._thread.start()
+        return self
+
+    def get(self, name: str):
+        with self._lock:
+            fut = self._futures.get(name)
+            owner = fut is None
+            if owner:
+                fut = self._futures[name] = Future()
+
+        if owner:
+            t0 = time.perf_counter()
+            try:
+                result, exc = self._loaders[name](), None
+            except BaseException as e:
+                result, exc = None, e
+            self._record(name, t0, time.perf_counter() - t0)
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(result)
+        elif not fut.done():
+            t0 = time.perf_counter()
+            fut.exception()
+            with self._lock:
+                self.timings[name]["waited_ms"] += round((time.perf_counter() - t0) * 1000, 3)
+        return fut.result()
+
+    def ready(self, name: str) -> bool:
+        fut = self._futures.get(name)
+        return fut is not None and fut.done()
+
+    def mark(self, name: str):
+        """Catat titik waktu (mis. UI shell selesai dirender), sekali saja."""
+        with self._lock:
+            if name not in self.timings:
+                self.timings[name] = self._entry(time.perf_counter(), 0.0, threading.current_thread().name)
+        set_gauge("startup_seconds", self.timings[name]["at_ms"] / 1000, part=name)
+
+    def _entry(self, t0, seconds, thread):
+        return {
+            "at_ms": round((t0 + seconds - PROCESS_T0) * 1000, 3),
+            "ms": round(seconds * 1000, 3),
+            "thread": thread,
+            "waited_ms": 0.0,
+        }
+
+    def _record(self, name, t0, seconds):
+        with self._lock:
+            self.timings[name] = self._entry(t0, seconds, threading.current_thread().name)
+        set_gauge("startup_seconds", seconds, part=name)
+
+    def breakdown(self):
+        """List {part, ms, at_ms, thread, waited_ms}, urut waktu selesai (at_ms sejak import proses)."""
+        with self._lock:
+            rows = [dict(part=k, **v) for k, v in self.timings.items()]
+        return sorted(rows, key=lambda r: r["at_ms"])
@@ -1,16 +1,34 @@
 # app/streamlit_app.py
+import os
+
 import pandas as pd
 import numpy as np
 import streamlit as st
-import matplotlib.pyplot as plt
 
-from artifacts_loader import resolve_artifact_dir, load_artifacts
+from ann_index import has_ann_index, load_ann_index
+from item_neighbors import has_item_neighbors, load_item_neighbors
+import instrumentation
+from artifacts_loader import (
+    resolve_artifact_dir,
+    load_artifacts,
+    load_metrics,
+    load_news_meta,
+    load_normalized_matrix,
+    load_vectorizer,
+)
 from recommender import (
+    CatalogScorer,
     recommend_topn,
-    build_user_profile,
-    explain_top_terms,
-    safe_news_meta,
+    explain_batch,
+    feature_names,
 )
+from news_meta import NewsMetaStore
+from profile_cache import ProfileCache
+from result_cache import ResultCache, artifact_version
+from service_client import ServiceClient
+from startup import Prewarm
+from text_query import QueryVectorizer
+from title_search import load_title_index
 from ui_components import render_metrics_cards, render_recs_table
 
 st.set_page_config(
@@ -23,24 +41,134 @@ st.set_page_config(
 # FIXED ARTIFACT PATH (NO UI INPUT)
 # =========================
 ARTIFACT_DIR = resolve_artifact_dir("../notebooks/artifacts_classification_v2")
+# float64 (default) / float32 / int8 — matrix presisi rendah untuk scoring exact
+SCORER_PRECISION = os.environ.get("SCORER_PRECISION", "float64")
+# Jumlah shard (blok baris) scoring exact yang dihitung paralel per request
+# Shard scoring paralel per proses (lihat CatalogScorer); default 1 karena
+# beberapa sesi/proses Streamlit sudah berbagi core yang sama
+SCORER_SHARDS = int(os.environ.get("SCORER_SHARDS", 1))
+# Jika diisi (mis. http://127.0.0.1:8765), scoring & explainability dilakukan
+# oleh scripts/serve.py; app hanya menjadi client tipis.
+SERVICE_URL = os.environ.get("RECOMMENDER_SERVICE_URL")
+# Cache hasil rekomendasi lintas sesi/proses (SQLite); string kosong = nonaktif
+RESULT_CACHE_PATH = os.environ.get(
+    "RESULT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "outputs", "result_cache.sqlite"),
+)
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 24 * 3600))
+
+def make_prewarm():
+    """
+    Loader artifacts per proses. Inti (katalog, metadata, index judul, scorer)
+    dimuat di thread background selagi UI dirender; vectorizer (import sklearn,
+    hanya untuk explainability) menyusul setelah inti siap.
+    Mode service (RECOMMENDER_SERVICE_URL): hanya metadata, index judul dan
+    metrics; X_all, scorer dan vectorizer dimuat oleh service.
+    """
+    prewarm = Prewarm()
+    # versi artifacts dicatat sebelum dimuat: cache hasil distempel dengan
+    # versi yang benar-benar dipakai scorer proses ini
+    version = artifact_version(ARTIFACT_DIR)
+
+    def build_meta_store():
+        if SERVICE_URL:
+            return load_news_meta(ARTIFACT_DIR)
+        _, news_all, all2idx, _, _ = prewarm.get("core")
+        return NewsMetaStore.from_dataframe(news_all, all2idx)
+
+    def build_scorer():
+        _, _, all2idx, X_all, _ = prewarm.get("core")
+        # X_norm mmap lokal: mode compact tidak menyimpan X_norm di scorer
+        X_norm = load_normalized_matrix(ARTIFACT_DIR)
+        scorer = CatalogScorer(
+            X_all, all2idx,
+            X_norm=X_norm,
+            meta=prewarm.get("meta_store"),
+            precision=SCORER_PRECISION,
+            shards=SCORER_SHARDS,
+        )
+        try:
+            scorer.ann = load_ann_index(ARTIFACT_DIR, X_norm, all2idx=all2idx)
+        except ValueError:
+            scorer.ann = None  # index untuk katalog lain: mode ann tidak tersedia
+        try:
+            scorer.neighbors = load_item_neighbors(ARTIFACT_DIR, X_norm, all2idx=all2idx)
+        except ValueError:
+            scorer.neighbors = None  # tabel untuk katalog lain: item_knn tidak tersedia
+        return scorer
+
+    prewarm.register("artifact_version", lambda: version)
+    prewarm.register("core", lambda: load_artifacts(ARTIFACT_DIR, with_vectorizer=False))
+    prewarm.register("meta_store", build_meta_store)
+    prewarm.register("metrics", lambda: load_metrics(ARTIFACT_DIR))
+    prewarm.register("title_index", lambda: load_title_index(ARTIFACT_DIR, prewarm.get("meta_store").columns["title"]))
+    prewarm.register("scorer", build_scorer)
+    prewarm.register("vectorizer", lambda: load_vectorizer(ARTIFACT_DIR))
+    prewarm.register("feature_names", lambda: feature_names(prewarm.get("vectorizer")))
+    prewarm.register("query_vectorizer", lambda: QueryVectorizer(prewarm.get("vectorizer")))
+
+    if SERVICE_URL:
+        return prewarm.start(["meta_store", "title_index", "metrics"])
+    return prewarm.start(["core", "meta_store", "title_index", "scorer", "feature_names"])
+
+@st.cache_resource(show_spinner=False)
+def cached_prewarm():
+    return make_prewarm()
 
-@st.cache_resource(show_spinner=True)
 def cached_load():
-    return load_artifacts(ARTIFACT_DIR)
+    return cached_prewarm().get("core")
+
+def cached_meta_store():
+    return cached_prewarm().get("meta_store")
+
+def cached_title_index():
+    return cached_prewarm().get("title_index")
+
+def cached_vectorizer():
+    return cached_prewarm().get("vectorizer")
+
+def cached_feature_names():
+    return cached_prewarm().get("feature_names")
+
+def cached_query_vectorizer():
+    return cached_prewarm().get("query_vectorizer")
+
+@st.cache_resource(show_spinner=False)
+def cached_profile_cache():
+    _, _, all2idx, X_all, _ = cached_load()
+    return ProfileCache(X_all, all2idx)
+
+def cached_scorer():
+    return cached_prewarm().get("scorer")
+
+@st.cache_resource(show_spinner=False)
+def cached_result_cache():
+    if not RESULT_CACHE_PATH:
+        return None
+    version = cached_prewarm().get("artifact_version")
+    return ResultCache(RESULT_CACHE_PATH, version, ttl_seconds=RESULT_CACHE_TTL)
+
+def check_artifact_version():
+    """
+    Dicek tiap rerun (stat file, murah): jika artifacts berubah sejak prewarm
+    dimuat, scorer/katalog dan cache hasil dibuang bersama, sehingga hasil
+    versi baru tidak pernah dihitung dengan scorer lama.
+    """
+    if cached_prewarm().get("artifact_version") != artifact_version(ARTIFACT_DIR):
+        cached_prewarm.clear()
+        cached_result_cache.clear()
+        cached_profile_cache.clear()
+
+@st.cache_resource(show_spinner=False)
+def cached_client():
+    return ServiceClient(SERVICE_URL)
 
 st.title("📰 Sistem Rekomendasi Berita (Content-Based)")
 st.caption("TF-IDF + Cosine Similarity dari riwayat bacaan pengguna (MIND-small)")
 
-try:
-    vectorizer, news_all, all2idx, X_all, metrics_df = cached_load()
-except Exception as e:
-    st.error(
-        "Gagal memuat model/data internal.\n\n"
-        f"Detail: {e}\n\n"
-        "Pastikan folder artifacts ada di:\n"
-        f"{ARTIFACT_DIR}"
-    )
-    st.stop()
+# Artifacts inti mulai dimuat di background; shell UI di bawah dirender dulu
+check_artifact_version()
+prewarm = cached_prewarm()
 
 # =========================
 # SIDEBAR — USER FRIENDLY
@@ -55,29 +183,100 @@ prioritize_recent = st.sidebar.checkbox(
     help="Jika aktif, riwayat bacaan yang lebih baru akan lebih memengaruhi rekomendasi."
 )
 
-candidate_pool = st.sidebar.slider(
-    "Jumlah berita yang dipertimbangkan",
-    2000, 80000, 20000, 1000,
-    help="Semakin besar, rekomendasi bisa lebih beragam tapi proses sedikit lebih lama."
-)
-
 more_varied = st.sidebar.checkbox(
     "Rekomendasi lebih bervariasi",
     value=False,
-    help="Jika aktif, sistem mengambil kandidat berita secara acak agar hasil tidak monoton."
+    help="Jika aktif, hasil teratas dipilih ulang agar tidak terlalu mirip satu sama lain (topik/kategori lebih beragam)."
 )
 
+# Mode bervariasi: rerank MMR atas shortlist hasil scoring seluruh katalog
+mmr_lambda = 0.7
+max_per_category = 0
+if more_varied:
+    mmr_lambda = st.sidebar.slider(
+        "Keseimbangan relevansi vs variasi",
+        0.3, 0.95, 0.7, 0.05,
+        help="Semakin kecil, hasil semakin beragam; semakin besar, hasil semakin mirip dengan minat utama."
+    )
+    max_per_category = st.sidebar.slider(
+        "Maksimal berita per kategori (0 = bebas)",
+        0, 10, 0, 1,
+        help="Membatasi jumlah rekomendasi dari kategori yang sama."
+    )
+
+prewarm.mark("shell_rendered")
+try:
+    with st.spinner("Memuat data berita..."):
+        if SERVICE_URL:
+            news_all = all2idx = X_all = scorer = None
+            metrics_df = prewarm.get("metrics")
+        else:
+            _, news_all, all2idx, X_all, metrics_df = cached_load()
+            scorer = cached_scorer()
+        meta_store = cached_meta_store()
+except Exception as e:
+    st.error(
+        "Gagal memuat model/data internal.\n\n"
+        f"Detail: {e}\n\n"
+        "Pastikan folder artifacts ada di:\n"
+        f"{ARTIFACT_DIR}"
+    )
+    st.stop()
+prewarm.mark("ready")
+
+# Filter kategori: hanya berita yang lolos filter yang di-score (FacetIndex)
+facet_values = meta_store.facets.values
+only_categories = st.sidebar.multiselect(
+    "Hanya kategori",
+    options=facet_values.get("category", []),
+    help="Kosongkan untuk semua kategori."
+)
+skip_categories = st.sidebar.multiselect(
+    "Kecualikan kategori",
+    options=facet_values.get("category", []),
+)
+skip_subcategories = st.sidebar.multiselect(
+    "Kecualikan subkategori",
+    options=facet_values.get("subcategory", []),
+)
+include_filter = {"category": only_categories} if only_categories else None
+exclude_filter = {k: v for k, v in (("category", skip_categories), ("subcategory", skip_subcategories)) if v} or None
+
 st.sidebar.divider()
 show_advanced = st.sidebar.checkbox("Tampilkan mode lanjutan (advanced)", value=False)
 
 if show_advanced:
-    seed = st.sidebar.number_input(
-        "Angka konsistensi (seed)",
-        value=42, step=1,
-        help="Agar hasil acak bisa konsisten saat demo. Jika sama, hasil cenderung sama."
+    retrieval = st.sidebar.selectbox(
+        "Metode retrieval",
+        options=["exact", "maxscore"]
+        + (["ann"] if has_ann_index(ARTIFACT_DIR) else [])
+        + (["item_knn"] if has_item_neighbors(ARTIFACT_DIR) else []),
+        index=0,
+        help="exact: score seluruh katalog. maxscore: inverted index dengan pruning MaxScore, hasil sama dengan exact; "
+             "lebih cepat untuk riwayat pendek, riwayat panjang otomatis di-score exact. "
+             "ann: embedding dense + index ANN (perkiraan, paling cepat untuk katalog besar). "
+             "item_knn: gabungan berita termirip dari tiap bacaan (tabel tetangga offline)."
     )
+    if st.sidebar.checkbox(
+        "Catat waktu per tahap (instrumentasi)",
+        value=instrumentation.is_enabled(),
+        help="Mengukur waktu profil, scoring, top-k, metadata, dan explainability untuk tiap permintaan."
+    ):
+        instrumentation.enable()
+    with st.sidebar.expander("🚀 Rincian startup proses ini"):
+        # at_ms: sejak modul dimuat; thread prewarm = dimuat di background
+        st.dataframe(pd.DataFrame(prewarm.breakdown()), use_container_width=True, hide_index=True)
+        if not SERVICE_URL and prewarm.ready("scorer"):
+            st.caption(f"Scorer: presisi {SCORER_PRECISION}, shard efektif {cached_scorer().shards} "
+                       f"(SCORER_SHARDS={SCORER_SHARDS})")
+    if not SERVICE_URL and cached_result_cache() is not None:
+        with st.sidebar.expander("🗄️ Cache hasil rekomendasi"):
+            # hits/misses per proses; entries = isi file cache bersama
+            st.json(cached_result_cache().stats())
+            if st.button("Kosongkan cache hasil"):
+                cached_result_cache().clear()
 else:
-    seed = 42
+    retrieval = "exact"
 
 # Default threshold from metrics
 default_thr = 0.04
@@ -105,6 +304,8 @@ def render_score_hist(scores: np.ndarray, thr: float):
         st.info("Belum ada skor untuk ditampilkan.")
         return
 
+    import matplotlib.pyplot as plt  # hanya dimuat saat histogram pertama kali dirender
+
     fig = plt.figure(figsize=(6, 3.5))
     plt.hist(scores, bins=10)
     plt.axvline(thr, linestyle="--")  # garis threshold
@@ -119,10 +320,31 @@ def render_score_hist(scores: np.ndarray, thr: float):
         "(semakin besar skor, semakin relevan). Garis putus-putus adalah threshold."
     )
 
-def render_recommendation_cards(rec_rows, threshold, show_terms=False, top_explain=5):
+def load_explanations():
+    """
+    Explainability seluruh Top-N dalam satu panggilan (hanya nonzero), dihitung
+    sekali per hasil dan hanya jika ditampilkan; cache hit rekomendasi tidak
+    membangun profil kecuali penjelasan diminta.
+    """
+    if "explanations" in st.session_state or "explain_request" not in st.session_state:
+        return
+    history_ids, weighted, rec_ids = st.session_state["explain_request"]
+    with instrumentation.request("explain"):
+        if SERVICE_URL:
+            explanations = cached_client().explain(history_ids, rec_ids, weighted=weighted, top_k=10)
+        else:
+            _, _, all2idx, X_all, _ = cached_load()
+            uvec = cached_profile_cache().get(history_ids, weighted=weighted)
+            explanations = explain_batch(
+                cached_vectorizer(), uvec, rec_ids, X_all, all2idx, top_k=10, feats=cached_feature_names(),
+            )
+    st.session_state["explanations"] = explanations
+
+def render_recommendation_cards(rec_rows, threshold, show_terms=False, top_explain=5, similar_fn=None):
     """
     Render rekomendasi dalam bentuk cards.
     rec_rows: list of dict {rank, news_id, score, pred_label, category, subcategory, title}
+    similar_fn: opsional, news_id -> list of dict {news_id, title, ...} ("berita serupa")
     """
     if not rec_rows:
         st.info("Belum ada rekomendasi.")
@@ -151,16 +373,22 @@ def render_recommendation_cards(rec_rows, threshold, show_terms=False, top_expla
                 )
                 st.write(badge_label(score, threshold))
 
+            # Berita serupa dari tabel tetangga (satu lookup, tanpa scoring ulang)
+            if similar_fn is not None:
+                with st.expander("Berita serupa"):
+                    similar = similar_fn(nid)
+                    if not similar:
+                        st.write("Tidak ada berita serupa.")
+                    for s in similar:
+                        st.write(f"- {s.get('title') or s.get('news_id', '')} ({s.get('category', '')})")
+
             # Optional explainability
             if show_terms:
                 with st.expander("Mengapa direkomendasikan? (kata kunci utama)"):
-                    uvec = st.session_state.get("uvec_for_explain", None)
-                    idx = all2idx.get(nid)
-                    if uvec is None or idx is None:
+                    terms = st.session_state.get("explanations", {}).get(nid)
+                    if not terms or not terms["user_terms"]:
                         st.write("Penjelasan tidak tersedia.")
                     else:
-                        item_vec = X_all[idx]
-                        terms = explain_top_terms(vectorizer, uvec, item_vec, top_k=10)
                         colL, colR = st.columns(2)
                         with colL:
                             st.write("Kata kunci dari minat pengguna")
@@ -170,6 +398,13 @@ def render_recommendation_cards(rec_rows, threshold, show_terms=False, top_expla
                             st.write("Kata kunci dari berita ini")
                             st.dataframe(pd.DataFrame(terms["item_terms"], columns=["term", "weight"]),
                                          use_container_width=True, hide_index=True)
+                        if terms["shared_terms"]:
+                            st.write("Kata kunci yang sama (kontribusi = bobot pengguna × bobot berita)")
+                            st.dataframe(
+                                pd.DataFrame(terms["shared_terms"],
+                                             columns=["term", "kontribusi", "bobot_pengguna", "bobot_berita"]),
+                                use_container_width=True, hide_index=True
+                            )
 
 # =========================
 # TABS
@@ -232,11 +467,7 @@ with tab1:
     else:
         threshold = float(default_thr)
 
-    # Prepare helper df for selection
-    if "title" in news_all.columns and "news_id" in news_all.columns:
-        helper_df = news_all[["news_id", "title", "category", "subcategory"]].copy()
-    else:
-        helper_df = pd.DataFrame({"news_id": list(all2idx.keys()), "title": [""] * len(all2idx)})
+    title_index = cached_title_index()
 
     st.markdown("### 1) Cari & Pilih Riwayat Bacaan")
     keyword = st.text_input(
@@ -245,19 +476,18 @@ with tab1:
         placeholder="contoh: sports, covid, election..."
     )
 
-    filtered = helper_df
-    if keyword.strip():
-        kw = keyword.strip().lower()
-        filtered = helper_df[helper_df["title"].astype(str).str.lower().str.contains(kw, na=False)]
+    # Index judul dibangun sekali (cache_resource); query tidak men-scan katalog
+    hit_rows, hit_total = title_index.search(keyword, limit=500)
 
     c1, c2 = st.columns([2, 1])
     with c1:
-        st.caption(f"Total berita tersedia: {len(helper_df):,} | Hasil pencarian: {len(filtered):,}")
+        st.caption(f"Total berita tersedia: {len(meta_store):,} | Hasil pencarian: {hit_total:,}")
     with c2:
         with st.expander("Lihat hasil pencarian (Top 50)"):
-            st.dataframe(filtered.head(50), use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(meta_store.lookup(hit_rows[:50])),
+                         use_container_width=True, hide_index=True)
 
-    options = filtered["news_id"].head(500).tolist()
+    options = meta_store.ids[hit_rows].tolist()
     default_pick = options[:5] if len(options) >= 5 else options
 
     history_ids = st.multiselect(
@@ -278,38 +508,71 @@ with tab1:
         if len(history_ids) < 3:
             st.warning("Pilih minimal 3 berita sebagai riwayat bacaan agar profil minat bisa terbentuk.")
         else:
-            with st.spinner("Sedang menghitung rekomendasi..."):
-                recs = recommend_topn(
-                    history_ids=history_ids,
-                    news_all_df=news_all,
-                    X_all=X_all,
-                    all2idx=all2idx,
-                    top_n=top_n,
-                    candidate_pool_size=candidate_pool,
-                    weighted_profile=prioritize_recent,
-                    random_pool=more_varied,
-                    seed=int(seed),
-                )
-
-            uvec = build_user_profile(history_ids, X_all, all2idx, weighted=prioritize_recent)
-
-            rec_rows = []
-            for rank, (nid, score) in enumerate(recs, start=1):
-                meta = safe_news_meta(news_all, nid)
-                rec_rows.append({
-                    "rank": rank,
-                    "news_id": nid,
-                    "score": float(score),
-                    "pred_label": "Direkomendasikan" if score >= threshold else "Kurang relevan",
-                    "category": meta.get("category", ""),
-                    "subcategory": meta.get("subcategory", ""),
-                    "title": meta.get("title", ""),
-                })
-
-            # SIMPAN
+            with instrumentation.request("generate"):
+                if SERVICE_URL:
+                    with st.spinner("Sedang menghitung rekomendasi (service)..."):
+                        recs = cached_client().recommend(
+                            history_ids, top_n, prioritize_recent,
+                            retrieval=retrieval, diversity=more_varied,
+                            mmr_lambda=mmr_lambda, max_per_category=max_per_category,
+                            include=include_filter, exclude=exclude_filter,
+                        )
+                else:
+                    def compute_recs():
+                        # Profil hanya dibangun saat cache miss (ProfileCache: di-cache
+                        # lintas sesi, dipakai lagi oleh explainability)
+                        uvec = cached_profile_cache().get(history_ids, weighted=prioritize_recent)
+                        return recommend_topn(
+                            history_ids=history_ids,
+                            news_all_df=news_all,
+                            X_all=X_all,
+                            all2idx=all2idx,
+                            top_n=top_n,
+                            weighted_profile=prioritize_recent,
+                            scorer=scorer,
+                            retrieval=retrieval,
+                            uvec=uvec,
+                            diversity=more_varied,
+                            mmr_lambda=mmr_lambda,
+                            max_per_category=max_per_category or None,
+                            include=include_filter,
+                            exclude=exclude_filter,
+                        )
+
+                    result_cache = cached_result_cache()
+                    with st.spinner("Sedang menghitung rekomendasi..."):
+                        if result_cache is None:
+                            recs = compute_recs()
+                        else:
+                            # Request identik (mis. pilihan default) dilayani dari cache bersama
+                            recs, _ = result_cache.get_or_compute(
+                                history_ids, compute_recs,
+                                top_n=top_n, weighted_profile=prioritize_recent, retrieval=retrieval,
+                                diversity=more_varied, mmr_lambda=mmr_lambda if more_varied else None,
+                                max_per_category=max_per_category or None,
+                                include=include_filter, exclude=exclude_filter,
+                                precision=SCORER_PRECISION,
+                            )
+
+                rec_rows = []
+                metas = meta_store.lookup_ids([nid for nid, _ in recs])
+                for rank, ((nid, score), meta) in enumerate(zip(recs, metas), start=1):
+                    rec_rows.append({
+                        "rank": rank,
+                        "news_id": nid,
+                        "score": float(score),
+                        "pred_label": "Direkomendasikan" if score >= threshold else "Kurang relevan",
+                        "category": meta.get("category", ""),
+                        "subcategory": meta.get("subcategory", ""),
+                        "title": meta.get("title", ""),
+                    })
+
+            # SIMPAN (explainability dihitung saat ditampilkan, lihat load_explanations)
             st.session_state["rec_rows"] = rec_rows
-            st.session_state["uvec_for_explain"] = uvec
+            st.session_state["explain_request"] = (history_ids, prioritize_recent, [nid for nid, _ in recs])
+            st.session_state.pop("explanations", None)
             st.session_state["history_ids_last"] = history_ids
+            st.session_state["timing"] = instrumentation.last_request() if instrumentation.is_enabled() else None
 
             st.success("Rekomendasi berhasil dibuat ✅")
 
@@ -333,13 +596,29 @@ with tab1:
             help="Jika aktif, tiap rekomendasi bisa dibuka untuk melihat kata kunci utama yang mirip dengan minat pengguna."
         )
 
+        similar_fn = None
+        if SERVICE_URL:
+            if has_item_neighbors(ARTIFACT_DIR):
+                similar_fn = lambda nid: cached_client().similar(nid, top_n=5)  # noqa: E731
+        elif scorer.neighbors is not None:
+            similar_fn = lambda nid: meta_store.lookup_ids([n for n, _ in scorer.similar_items(nid, 5)])  # noqa: E731
+
+        if show_terms:
+            load_explanations()
+
         if view_mode.startswith("Kartu"):
-            render_recommendation_cards(rec_rows_saved, threshold, show_terms=show_terms)
+            render_recommendation_cards(rec_rows_saved, threshold, show_terms=show_terms, similar_fn=similar_fn)
         else:
             df_out = pd.DataFrame(rec_rows_saved)
             if not show_advanced:
                 df_out = df_out.drop(columns=["score"], errors="ignore")
             st.dataframe(df_out, use_container_width=True, hide_index=True)
+
+        timing = st.session_state.get("timing")
+        if show_advanced and timing:
+            with st.expander(f"⏱️ Rincian waktu permintaan terakhir ({timing['total_ms']:.1f} ms)"):
+                st.dataframe(pd.DataFrame(timing["stages"]), use_container_width=True, hide_index=True)
+                st.code(instrumentation.prometheus_text(), language="text")
         
         st.divider()
 
@@ -347,8 +626,10 @@ with tab1:
         with col_reset:
           if st.button("🧹 Reset hasil rekomendasi"):
             st.session_state.pop("rec_rows", None)
-            st.session_state.pop("uvec_for_explain", None)
+            st.session_state.pop("explain_request", None)
+            st.session_state.pop("explanations", None)
             st.session_state.pop("history_ids_last", None)
+            st.session_state.pop("timing", None)
             st.rerun()
 
         with col_info:
@@ -363,3 +644,34 @@ with tab1:
             file_name="recommendations.csv",
             mime="text/csv"
         )
+
+    # ========= rekomendasi dari teks bebas (tanpa riwayat bacaan) =========
+    with st.expander("🔎 Rekomendasi dari teks bebas"):
+        query_text = st.text_input(
+            "Tulis topik atau kalimat",
+            value="",
+            placeholder="contoh: nfl playoff quarterback injury",
+            key="query_text_input"
+        )
+        if st.button("Cari berita yang mirip", key="query_text_button") and query_text.strip():
+            with instrumentation.request("recommend_text"):
+                if SERVICE_URL:
+                    query_rows = cached_client().recommend_text(
+                        query_text, top_n, include=include_filter, exclude=exclude_filter
+                    )
+                else:
+                    # Vektor query via lookup vocabulary/IDF (di-cache), scorer sama dengan profil user
+                    qvec = cached_query_vectorizer().transform_one(query_text)
+                    query_recs = scorer.recommend_query(
+                        qvec, top_n=top_n, retrieval="exact" if retrieval == "item_knn" else retrieval,
+                        include=include_filter, exclude=exclude_filter,
+                    )
+                    query_rows = [
+                        dict(meta, news_id=nid, score=score)
+                        for (nid, score), meta in zip(query_recs, meta_store.lookup_ids([n for n, _ in query_recs]))
+                    ]
+            if query_rows:
+                cols = ["news_id", "score", "category", "subcategory", "title"]
+                st.dataframe(pd.DataFrame(query_rows)[cols], use_container_width=True, hide_index=True)
+            else:
+                st.info("Tidak ada kata dari teks ini yang dikenal oleh vocabulary TF-IDF.")
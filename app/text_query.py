@@ -0,0 +1,137 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+from instrumentation import stage
+
+# Query teks bebas -> vektor TF-IDF tanpa pipeline analyzer sklearn per
+# panggilan: analyzer word (lowercase, token_pattern, stop words, n-gram)
+# direplikasi dengan regex terkompilasi + lookup dict vocabulary_, bobot
+# dihitung dengan array idf_ yang sama, lalu hasilnya di-cache (LRU).
+# Konfigurasi vectorizer lain (analyzer char, tokenizer/preprocessor custom,
+# strip_accents) otomatis memakai vectorizer.transform (tetap di-cache).
+
+
+class QueryVectorizer:
+    """
+    transform(texts) / transform_one(text) menghasilkan CSR yang sama dengan
+    vectorizer.transform (indices terurut, sublinear_tf, idf, norm).
+    cache_size: jumlah query unik yang disimpan (LRU); key = teks lowercase
+    dengan whitespace dirapikan, karena keduanya tidak mengubah token.
+    """
+
+    def __init__(self, vectorizer, cache_size: int = 4096):
+        self.vectorizer = vectorizer
+        self.n_terms = len(vectorizer.vocabulary_)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        v = vectorizer
+        self.fast = (
+            v.analyzer == "word" and v.tokenizer is None and v.preprocessor is None
+            and v.strip_accents is None and v.input == "content"
+            and re.compile(v.token_pattern).groups == 0
+        )
+        if self.fast:
+            self.token_re = re.compile(v.token_pattern)
+            self.lowercase = v.lowercase
+            self.stop_words = v.get_stop_words() or frozenset()
+            self.min_n, self.max_n = v.ngram_range
+            self.vocab = v.vocabulary_
+            self.idf = np.asarray(v.idf_, dtype=np.float64) if v.use_idf else None
+            self.binary = v.binary
+            self.sublinear_tf = v.sublinear_tf
+            self.norm = v.norm
+            self.dtype = v.dtype
+
+    def _key(self, text: str) -> str:
+        text = str(text)
+        if not (self.fast and self.lowercase):
+            return text
+        return " ".join(text.lower().split())
+
+    def _terms(self, text: str):
+        """Sama dengan build_analyzer() sklearn untuk analyzer word."""
+        if self.lowercase:
+            text = text.lower()
+        toks = [t for t in self.token_re.findall(text) if t not in self.stop_words]
+        if self.max_n == 1:
+            return toks
+        out = list(toks) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), min(self.max_n, len(toks)) + 1):
+            out.extend(" ".join(toks[i:i + n]) for i in range(len(toks) - n + 1))
+        return out
+
+    def _vectorize(self, text: str):
+        if not self.fast:
+            row = self.vectorizer.transform([text])
+            return row.indices.copy(), row.data.copy()
+
+        counts = {}
+        vocab = self.vocab
+        for term in self._terms(text):
+            j = vocab.get(term)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=self.dtype)
+
+        idx = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        order = np.argsort(idx)
+        idx, tf = idx[order], tf[order]
+        if self.binary:
+            tf[:] = 1.0
+        if self.sublinear_tf:
+            tf = np.log(tf) + 1.0
+        if self.idf is not None:
+            tf *= self.idf[idx]
+        # jumlah berurutan (cumsum) seperti normalize() sklearn, agar hasil identik per bit
+        if self.norm == "l2":
+            tf /= np.sqrt(np.cumsum(tf * tf)[-1])
+        elif self.norm == "l1":
+            tf /= np.cumsum(np.abs(tf))[-1]
+        return idx, tf.astype(self.dtype, copy=False)
+
+    def _get(self, text: str):
+        key = self._key(text)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return hit
+            self.misses += 1
+
+        value = self._vectorize(key if self.fast and self.lowercase else str(text))
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def transform(self, texts):
+        """Batch teks -> CSR (n_texts x n_terms)."""
+        texts = list(texts)
+        with stage("query_vectorize", rows=len(texts)) as st:
+            parts = [self._get(t) for t in texts]
+            indptr = np.zeros(len(parts) + 1, dtype=np.int64)
+            np.cumsum([len(i) for i, _ in parts], out=indptr[1:])
+            st.add(nnz=int(indptr[-1]))
+            indices = np.concatenate([i for i, _ in parts]) if parts else np.empty(0, dtype=np.int32)
+            data = np.concatenate([d for _, d in parts]) if parts else np.empty(0)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(parts), self.n_terms))
+
+    def transform_one(self, text: str):
+        """Satu teks -> CSR (1 x n_terms)."""
+        return self.transform([text])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._cache), "hits": self.hits, "misses": self.misses, "fast": self.fast}
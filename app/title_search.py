@@ -0,0 +1,138 @@
+import bisect
+import os
+import re
+
+import numpy as np
+
+from artifact_store import _load, _save, load_string_column, save_string_column
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Index judul yang dipersist di folder artifacts v2 (ditulis save_artifacts_v2):
+# vocab (StringColumn terurut), postings row int32 per token (CSR: ptr + data)
+# dan jumlah token per judul; semuanya di-mmap saat load.
+TITLE_PREFIX = "title_index"
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class TitleSearchIndex:
+    """
+    Inverted index token -> row berita atas judul yang sudah dinormalisasi
+    (lowercase, dipecah per kata). Setiap kata di query dicocokkan sebagai
+    prefix kata judul (AND); hasil diurutkan: lebih banyak kata yang cocok
+    persis dulu, lalu judul lebih pendek, lalu urutan katalog.
+    vocab boleh list atau StringColumn (hasil load_title_index, di-mmap);
+    extra: index judul baris sesudahnya (segment), row-nya digeser n_base.
+    """
+
+    def __init__(self, titles=None, vocab=None, post_ptr=None, post_rows=None, title_len=None):
+        if titles is not None:
+            postings = {}
+            title_len = np.zeros(len(titles), dtype=np.int32)
+            for row, title in enumerate(titles):
+                toks = tokenize(title)
+                title_len[row] = len(toks)
+                for tok in set(toks):
+                    postings.setdefault(tok, []).append(row)
+            vocab = sorted(postings)
+            post_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+            np.cumsum([len(postings[t]) for t in vocab], out=post_ptr[1:])
+            post_rows = np.fromiter(
+                (r for t in vocab for r in postings[t]), dtype=np.int32, count=int(post_ptr[-1])
+            )
+
+        self.vocab = vocab
+        self.post_ptr = post_ptr
+        self.post_rows = post_rows
+        self.title_len = title_len
+        self.n_base = len(title_len)
+        self.n_rows = self.n_base
+        self.extra = None
+
+    def extend(self, titles) -> "TitleSearchIndex":
+        """Tambahkan judul baris n_rows.. (mis. segment append_news) tanpa membangun ulang index utama."""
+        if len(titles):
+            self.extra = TitleSearchIndex(titles)
+            self.title_len = np.concatenate([self.title_len, self.extra.title_len])
+            self.n_rows = len(self.title_len)
+        return self
+
+    def save(self, artifact_dir: str, files: list):
+        save_string_column(artifact_dir, f"{TITLE_PREFIX}_vocab", self.vocab, files)
+        _save(artifact_dir, f"{TITLE_PREFIX}_ptr.npy", self.post_ptr, files)
+        _save(artifact_dir, f"{TITLE_PREFIX}_rows.npy", self.post_rows, files)
+        _save(artifact_dir, f"{TITLE_PREFIX}_len.npy", self.title_len[:self.n_base], files)
+
+    def _span(self, lo: int, hi: int):
+        return self.post_rows[self.post_ptr[lo]:self.post_ptr[hi]]
+
+    def _with_extra(self, rows, fn, tok):
+        if self.extra is None:
+            return rows
+        more = getattr(self.extra, fn)(tok)
+        if len(more) == 0:
+            return rows
+        return np.concatenate([rows, more + self.n_base])
+
+    def _exact(self, tok: str):
+        j = bisect.bisect_left(self.vocab, tok)
+        rows = self._span(j, j + 1) if j < len(self.vocab) and self.vocab[j] == tok else np.empty(0, dtype=np.int32)
+        return self._with_extra(rows, "_exact", tok)
+
+    def _prefix(self, tok: str):
+        lo = bisect.bisect_left(self.vocab, tok)
+        hi = bisect.bisect_left(self.vocab, tok + "\U0010ffff")
+        if hi - lo <= 1:
+            rows = self._span(lo, hi)
+        else:
+            rows = np.unique(self._span(lo, hi))
+        return self._with_extra(rows, "_prefix", tok)
+
+    def search(self, query: str, limit: int = 500):
+        """
+        Return (rows, total): row hasil (sudah diurutkan, maksimal `limit`)
+        dan jumlah seluruh berita yang cocok.
+        """
+        toks = list(dict.fromkeys(tokenize(query)))
+        if not toks:
+            return np.arange(min(limit, self.n_rows)), self.n_rows
+
+        rows = None
+        for tok in toks:
+            hit = self._prefix(tok)
+            rows = hit if rows is None else np.intersect1d(rows, hit, assume_unique=True)
+            if len(rows) == 0:
+                return rows.astype(np.int64), 0
+
+        exact = np.zeros(len(rows), dtype=np.int32)
+        for tok in toks:
+            exact += np.isin(rows, self._exact(tok), assume_unique=True)
+
+        order = np.lexsort((rows, self.title_len[rows], -exact))[:limit]
+        return rows[order].astype(np.int64), len(rows)
+
+
+def has_title_index(artifact_dir: str) -> bool:
+    return os.path.exists(os.path.join(artifact_dir, f"{TITLE_PREFIX}_rows.npy"))
+
+
+def load_title_index(artifact_dir: str, titles, mmap: bool = True) -> TitleSearchIndex:
+    """
+    Index judul dari artifacts (mmap) bila ada dan cocok dengan katalog;
+    judul sesudah baris terakhir index (segment) ditambahkan lewat extend.
+    Tanpa index tersimpan (artifacts lama): dibangun dari titles.
+    """
+    if has_title_index(artifact_dir):
+        title_len = _load(artifact_dir, f"{TITLE_PREFIX}_len.npy", mmap)
+        if len(title_len) <= len(titles):
+            index = TitleSearchIndex(
+                vocab=load_string_column(artifact_dir, f"{TITLE_PREFIX}_vocab", mmap),
+                post_ptr=_load(artifact_dir, f"{TITLE_PREFIX}_ptr.npy", mmap),
+                post_rows=_load(artifact_dir, f"{TITLE_PREFIX}_rows.npy", mmap),
+                title_len=title_len,
+            )
+            return index.extend(titles[len(title_len):])
+    return TitleSearchIndex(titles)
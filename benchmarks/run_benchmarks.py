@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import scipy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from artifacts_loader import load_artifacts, load_normalized_matrix  # noqa: E402
+from evaluation import score_behaviors  # noqa: E402
+from news_meta import NewsMetaStore  # noqa: E402
+from recommender import (  # noqa: E402
+    CatalogScorer,
+    build_user_profile,
+    explain_top_terms,
+    feature_names,
+    recommend_topn,
+    safe_news_meta,
+    score_candidates_batch,
+)
+from result_cache import ResultCache, artifact_version  # noqa: E402
+from synthetic import make_synthetic_artifacts  # noqa: E402
+from text_query import QueryVectorizer  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+INFO_FILE = "synthetic.json"
+
+
+def timeit(fn, repeat: int, warmup: int = 1) -> dict:
+    """Jalankan fn berulang kali; return statistik waktu (ms)."""
+    for _ in range(warmup):
+        fn()
+    times = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - t0
+    times *= 1000
+    return {
+        "median_ms": round(float(np.median(times)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+        "min_ms": round(float(times.min()), 4),
+        "repeat": repeat,
+    }
+
+
+def ensure_synthetic(data_dir: str, args) -> dict:
+    """Pakai artifacts sintetis yang sudah ada jika parameternya sama, jika tidak generate ulang."""
+    params = {"n_items": args.items, "n_terms": args.terms, "nnz_mean": args.nnz_mean,
+              "n_impressions": args.impressions, "seed": args.seed}
+    info_path = os.path.join(data_dir, INFO_FILE)
+    if os.path.exists(info_path):
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("params") == params:
+            return info
+
+    print(f"[+] Generating synthetic artifacts ({args.items:,} items) -> {data_dir}")
+    t0 = time.perf_counter()
+    info = make_synthetic_artifacts(
+        data_dir, args.items, args.terms, args.nnz_mean, args.impressions, fmt="both", seed=args.seed
+    )
+    info["params"] = params
+    info["generate_s"] = round(time.perf_counter() - t0, 3)
+    with open(info_path, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def run(data_dir: str, args) -> dict:
+    results = {}
+
+    def bench(name, fn, repeat=args.repeat):
+        results[name] = timeit(fn, repeat)
+        print(f"    {name:<48} {results[name]['median_ms']:>10.3f} ms")
+
+    print("[+] Benchmarks")
+    bench("load_artifacts[v2,mmap]", lambda: load_artifacts(data_dir), repeat=max(3, args.repeat // 4))
+    bench(
+        "load_artifacts[v2,mmap,news_id only]",
+        lambda: load_artifacts(data_dir, with_vectorizer=False, meta_columns=()),
+        repeat=max(3, args.repeat // 4),
+    )
+
+    vectorizer, news_all, all2idx, X_all, _ = load_artifacts(data_dir)
+    ids = np.asarray(news_all["news_id"].tolist(), dtype=object)
+    rng = np.random.default_rng(args.seed + 1)
+    hist = ids[rng.choice(len(ids), args.history_len, replace=False)].tolist()
+    uvec = build_user_profile(hist, X_all, all2idx)
+    feats = feature_names(vectorizer)
+    meta_store = NewsMetaStore.from_dataframe(news_all, all2idx)
+
+    bench(f"build_user_profile[len={len(hist)}]", lambda: build_user_profile(hist, X_all, all2idx))
+    for n_cand in (37, 2000):
+        cands = ids[rng.integers(0, len(ids), n_cand)].tolist()
+        bench(f"score_candidates_batch[n={n_cand}]", lambda c=cands: score_candidates_batch(uvec, c, X_all, all2idx))
+
+    for pool in args.pool_sizes:
+        for random_pool in (False, True):
+            bench(
+                f"recommend_topn[pool={pool},random={random_pool}]",
+                lambda p=pool, r=random_pool: recommend_topn(
+                    hist, news_all, X_all, all2idx, top_n=10,
+                    candidate_pool_size=p, random_pool=r, uvec=uvec,
+                ),
+            )
+
+    scorer = CatalogScorer(X_all, all2idx, X_norm=load_normalized_matrix(data_dir), meta=meta_store)
+    for retrieval in ("exact", "maxscore"):
+        bench(
+            f"recommend_topn[scorer,{retrieval}]",
+            lambda r=retrieval: recommend_topn(
+                hist, news_all, X_all, all2idx, top_n=10, scorer=scorer, retrieval=r, uvec=uvec
+            ),
+        )
+
+    if args.shards > 1:
+        sharded = CatalogScorer(X_all, all2idx, X_norm=scorer.X_norm, shards=args.shards)
+        bench(
+            f"recommend_topn[scorer,exact,shards={sharded.shards}]",
+            lambda: recommend_topn(hist, news_all, X_all, all2idx, top_n=10, scorer=sharded, uvec=uvec),
+        )
+
+    bench(
+        "recommend_topn[scorer,mmr,shortlist=100]",
+        lambda: recommend_topn(
+            hist, news_all, X_all, all2idx, top_n=10, scorer=scorer, uvec=uvec,
+            diversity=True, max_per_category=3,
+        ),
+    )
+
+    bench(
+        "recommend_topn[scorer,filter=category:sports]",
+        lambda: recommend_topn(
+            hist, news_all, X_all, all2idx, top_n=10, scorer=scorer, uvec=uvec,
+            include={"category": ["sports"]},
+        ),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(os.path.join(tmp, "results.sqlite"), artifact_version(data_dir))
+        key = cache.key(hist, top_n=10, weighted_profile=True)
+        cache.put(key, scorer.recommend(hist, 10, uvec=uvec))
+        bench("result_cache[hit]", lambda: cache.get(key))
+        bench("result_cache[artifact_version]", lambda: artifact_version(data_dir))
+
+    queries = news_all["title"].astype(str).iloc[rng.integers(0, len(ids), 64)].tolist()
+    qv = QueryVectorizer(vectorizer)
+    bench("query_vectorize[sklearn,1 query]", lambda: vectorizer.transform(queries[:1]))
+    bench("query_vectorize[lookup,1 query,cold]", lambda: QueryVectorizer(vectorizer).transform_one(queries[0]))
+    bench("recommend_query[lookup+cache,exact]", lambda: scorer.recommend_query(qv.transform_one(queries[0]), 10))
+
+    # MaxScore menang untuk profil dengan sedikit term (query teks, history pendek)
+    qvecs = [qv.transform_one(q) for q in queries[:16]]
+    short = [build_user_profile(hist[i:i + 1], X_all, all2idx) for i in range(min(16, len(hist)))]
+    for retrieval in ("exact", "maxscore"):
+        bench(
+            f"recommend_query[16 queries,{retrieval}]",
+            lambda r=retrieval: [scorer.recommend_query(v, 10, retrieval=r) for v in qvecs],
+        )
+        bench(
+            f"topn[history_len=1,{len(short)} users,{retrieval}]",
+            lambda r=retrieval: [scorer.topn(u, 10, retrieval=r) for u in short],
+        )
+    bench("recommend_queries[64 queries]", lambda: scorer.recommend_queries(qv.transform(queries), 10))
+
+    top_rows = [all2idx[n] for n, _ in scorer.recommend(hist, 10, uvec=uvec)]
+    bench(
+        "explain_top_terms[10 items]",
+        lambda: [explain_top_terms(vectorizer, uvec, X_all[r], top_k=10, feats=feats) for r in top_rows],
+    )
+
+    lookup_ids = ids[rng.integers(0, len(ids), 10)].tolist()
+    bench("safe_news_meta[DataFrame,10 ids]", lambda: [safe_news_meta(news_all, n) for n in lookup_ids])
+    bench("safe_news_meta[NewsMetaStore,10 ids]", lambda: [safe_news_meta(meta_store, n) for n in lookup_ids])
+
+    beh_path = os.path.join(data_dir, "behaviors.tsv")
+    bench(
+        f"evaluation[score_behaviors,{args.eval_impressions} imps]",
+        lambda: score_behaviors(beh_path, X_all, all2idx, X_norm=scorer.X_norm,
+                                max_impressions=args.eval_impressions, workers=1),
+        repeat=max(3, args.repeat // 4),
+    )
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Return list nama benchmark yang median-nya lebih lambat dari baseline * (1 + tolerance)."""
+    base = baseline.get("results", {})
+    regressions = []
+    print(f"\n[+] Compare vs baseline (tolerance {tolerance:.0%})")
+    for name, r in results.items():
+        if name not in base:
+            print(f"    {name:<48} (baru)")
+            continue
+        ratio = r["median_ms"] / max(base[name]["median_ms"], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = "  (lebih cepat)"
+        print(f"    {name:<48} {base[name]['median_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark hot path dengan katalog sintetis berbentuk MIND (offline).")
+    ap.add_argument("--data-dir", default=os.path.join(HERE, "_synthetic"))
+    ap.add_argument("--items", type=int, default=100000)
+    ap.add_argument("--terms", type=int, default=80000)
+    ap.add_argument("--nnz-mean", type=float, default=45.0)
+    ap.add_argument("--impressions", type=int, default=5000)
+    ap.add_argument("--history-len", type=int, default=30)
+    ap.add_argument("--pool-sizes", type=int, nargs="+", default=[2000, 20000])
+    ap.add_argument("--eval-impressions", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Shard scoring exact (1 = lewati)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join(HERE, "results.json"))
+    ap.add_argument("--baseline", default=os.path.join(HERE, "baseline.json"))
+    ap.add_argument("--save-baseline", action="store_true", help="Simpan hasil ini sebagai baseline")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Batas perlambatan relatif sebelum dianggap regresi")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    info = ensure_synthetic(args.data_dir, args)
+    print(f"    catalog: {info['n_items']:,} items, {info['n_terms']:,} terms, nnz={info['nnz']:,}")
+
+    results = run(args.data_dir, args)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "catalog": {k: info[k] for k in ("n_items", "n_terms", "nnz", "nnz_per_row", "n_impressions")},
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"    saved: {args.out}")
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"    baseline saved: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("catalog") != report["meta"]["catalog"]:
+            print("[!] Baseline memakai katalog sintetis berbeda; perbandingan tidak apple-to-apple.")
+        regressions = compare(results, baseline, args.tolerance)
+
+    if regressions:
+        print(f"\n[!] {len(regressions)} regresi: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    print("\n✅ Done.")
+
+
+if __name__ == "__main__":
+    main()
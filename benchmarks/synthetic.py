@@ -0,0 +1,156 @@
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from artifact_store import save_artifacts_v2  # noqa: E402
+from recommender import l2_normalize_rows  # noqa: E402
+
+# Generator artifacts sintetis berbentuk MIND (tanpa dataset): distribusi term
+# Zipf di vocab 80k, nnz per baris ~ judul+abstrak dengan bigram, kategori
+# miring seperti MIND, dan behaviors.tsv dengan panjang history realistis.
+
+MIND_CATEGORIES = [
+    ("news", 0.30), ("sports", 0.29), ("finance", 0.06), ("foodanddrink", 0.05),
+    ("lifestyle", 0.05), ("travel", 0.05), ("video", 0.04), ("weather", 0.04),
+    ("health", 0.03), ("autos", 0.03), ("tv", 0.02), ("music", 0.01),
+    ("movies", 0.01), ("entertainment", 0.01), ("kids", 0.004), ("middleeast", 0.003),
+    ("northamerica", 0.003),
+]
+
+
+def _zipf_probs(n: int, s: float = 1.07, offset: float = 10.0):
+    p = 1.0 / (np.arange(n) + offset) ** s
+    return p / p.sum()
+
+
+def make_vectorizer(n_terms: int, idf):
+    """TfidfVectorizer yang sudah 'fit' dengan vocab sintetis t0..t{n-1}."""
+    vec = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=2, max_df=0.9, max_features=n_terms)
+    vec.vocabulary_ = {f"t{j}": j for j in range(n_terms)}
+    vec.idf_ = np.asarray(idf, dtype=np.float64)
+    return vec
+
+
+def make_matrix(n_items: int, n_terms: int, nnz_mean: float, rng):
+    """CSR TF-IDF sintetis (baris ternormalisasi L2) dan idf per term."""
+    probs = _zipf_probs(n_terms)
+    df = np.minimum(probs * n_items * nnz_mean, n_items * 0.9)
+    idf = np.log((1 + n_items) / (1 + df)) + 1
+
+    lens = np.clip(rng.lognormal(np.log(nnz_mean), 0.45, n_items).astype(np.int64), 3, n_terms)
+    rows = np.repeat(np.arange(n_items), lens)
+    cols = rng.choice(n_terms, size=int(lens.sum()), p=probs)
+    # duplikat (row, term) digabung: tf > 1 -> sublinear 1 + log(tf)
+    key, tf = np.unique(rows * n_terms + cols, return_counts=True)
+    rows, cols = key // n_terms, key % n_terms
+    vals = (1 + np.log(tf)) * idf[cols]
+    X = sparse.csr_matrix((vals, (rows, cols)), shape=(n_items, n_terms))
+    return l2_normalize_rows(X), idf
+
+
+def make_news(n_items: int, rng, n_terms: int):
+    cats, p = zip(*MIND_CATEGORIES)
+    p = np.asarray(p) / np.sum(p)
+    cat = rng.choice(len(cats), size=n_items, p=p)
+    sub = cat * 16 + rng.integers(0, 16, n_items)
+    words = rng.integers(0, min(n_terms, 20000), size=(n_items, 8))
+    titles = [" ".join(f"t{w}" for w in row) for row in words]
+    return pd.DataFrame({
+        "news_id": [f"N{i}" for i in range(n_items)],
+        "category": np.asarray(cats, dtype=object)[cat],
+        "subcategory": [f"{cats[c]}_sub{s}" for c, s in zip(cat, sub)],
+        "title": titles,
+        "abstract": [t + " abstract" for t in titles],
+        "url": [f"https://example.org/N{i}" for i in range(n_items)],
+    })
+
+
+def make_histories(n_users: int, n_items: int, rng, mean_len: float = 30.0, max_len: int = 200):
+    """History per user: panjang geometrik (rata-rata mean_len), item dengan popularitas Zipf."""
+    pop = _zipf_probs(n_items, s=0.9, offset=50.0)
+    perm = rng.permutation(n_items)
+    lens = np.clip(rng.geometric(1.0 / mean_len, n_users), 1, max_len)
+    flat = perm[rng.choice(n_items, size=int(lens.sum()), p=pop)]
+    return np.split(flat, np.cumsum(lens)[:-1])
+
+
+def write_behaviors(path: str, n_impressions: int, n_items: int, rng, n_candidates: float = 37.0):
+    """behaviors.tsv sintetis: history + impressions (1-2 klik per impression)."""
+    hists = make_histories(n_impressions, n_items, rng)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, hist in enumerate(hists):
+            n_c = int(np.clip(rng.poisson(n_candidates), 2, 300))
+            cands = rng.integers(0, n_items, n_c)
+            clicked = set(rng.choice(n_c, size=min(n_c, 1 + int(rng.random() < 0.3)), replace=False).tolist())
+            imps = " ".join(f"N{c}-{int(j in clicked)}" for j, c in enumerate(cands))
+            history = " ".join(f"N{h}" for h in hist)
+            f.write(f"{i + 1}\tU{i}\t11/15/2019 8:{i % 60:02d}:00 AM\t{history}\t{imps}\n")
+
+
+def make_synthetic_artifacts(
+    out_dir: str,
+    n_items: int = 100000,
+    n_terms: int = 80000,
+    nnz_mean: float = 45.0,
+    n_impressions: int = 5000,
+    fmt: str = "v2",
+    seed: int = 0,
+) -> dict:
+    """Tulis artifacts (v2 / legacy / both) + behaviors.tsv ke out_dir. Return ringkasan."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    X_all, idf = make_matrix(n_items, n_terms, nnz_mean, rng)
+    news_all = make_news(n_items, rng, n_terms)
+    all2idx = {nid: i for i, nid in enumerate(news_all["news_id"].tolist())}
+    vectorizer = make_vectorizer(n_terms, idf)
+    metrics_df = pd.DataFrame([{
+        "threshold": 0.04, "accuracy": 0.0, "precision": 0.0, "recall": 0.0,
+        "f1_score": 0.0, "auc": 0.5, "pr_auc": 0.0, "rows": 0, "impressions_used": 0,
+    }])
+
+    if fmt in ("legacy", "both"):
+        for name, obj in (("tfidf_vectorizer.pkl", vectorizer), ("news_all.pkl", news_all), ("all2idx.pkl", all2idx)):
+            with open(os.path.join(out_dir, name), "wb") as f:
+                pickle.dump(obj, f)
+        sparse.save_npz(os.path.join(out_dir, "X_all_tfidf.npz"), X_all)
+        metrics_df.to_csv(os.path.join(out_dir, "metrics.csv"), index=False)
+    if fmt in ("v2", "both"):
+        save_artifacts_v2(out_dir, vectorizer, news_all, all2idx, X_all, metrics_df)
+
+    write_behaviors(os.path.join(out_dir, "behaviors.tsv"), n_impressions, n_items, rng)
+    return {"n_items": n_items, "n_terms": n_terms, "nnz": int(X_all.nnz),
+            "nnz_per_row": round(X_all.nnz / n_items, 2), "n_impressions": n_impressions, "format": fmt}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate artifacts sintetis berbentuk MIND untuk benchmark.")
+    ap.add_argument("--out", default=os.path.join("benchmarks", "_synthetic"))
+    ap.add_argument("--items", type=int, default=100000)
+    ap.add_argument("--terms", type=int, default=80000)
+    ap.add_argument("--nnz-mean", type=float, default=45.0)
+    ap.add_argument("--impressions", type=int, default=5000)
+    ap.add_argument("--format", choices=["legacy", "v2", "both"], default="both")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"[+] Generating {args.items:,} items x {args.terms:,} terms -> {args.out}")
+    t0 = time.perf_counter()
+    info = make_synthetic_artifacts(
+        args.out, args.items, args.terms, args.nnz_mean, args.impressions, args.format, args.seed
+    )
+    print(f"    nnz={info['nnz']:,} ({info['nnz_per_row']} per row) in {time.perf_counter() - t0:.2f}s")
+    print(f"\n✅ Done. Saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from catalog_segments import append_news, compact_segments, list_segments  # noqa: E402
+from mind_io import read_news_file  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Tambah berita baru ke katalog tanpa fit ulang TF-IDF, atau gabungkan segment."
+    )
+    ap.add_argument("--artifacts", default=DEFAULT_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_add = sub.add_parser("append", help="Transform berita baru lalu simpan sebagai segment")
+    p_add.add_argument("news", help="news.tsv / news.csv berisi berita baru")
+    p_add.add_argument("--no-abstract", action="store_true", help="Pakai judul saja")
+
+    sub.add_parser("compact", help="Gabungkan semua segment ke artifacts utama")
+    sub.add_parser("status", help="Tampilkan daftar segment")
+
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+
+    if args.cmd == "append":
+        news = read_news_file(args.news)
+        out = append_news(args.artifacts, news, use_abstract=not args.no_abstract)
+        if out["segment"] is None:
+            print("[!] Tidak ada berita baru (semua news_id sudah ada di katalog).")
+        else:
+            print(f"[+] Segment {out['segment']}: {out['added']:,} berita baru")
+            if out.get("neighbors_added"):
+                print(f"[+] Tabel tetangga diperluas: {out['neighbors_added']:,} baris")
+    elif args.cmd == "compact":
+        out = compact_segments(args.artifacts)
+        print(f"[+] Merged {out['merged_segments']} segment(s)")
+    else:
+        segs = list_segments(args.artifacts)
+        print(f"{len(segs)} segment(s):")
+        for s in segs:
+            print(" -", s)
+
+    print(f"✅ Done in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
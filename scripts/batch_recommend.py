@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from batch_recommend import run_batch_job  # noqa: E402
+from evaluation import default_workers  # noqa: E402
+from mind_io import find_split_file  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Top-N rekomendasi untuk setiap user di behaviors log (offline, bisa dilanjutkan).")
+    ap.add_argument("--artifacts", default=DEFAULT_DIR)
+    ap.add_argument("--dev-dir", default=os.path.join("datasets", "MINDsmall_dev"))
+    ap.add_argument("--behaviors", default=None,
+                    help="Path behaviors csv/tsv atau folder kolumnar (default: <dev-dir>/behaviors.csv|tsv)")
+    ap.add_argument("--out", default=os.path.join("outputs", "batch_recs"))
+    ap.add_argument("--top-n", type=int, default=10)
+    ap.add_argument("--mean-profile", action="store_true", help="Profil rata-rata (bukan weighted)")
+    ap.add_argument("--shard-size", type=int, default=20000, help="User per shard (unit checkpoint)")
+    ap.add_argument("--workers", type=int, default=default_workers())
+    ap.add_argument("--max-block-mb", type=int, default=64, help="Batas matrix skor dense per blok per worker")
+    ap.add_argument("--overwrite", action="store_true", help="Hapus shard job lama jika parameternya berbeda")
+    args = ap.parse_args()
+
+    beh_path = args.behaviors or find_split_file(args.dev_dir, "behaviors")
+    print(f"[+] Batch top-{args.top_n}: {beh_path} -> {args.out} (workers={args.workers})")
+
+    def progress(done, total, users_per_sec):
+        print(f"    {done:,}/{total:,} users ({users_per_sec:,.0f} users/s)")
+
+    summary = run_batch_job(
+        args.artifacts, beh_path, args.out,
+        top_n=args.top_n, weighted=not args.mean_profile,
+        shard_size=args.shard_size, workers=args.workers,
+        max_block_mb=args.max_block_mb, overwrite=args.overwrite,
+        progress=progress,
+    )
+    if summary["resumed_users"]:
+        print(f"    resumed: {summary['resumed_users']:,} users dari shard yang sudah selesai")
+    print(f"    {summary['scored_users']:,} users in {summary['seconds']:.2f}s "
+          f"({summary['users_per_sec']:,.1f} users/s), total {summary['total_seconds']:.2f}s")
+    print(f"\n✅ Done. {summary['n_shards']} shard(s) saved to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
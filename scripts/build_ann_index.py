@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from ann_index import DenseANNIndex, extend_ann_index, has_ann_index, load_ann_index, recall_at_k  # noqa: E402
+from artifacts_loader import load_artifacts, load_normalized_matrix  # noqa: E402
+from mind_io import BEH_COLS, find_split_file, iter_csv_chunks  # noqa: E402
+from recommender import CatalogScorer  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+
+def dev_histories(beh_path: str, n: int):
+    """n history pertama (tidak kosong) dari behaviors dev."""
+    out = []
+    for chunk in iter_csv_chunks(beh_path, BEH_COLS, ["history"], chunksize=20000):
+        for h in chunk["history"].tolist():
+            if h:
+                out.append(h.split())
+                if len(out) >= n:
+                    return out
+    return out
+
+
+def report_recall(scorer, beh_path: str, users: int, k: int, probes):
+    histories = dev_histories(beh_path, users)
+    print(f"[+] recall@{k} vs exact TF-IDF ({len(histories):,} dev histories)")
+    results = []
+    for p in probes:
+        t0 = time.perf_counter()
+        r = recall_at_k(scorer, histories, k=k, n_probe=p)
+        r["seconds"] = round(time.perf_counter() - t0, 3)
+        results.append(r)
+        print(
+            f"    n_probe={r['n_probe']:<4} recall={r[f'recall_at_{k}']:.4f} "
+            f"(dense brute-force {r[f'dense_recall_at_{k}']:.4f}) "
+            f"scanned={r['scanned_fraction']:.2%}"
+        )
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bangun embedding SVD + index ANN (IVF) untuk retrieval='ann'.")
+    ap.add_argument("--artifacts", default=DEFAULT_DIR)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--n-lists", type=int, default=0, help="0 = otomatis (4 * sqrt(n_items))")
+    ap.add_argument("--n-probe", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--dev-dir", default=os.path.join("datasets", "MINDsmall_dev"))
+    ap.add_argument("--recall-users", type=int, default=500, help="0 = tanpa laporan recall")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--report-only", action="store_true", help="Pakai index yang sudah ada, hanya laporan recall")
+    ap.add_argument(
+        "--update", action="store_true",
+        help="Tambahkan segment baru ke index yang sudah ada (tanpa fit ulang SVD/IVF), lalu simpan",
+    )
+    args = ap.parse_args()
+
+    print(f"[+] Loading artifacts {args.artifacts}")
+    _, _, all2idx, X_all, _ = load_artifacts(args.artifacts, with_vectorizer=False, meta_columns=())
+    scorer = CatalogScorer(X_all, all2idx, X_norm=load_normalized_matrix(args.artifacts))
+
+    if args.update:
+        if not has_ann_index(args.artifacts):
+            raise SystemExit("Index ANN belum ada; jalankan tanpa --update.")
+        added = extend_ann_index(args.artifacts, scorer.X_norm, all2idx)
+        print(f"[+] Added {added:,} rows to the ANN index")
+        print(f"\n✅ Done. ANN index saved to: {args.artifacts}")
+        return
+
+    if args.report_only:
+        scorer.ann = load_ann_index(args.artifacts, scorer.X_norm, all2idx=all2idx)
+        if scorer.ann is None:
+            raise SystemExit("Index ANN belum ada; jalankan tanpa --report-only.")
+    else:
+        print(f"[+] Fitting SVD (dim={args.dim}) + IVF")
+        t0 = time.perf_counter()
+        scorer.ann = DenseANNIndex.build(
+            scorer.X_norm, dim=args.dim, n_lists=args.n_lists or None,
+            n_probe=args.n_probe, seed=args.seed,
+        )
+        print(f"    {scorer.ann.n_items:,} items, dim={scorer.ann.dim}, "
+              f"n_lists={scorer.ann.n_lists} in {time.perf_counter() - t0:.2f}s")
+
+    recall = []
+    if args.recall_users:
+        probes = sorted({max(1, scorer.ann.n_probe // 2), scorer.ann.n_probe, scorer.ann.n_probe * 4})
+        recall = report_recall(
+            scorer, find_split_file(args.dev_dir, "behaviors"), args.recall_users, args.k, probes
+        )
+
+    if not args.report_only:
+        scorer.ann.save(args.artifacts, extra={"recall": recall}, all2idx=all2idx)
+        print(f"\n✅ Done. ANN index saved to: {args.artifacts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from ann_index import ANN_MANIFEST, DenseANNIndex  # noqa: E402
+from artifact_store import MANIFEST, save_artifacts_v2  # noqa: E402
+from artifacts_loader import LEGACY_FILES  # noqa: E402
+from catalog_segments import SEGMENTS_DIR, SEGMENTS_INDEX, build_text  # noqa: E402
+from evaluation import evaluate_behaviors  # noqa: E402
+from item_neighbors import NBR_MANIFEST, ItemNeighbors  # noqa: E402
+from mind_io import NEWS_COLS, find_split_file, iter_csv_chunks  # noqa: E402
+from recommender import l2_normalize_rows  # noqa: E402
+
+# Kolom yang disimpan di news_all.pkl (entities tidak dipakai app)
+KEEP_COLS = ["news_id", "category", "subcategory", "title", "abstract", "url"]
+
+TFIDF_PARAMS = dict(
+    ngram_range=(1, 2),
+    stop_words="english",
+    sublinear_tf=True,
+    min_df=2,
+    max_df=0.9,
+)
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    def stage(self, name: str):
+        timer = self
+
+        class _Stage:
+            def __enter__(self):
+                print(f"[+] {name}")
+                self.t0 = time.perf_counter()
+
+            def __exit__(self, *exc):
+                dt = time.perf_counter() - self.t0
+                timer.timings[name] = round(dt, 3)
+                print(f"    done in {dt:.2f}s")
+
+        return _Stage()
+
+
+def read_news(train_path: str, dev_path: str, use_abstract: bool, chunksize: int):
+    """
+    Stream news train lalu dev; return (news_all, n_train, train_text).
+    news_all hanya berisi KEEP_COLS dan sudah di-dedup per news_id
+    (urutan sama dengan notebook: train dulu, lalu dev).
+    """
+    seen = set()
+    parts = []
+    train_text = []
+    n_train = 0
+    for path, is_train in ((train_path, True), (dev_path, False)):
+        for chunk in iter_csv_chunks(path, NEWS_COLS, KEEP_COLS, chunksize):
+            chunk = chunk[KEEP_COLS]
+            if is_train:
+                train_text.extend(build_text(chunk["title"], chunk["abstract"], use_abstract))
+                n_train += len(chunk)
+            keep = ~chunk["news_id"].duplicated() & ~chunk["news_id"].isin(seen)
+            chunk = chunk[keep]
+            seen.update(chunk["news_id"].tolist())
+            parts.append(chunk)
+
+    news_all = pd.concat(parts, ignore_index=True)
+    return news_all, n_train, train_text
+
+
+_WORKER_VECTORIZER = None
+
+
+def _init_worker(vectorizer):
+    global _WORKER_VECTORIZER
+    _WORKER_VECTORIZER = vectorizer
+
+
+def _transform_chunk(texts):
+    return _WORKER_VECTORIZER.transform(texts)
+
+
+def transform_parallel(vectorizer, texts, workers: int, chunk_size: int):
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    if workers <= 1:
+        parts = [vectorizer.transform(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(vectorizer,)
+        ) as ex:
+            parts = list(ex.map(_transform_chunk, chunks))
+    return sparse.vstack(parts, format="csr")
+
+
+def remove_stale_artifacts(out_dir, fmt: str = "both"):
+    """
+    Hapus artifacts turunan build sebelumnya (segment append_news, index ANN,
+    tabel tetangga): semuanya merujuk ke row katalog lama. File format yang
+    tidak ditulis ulang (fmt) juga dihapus: manifest v2 yang tertinggal akan
+    dibaca loader lebih dulu daripada pickle baru, dan pickle lama akan ikut
+    ditulis ulang oleh compact_segments. Return nama yang dihapus.
+    """
+    removed = []
+    if fmt == "legacy" and os.path.exists(os.path.join(out_dir, MANIFEST)):
+        with open(os.path.join(out_dir, MANIFEST), "r", encoding="utf-8") as f:
+            files = json.load(f).get("files", [])
+        # manifest dihapus lebih dulu: folder tidak lagi terbaca sebagai v2
+        for name in [MANIFEST] + files:
+            if os.path.exists(os.path.join(out_dir, name)):
+                os.remove(os.path.join(out_dir, name))
+                removed.append(name)
+    if fmt == "v2":
+        # metrics.csv dipakai kedua format
+        for name in LEGACY_FILES:
+            if name != "metrics.csv" and os.path.exists(os.path.join(out_dir, name)):
+                os.remove(os.path.join(out_dir, name))
+                removed.append(name)
+    for manifest in (ANN_MANIFEST, NBR_MANIFEST):
+        path = os.path.join(out_dir, manifest)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            files = json.load(f).get("files", [])
+        for name in files + [manifest]:
+            if os.path.exists(os.path.join(out_dir, name)):
+                os.remove(os.path.join(out_dir, name))
+                removed.append(name)
+    if os.path.exists(os.path.join(out_dir, SEGMENTS_INDEX)):
+        os.remove(os.path.join(out_dir, SEGMENTS_INDEX))
+        shutil.rmtree(os.path.join(out_dir, SEGMENTS_DIR), ignore_errors=True)
+        removed += [SEGMENTS_INDEX, SEGMENTS_DIR]
+    return removed
+
+
+def save_legacy(out_dir, vectorizer, news_all, all2idx, X_all, metrics_df):
+    with open(os.path.join(out_dir, "tfidf_vectorizer.pkl"), "wb") as f:
+        pickle.dump(vectorizer, f)
+    with open(os.path.join(out_dir, "news_all.pkl"), "wb") as f:
+        pickle.dump(news_all, f)
+    with open(os.path.join(out_dir, "all2idx.pkl"), "wb") as f:
+        pickle.dump(all2idx, f)
+    sparse.save_npz(os.path.join(out_dir, "X_all_tfidf.npz"), X_all)
+    metrics_df.to_csv(os.path.join(out_dir, "metrics.csv"), index=False)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build artifacts TF-IDF (pengganti notebook).")
+    ap.add_argument("--train-dir", default=os.path.join("datasets", "MINDsmall_train"))
+    ap.add_argument("--dev-dir", default=os.path.join("datasets", "MINDsmall_dev"))
+    ap.add_argument("--out", default=os.path.join("notebooks", "artifacts_classification_v2"))
+    ap.add_argument("--max-features", type=int, default=80000)
+    ap.add_argument("--no-abstract", action="store_true", help="Pakai judul saja")
+    ap.add_argument("--max-dev-impressions", type=int, default=10000,
+                    help="Impressions dev untuk metrics.csv (0 = seluruh dev set)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-size", type=int, default=5000, help="Baris per chunk transform")
+    ap.add_argument("--read-chunk-size", type=int, default=50000, help="Baris per chunk baca file")
+    ap.add_argument("--format", choices=["legacy", "v2", "both"], default="both")
+    ap.add_argument("--ann-dim", type=int, default=0,
+                    help="Dimensi embedding SVD untuk index ANN (0 = tidak dibangun)")
+    ap.add_argument("--ann-probe", type=int, default=8)
+    ap.add_argument("--neighbors-k", type=int, default=0,
+                    help="Jumlah tetangga per item untuk tabel item_knn (0 = tidak dibangun)")
+    args = ap.parse_args()
+
+    use_abstract = not args.no_abstract
+    os.makedirs(args.out, exist_ok=True)
+    timer = StageTimer()
+    t_start = time.perf_counter()
+
+    with timer.stage("read news (streaming)"):
+        news_all, n_train, train_text = read_news(
+            find_split_file(args.train_dir, "news"),
+            find_split_file(args.dev_dir, "news"),
+            use_abstract, args.read_chunk_size,
+        )
+        print(f"    train news: {n_train:,} | news_all: {len(news_all):,}")
+
+    with timer.stage("fit tfidf (train)"):
+        vectorizer = TfidfVectorizer(max_features=args.max_features, **TFIDF_PARAMS)
+        vectorizer.fit(train_text)
+        del train_text
+
+    with timer.stage(f"transform news_all ({args.workers} workers)"):
+        texts = build_text(news_all["title"], news_all["abstract"], use_abstract)
+        X_all = transform_parallel(vectorizer, texts, args.workers, args.chunk_size)
+        del texts
+        all2idx = {nid: i for i, nid in enumerate(news_all["news_id"].tolist())}
+        print(f"    X_all: {X_all.shape}, nnz={X_all.nnz:,}")
+
+    with timer.stage("evaluate dev impressions"):
+        metrics_df = evaluate_behaviors(
+            find_split_file(args.dev_dir, "behaviors"), X_all, all2idx,
+            max_impressions=args.max_dev_impressions or None,
+            workers=args.workers,
+            chunk_size=args.read_chunk_size,
+        )
+        print(metrics_df.to_string(index=False))
+
+    with timer.stage(f"save artifacts ({args.format})"):
+        removed = remove_stale_artifacts(args.out, args.format)
+        if removed:
+            print(f"    removed stale: {', '.join(removed)}")
+        if args.format in ("legacy", "both"):
+            save_legacy(args.out, vectorizer, news_all, all2idx, X_all, metrics_df)
+        if args.format in ("v2", "both"):
+            save_artifacts_v2(args.out, vectorizer, news_all, all2idx, X_all, metrics_df)
+
+    if args.ann_dim > 0:
+        with timer.stage(f"build ANN index (svd dim={args.ann_dim})"):
+            ann = DenseANNIndex.build(l2_normalize_rows(X_all), dim=args.ann_dim, n_probe=args.ann_probe)
+            ann.save(args.out, all2idx=all2idx)
+            print(f"    n_lists={ann.n_lists}, n_probe={ann.n_probe}")
+
+    if args.neighbors_k > 0:
+        with timer.stage(f"build item neighbours (k={args.neighbors_k})"):
+            ItemNeighbors.build(l2_normalize_rows(X_all), k=args.neighbors_k, workers=args.workers).save(
+                args.out, all2idx=all2idx
+            )
+
+    timer.timings["total"] = round(time.perf_counter() - t_start, 3)
+    with open(os.path.join(args.out, "build_timings.json"), "w", encoding="utf-8") as f:
+        json.dump({"workers": args.workers, "stages": timer.timings}, f, indent=2)
+
+    print(f"\n✅ Done. Artifacts saved to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from artifact_store import is_v2_dir  # noqa: E402
+from artifacts_loader import load_artifacts, load_normalized_matrix  # noqa: E402
+from evaluation import default_workers  # noqa: E402
+from item_neighbors import ItemNeighbors, block_rows  # noqa: E402
+from recommender import l2_normalize_rows, topk_indices  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+
+def check_rows(table, X_norm, n: int, seed: int = 0) -> float:
+    """Bandingkan tetangga n row acak dengan brute-force cosine; return recall rata-rata."""
+    rng = np.random.default_rng(seed)
+    hits = total = 0
+    for r in rng.choice(X_norm.shape[0], size=min(n, X_norm.shape[0]), replace=False):
+        scores = (X_norm @ X_norm[r].T).toarray().ravel()
+        scores[r] = -np.inf
+        scores[scores <= 0] = -np.inf
+        exact = topk_indices(scores, table.k)
+        got, _ = table.neighbors(r)
+        hits += len(np.intersect1d(exact, got))
+        total += len(exact)
+    return hits / max(total, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bangun tabel tetangga item-ke-item (top-K cosine) untuk retrieval='item_knn'.")
+    ap.add_argument("--artifacts", default=DEFAULT_DIR)
+    ap.add_argument("--k", type=int, default=50, help="Jumlah tetangga per item")
+    ap.add_argument("--workers", type=int, default=default_workers())
+    ap.add_argument("--max-block-mb", type=int, default=256, help="Batas memori per blok per worker")
+    ap.add_argument("--check", type=int, default=50, help="Cek recall vs brute-force untuk N item acak (0 = off)")
+    args = ap.parse_args()
+
+    print(f"[+] Loading artifacts {args.artifacts}")
+    _, _, all2idx, X_all, _ = load_artifacts(args.artifacts, with_vectorizer=False, meta_columns=())
+    X_norm = load_normalized_matrix(args.artifacts)
+    if X_norm is None:
+        X_norm = l2_normalize_rows(X_all)
+
+    n = X_norm.shape[0]
+    step = block_rows(n, args.max_block_mb)
+    print(f"[+] Top-{args.k} neighbours for {n:,} items "
+          f"({-(-n // step)} blocks x {step} rows, workers={args.workers})")
+    t0 = time.perf_counter()
+    last = [0.0]
+
+    def progress(done, total):
+        if time.perf_counter() - last[0] > 5 or done == total:
+            last[0] = time.perf_counter()
+            print(f"    {done:,}/{total:,} rows ({time.perf_counter() - t0:.1f}s)")
+
+    # Format v2: worker memuat X_norm via mmap (page cache dibagi), bukan salinan pickle
+    table = ItemNeighbors.build(
+        X_norm, k=args.k, workers=args.workers, max_block_mb=args.max_block_mb,
+        artifact_dir=args.artifacts if is_v2_dir(args.artifacts) else None, progress=progress,
+    )
+    seconds = round(time.perf_counter() - t0, 3)
+    filled = float((table.idx >= 0).mean())
+    print(f"    done in {seconds:.2f}s, slots filled={filled:.2%}, "
+          f"size={(table.idx.nbytes + table.score.nbytes) / 1e6:.1f} MB")
+
+    extra = {"build_seconds": seconds, "filled": round(filled, 4)}
+    if args.check:
+        extra["recall_check"] = round(check_rows(table, X_norm, args.check), 4)
+        print(f"    recall vs brute-force ({args.check} items): {extra['recall_check']:.4f}")
+
+    table.save(args.artifacts, extra=extra, all2idx=all2idx)
+    print(f"\n✅ Done. Neighbour table saved to: {args.artifacts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from artifacts_loader import load_artifacts  # noqa: E402
+from artifact_store import save_artifacts_v2  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Konversi artifacts lama (pickle/npz) ke format v2 (.npy, bisa di-mmap)."
+    )
+    ap.add_argument("--src", default=DEFAULT_DIR, help="Folder artifacts lama")
+    ap.add_argument("--dst", default=None, help="Folder tujuan (default: sama dengan --src)")
+    args = ap.parse_args()
+
+    dst = args.dst or args.src
+    print(f"[+] Loading {args.src}")
+    t0 = time.perf_counter()
+    vectorizer, news_all, all2idx, X_all, metrics = load_artifacts(args.src, mmap=False, meta_columns=None)
+    print(f"    loaded in {time.perf_counter() - t0:.2f}s — X_all {X_all.shape}, nnz={X_all.nnz:,}")
+
+    print(f"[+] Writing v2 artifacts -> {dst}")
+    t0 = time.perf_counter()
+    manifest = save_artifacts_v2(dst, vectorizer, news_all, all2idx, X_all, metrics)
+    print(f"    wrote {len(manifest['files'])} files in {time.perf_counter() - t0:.2f}s")
+
+    t0 = time.perf_counter()
+    load_artifacts(dst)
+    print(f"\n✅ Done. Load v2 (mmap): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
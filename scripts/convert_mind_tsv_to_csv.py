@@ -1,49 +1,75 @@
+import argparse
 import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from mind_io import BEH_COLS, NEWS_COLS  # noqa: E402
+
 BASE_DIR = "datasets"
 SPLITS = ["MINDsmall_train", "MINDsmall_dev"]
 FILES = ["news.tsv", "behaviors.tsv"]
+DEFAULT_ARTIFACTS = os.path.join("notebooks", "artifacts_classification_v2")
 
-NEWS_COLS = [
-    "news_id", "category", "subcategory", "title",
-    "abstract", "url", "title_entities", "abstract_entities"
-]
-BEH_COLS = ["impression_id", "user_id", "time", "history", "impressions"]
-
-def read_tsv_safely(path: str, kind: str) -> pd.DataFrame:
-    df = pd.read_csv(
+def read_tsv_safely(path: str, kind: str, chunksize: int = None):
+    return pd.read_csv(
         path,
         sep="\t",
         header=None,
+        names=NEWS_COLS if kind == "news" else BEH_COLS,
         dtype=str,
         na_filter=False,
         encoding="utf-8",
+        chunksize=chunksize,
     )
-    if kind == "news":
-        df.columns = NEWS_COLS
-    elif kind == "behaviors":
-        df.columns = BEH_COLS
-    return df
 
-def convert(tsv_path: str) -> str:
+def convert(tsv_path: str, chunksize: int = 100000) -> str:
     folder = os.path.dirname(tsv_path)
     fname = os.path.basename(tsv_path)
     stem = os.path.splitext(fname)[0]
 
     kind = "news" if stem == "news" else "behaviors"
-    print(f"[+] Reading {tsv_path}")
-
-    df = read_tsv_safely(tsv_path, kind=kind)
+    print(f"[+] Reading {tsv_path} (chunks of {chunksize:,} rows)")
 
     out_csv = os.path.join(folder, f"{stem}.csv")
     print(f"    -> Writing CSV {out_csv}")
 
-    df.to_csv(out_csv, index=False, encoding="utf-8")
+    # Streaming: tiap chunk langsung di-append, memori tidak tergantung ukuran file
+    for i, chunk in enumerate(read_tsv_safely(tsv_path, kind=kind, chunksize=chunksize)):
+        chunk.to_csv(out_csv, index=False, encoding="utf-8", mode="w" if i == 0 else "a", header=i == 0)
 
     return out_csv
 
+def convert_columnar(tsv_path: str, all2idx, chunksize: int = 100000) -> str:
+    from behaviors_store import convert_behaviors_columnar
+
+    folder = os.path.dirname(tsv_path)
+    out_dir = os.path.join(folder, "behaviors_columnar")
+    print(f"[+] Reading {tsv_path} (chunks of {chunksize:,} rows)")
+    print(f"    -> Writing columnar {out_dir}")
+
+    m = convert_behaviors_columnar(tsv_path, out_dir, all2idx, chunk_size=chunksize)
+    print(
+        f"    impressions={m['n_impressions']:,} users={m['n_users']:,} "
+        f"history={m['n_history']:,} candidates={m['n_candidates']:,} "
+        f"(unknown ids: {m['unknown_history']:,} / {m['unknown_candidates']:,})"
+    )
+    return out_dir
+
 def main():
+    ap = argparse.ArgumentParser(description="Konversi MIND TSV ke CSV atau format kolumnar biner.")
+    ap.add_argument("--format", choices=["csv", "columnar"], default="csv",
+                    help="columnar: behaviors -> ragged array (butuh artifacts untuk all2idx)")
+    ap.add_argument("--artifacts", default=DEFAULT_ARTIFACTS)
+    ap.add_argument("--chunk-size", type=int, default=100000)
+    args = ap.parse_args()
+
+    all2idx = None
+    if args.format == "columnar":
+        from artifacts_loader import load_artifacts
+        _, _, all2idx, _, _ = load_artifacts(args.artifacts, with_vectorizer=False, meta_columns=())
+
     converted = []
     for split in SPLITS:
         for f in FILES:
@@ -51,11 +77,14 @@ def main():
             if not os.path.exists(tsv_path):
                 print(f"[!] Not found, skip: {tsv_path}")
                 continue
-            converted.append(convert(tsv_path))
+            if args.format == "columnar" and f == "behaviors.tsv":
+                converted.append(convert_columnar(tsv_path, all2idx, args.chunk_size))
+            else:
+                converted.append(convert(tsv_path, args.chunk_size))
 
     print("\n✅ Done. Converted files:")
     for p in converted:
         print(" -", p)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
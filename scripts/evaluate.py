@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from artifacts_loader import load_artifacts, load_normalized_matrix  # noqa: E402
+from compact_matrix import CompactMatrix  # noqa: E402
+from evaluation import compare_precision, default_workers, evaluate_behaviors  # noqa: E402
+from recommender import l2_normalize_rows  # noqa: E402
+from mind_io import find_split_file  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+
+def compare(args, beh_path, X_all, all2idx):
+    X_norm = load_normalized_matrix(args.artifacts)
+    if X_norm is None:
+        X_norm = l2_normalize_rows(X_all)
+    compact = CompactMatrix.from_csr(X_norm, args.compare_precision)
+    base_mb = (X_norm.data.nbytes + X_norm.indices.nbytes + X_norm.indptr.nbytes) / 1e6
+    print(f"    X_norm float64: {base_mb:.1f} MB | {args.compare_precision}: {compact.nbytes / 1e6:.1f} MB")
+
+    print(f"[+] Comparing rankings on {beh_path}")
+    t0 = time.perf_counter()
+    report = compare_precision(
+        beh_path, X_all, all2idx, X_norm, compact,
+        weighted=not args.mean_profile,
+        max_impressions=args.max_impressions or None,
+        k=args.agreement_k,
+        chunk_size=args.chunk_size,
+    )
+    for key, val in report.items():
+        print(f"    {key:<18} {val:.6f}" if isinstance(val, float) else f"    {key:<18} {val:,}")
+    print(f"\n✅ Done in {time.perf_counter() - t0:.2f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Evaluasi offline dari behaviors MIND -> metrics.csv")
+    ap.add_argument("--artifacts", default=DEFAULT_DIR)
+    ap.add_argument("--dev-dir", default=os.path.join("datasets", "MINDsmall_dev"))
+    ap.add_argument("--behaviors", default=None, help="Path behaviors (default: <dev-dir>/behaviors.csv|tsv)")
+    ap.add_argument("--max-impressions", type=int, default=0, help="0 = semua impression")
+    ap.add_argument("--workers", type=int, default=default_workers())
+    ap.add_argument("--chunk-size", type=int, default=20000)
+    ap.add_argument("--mean-profile", action="store_true", help="Profil rata-rata (bukan weighted)")
+    ap.add_argument("--out", default=None, help="Path metrics.csv (default: <artifacts>/metrics.csv)")
+    ap.add_argument("--compare-precision", choices=["float32", "int8"], default=None,
+                    help="Hanya bandingkan ranking float64 vs matrix presisi rendah (tanpa menulis metrics)")
+    ap.add_argument("--agreement-k", type=int, default=5)
+    args = ap.parse_args()
+
+    beh_path = args.behaviors or find_split_file(args.dev_dir, "behaviors")
+    out = args.out or os.path.join(args.artifacts, "metrics.csv")
+
+    print(f"[+] Loading artifacts {args.artifacts}")
+    _, _, all2idx, X_all, _ = load_artifacts(args.artifacts, with_vectorizer=False, meta_columns=())
+
+    if args.compare_precision:
+        compare(args, beh_path, X_all, all2idx)
+        return
+
+    print(f"[+] Scoring {beh_path} ({args.workers} workers)")
+    t0 = time.perf_counter()
+    metrics_df = evaluate_behaviors(
+        beh_path, X_all, all2idx,
+        X_norm=load_normalized_matrix(args.artifacts),
+        weighted=not args.mean_profile,
+        max_impressions=args.max_impressions or None,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        artifact_dir=args.artifacts,
+    )
+    dt = time.perf_counter() - t0
+    print(metrics_df.to_string(index=False))
+    print(f"    {int(metrics_df.iloc[0]['impressions_used']):,} impressions in {dt:.2f}s")
+
+    metrics_df.to_csv(out, index=False)
+    print(f"\n✅ Done. Saved: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import instrumentation  # noqa: E402
+from service import build_service  # noqa: E402
+
+DEFAULT_DIR = os.path.join("notebooks", "artifacts_classification_v2")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Service rekomendasi lokal (HTTP + micro-batching).")
+    ap.add_argument("--artifacts", default=DEFAULT_DIR)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--max-batch", type=int, default=64, help="Request maksimum per batch")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0, help="Jendela pengumpulan batch")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    ap.add_argument("--max-queue", type=int, default=1024,
+                    help="Request menunggu maksimum per antrean micro-batch (lebih dari itu: HTTP 503)")
+    ap.add_argument("--shards", type=int, default=1,
+                    help="Blok baris katalog yang di-score paralel per request (thread)")
+    ap.add_argument("--metrics", action="store_true", help="Aktifkan instrumentasi per tahap (GET /metrics)")
+    args = ap.parse_args()
+
+    if args.metrics:
+        instrumentation.enable()
+
+    print(f"[+] Loading artifacts {args.artifacts}")
+    service = build_service(
+        args.artifacts, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, workers=args.workers,
+        max_queue=args.max_queue, shards=args.shards,
+    )
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n✅ Stopped.")
+
+
+if __name__ == "__main__":
+    main()
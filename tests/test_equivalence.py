@@ -0,0 +1,168 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import f1_score, precision_score
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "app"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from artifacts_loader import load_artifacts, load_normalized_matrix  # noqa: E402
+from evaluation import iter_impression_chunks, score_impressions, threshold_sweep  # noqa: E402
+from profile_cache import ProfileCache  # noqa: E402
+from recommender import CatalogScorer, build_user_profile  # noqa: E402
+from synthetic import make_synthetic_artifacts  # noqa: E402
+from text_query import QueryVectorizer  # noqa: E402
+
+# Kesetaraan jalur cepat dengan jalur referensi pada katalog sintetis kecil
+# (benchmarks/synthetic.py): MaxScore vs exact, ProfileCache vs
+# build_user_profile, QueryVectorizer vs vectorizer.transform, scorer
+# sharded vs tanpa shard, score_impressions vs cosine per impression, dan
+# threshold_sweep vs sklearn.
+
+N_ITEMS = 4000
+N_TERMS = 3000
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("synthetic"))
+    make_synthetic_artifacts(out, n_items=N_ITEMS, n_terms=N_TERMS, nnz_mean=20.0, n_impressions=300, seed=0)
+    vectorizer, news_all, all2idx, X_all, _ = load_artifacts(out)
+    return {
+        "dir": out,
+        "vectorizer": vectorizer,
+        "news_all": news_all,
+        "all2idx": all2idx,
+        "X_all": X_all,
+        "X_norm": load_normalized_matrix(out),
+        "ids": news_all["news_id"].tolist(),
+    }
+
+
+def _histories(catalog, sizes=(1, 3, 30), per_size=10, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = catalog["ids"]
+    return [[ids[i] for i in rng.choice(len(ids), n, replace=False)] for n in sizes for _ in range(per_size)]
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_maxscore_matches_exact(catalog, precision):
+    sc = CatalogScorer(catalog["X_all"], catalog["all2idx"], X_norm=catalog["X_norm"], precision=precision)
+    for hist in _histories(catalog):
+        u = build_user_profile(hist, catalog["X_all"], catalog["all2idx"])
+        ex = sc.rows_of(hist)
+        for k in (10, 100):
+            r1, s1 = sc.topn(u, k, exclude_rows=ex)
+            r2, s2 = sc.topn(u, k, exclude_rows=ex, retrieval="maxscore")
+            if precision == "float64":
+                np.testing.assert_array_equal(s1, s2)
+            else:
+                # matvec float32 vs rescoring CSR float32: beda urutan pembulatan saja
+                np.testing.assert_allclose(s1, s2, rtol=1e-5, atol=1e-7)
+            # baris berskor 0 boleh berbeda urutan (tidak berbagi term dengan profil)
+            pos = s1 > 0
+            np.testing.assert_array_equal(r1[pos], r2[pos])
+    # mode compact: postings & rescoring dari CompactMatrix, tanpa CSR float utuh
+    assert sc._X_norm is None or precision == "float64"
+
+
+@pytest.mark.parametrize("weighted", [True, False])
+def test_profile_cache_matches_build_user_profile(catalog, weighted):
+    # build_user_profile memakai bobot linspace float32, ProfileCache bentuk
+    # tertutup float64: selisih relatif ~1e-7, bukan bit-identik
+    rtol = 1e-6 if weighted else 1e-12
+    X_all, all2idx = catalog["X_all"], catalog["all2idx"]
+    cache = ProfileCache(X_all, all2idx)
+    for hist in _histories(catalog) + [hist + ["N-unknown"] for hist in _histories(catalog, seed=1)]:
+        expected = build_user_profile(hist, X_all, all2idx, weighted=weighted)
+        np.testing.assert_allclose(cache.get(hist, weighted=weighted).toarray(), expected, rtol=rtol, atol=1e-15)
+
+    # jalur incremental: history + satu bacaan baru
+    hist = _histories(catalog, sizes=(5,), per_size=1)[0]
+    cache.get(hist, weighted=weighted)
+    got = cache.append(hist, catalog["ids"][7], weighted=weighted)
+    expected = build_user_profile(hist + [catalog["ids"][7]], X_all, all2idx, weighted=weighted)
+    np.testing.assert_allclose(got.toarray(), expected, rtol=rtol, atol=1e-15)
+    assert cache.get([], weighted=weighted) is None
+
+
+def _assert_csr_identical(a, b):
+    a, b = a.tocsr(), b.tocsr()
+    assert a.shape == b.shape
+    np.testing.assert_array_equal(a.indptr, b.indptr)
+    np.testing.assert_array_equal(a.indices, b.indices)
+    np.testing.assert_array_equal(a.data, b.data)
+
+
+def test_query_vectorizer_bit_identical(catalog):
+    texts = catalog["news_all"]["title"].astype(str).tolist()[:200] + ["", "   ", "T12  t7!", "unknown words only"]
+    vec = catalog["vectorizer"]
+    _assert_csr_identical(QueryVectorizer(vec).transform(texts), vec.transform(texts))
+
+    # vectorizer sungguhan (bigram, stop words, sublinear_tf) pada teks bebas
+    corpus = [
+        "Stocks rally as markets react to the Fed decision",
+        "Local team wins the championship game in overtime",
+        "New recipes for a quick weeknight dinner",
+        "Weather: storms expected across the Midwest this weekend",
+        "The Fed holds rates steady; markets rally again",
+    ] * 2
+    real = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, stop_words="english").fit(corpus)
+    queries = corpus + ["markets, MARKETS and more markets", "Überraschung im Finale", "fed   rally"]
+    qv = QueryVectorizer(real)
+    _assert_csr_identical(qv.transform(queries), real.transform(queries))
+    # hasil dari cache (hit kedua) tetap sama
+    _assert_csr_identical(qv.transform(queries), real.transform(queries))
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_sharded_matches_unsharded(catalog, precision):
+    args = (catalog["X_all"], catalog["all2idx"])
+    single = CatalogScorer(*args, X_norm=catalog["X_norm"], precision=precision)
+    sharded = CatalogScorer(*args, X_norm=catalog["X_norm"], precision=precision, shards=4, min_shard_rows=500)
+    assert sharded.shards == 4
+    for hist in _histories(catalog):
+        u = build_user_profile(hist, catalog["X_all"], catalog["all2idx"])
+        ex = single.rows_of(hist)
+        np.testing.assert_array_equal(single.score(u), sharded.score(u))
+        for k in (10, 100):
+            r1, s1 = single.topn(u, k, exclude_rows=ex)
+            r2, s2 = sharded.topn(u, k, exclude_rows=ex)
+            np.testing.assert_array_equal(r1, r2)
+            np.testing.assert_array_equal(s1, s2)
+
+
+def test_score_impressions_matches_per_impression_cosine(catalog):
+    X_all, X_norm, all2idx = catalog["X_all"], catalog["X_norm"], catalog["all2idx"]
+    imps = next(iter_impression_chunks(os.path.join(catalog["dir"], "behaviors.tsv"), all2idx, chunk_size=100))
+    scores = score_impressions(imps, X_all, X_norm, block_size=16)
+
+    sc = CatalogScorer(X_all, all2idx, X_norm=X_norm)
+    for i in range(len(imps)):
+        h0, h1 = imps.hist_offsets[i], imps.hist_offsets[i + 1]
+        c0, c1 = imps.cand_offsets[i], imps.cand_offsets[i + 1]
+        hist = [sc.ids[r] for r in imps.hist_items[h0:h1] if r >= 0]
+        q = sc.normalize_profile(build_user_profile(hist, X_all, all2idx))
+        cand = imps.cand_items[c0:c1]
+        expected = np.zeros(len(cand))
+        if q is not None:
+            known = cand >= 0
+            expected[known] = X_norm[cand[known]] @ q
+        np.testing.assert_allclose(scores[c0:c1], expected, rtol=1e-9, atol=1e-12)
+
+
+def test_threshold_sweep_matches_sklearn():
+    rng = np.random.default_rng(0)
+    y_true = rng.random(2000) < 0.1
+    # skor dengan banyak nilai kembar, termasuk tepat di threshold
+    y_score = np.round(rng.random(2000) ** 3, 2)
+    thresholds = np.linspace(0, 1, 101)
+    sweep = threshold_sweep(y_true, y_score, thresholds)
+    for thr, prec, f1 in zip(sweep["threshold"], sweep["precision"], sweep["f1"]):
+        y_pred = y_score >= thr
+        assert prec == pytest.approx(precision_score(y_true, y_pred, zero_division=0), abs=1e-12)
+        assert f1 == pytest.approx(f1_score(y_true, y_pred, zero_division=0), abs=1e-12)